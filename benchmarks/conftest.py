@@ -0,0 +1,144 @@
+# benchmarks/conftest.py
+# Micro-benchmarks de los caminos calientes, offline contra SQLite sembrado con
+# core/synthetic.py en varios tamaños. Cada medición guarda tiempo (mediana, ms)
+# y cantidad de consultas; se comparan con benchmarks/baseline.json.
+#
+# Sólo la cantidad de consultas hace fallar: no depende de la máquina. Los tiempos
+# de la baseline son de la máquina donde se grabó, así que una diferencia de tiempo
+# se informa en el resumen como aviso (con --bench-strict-time también falla, para
+# comparar en la misma máquina que grabó la baseline).
+#
+#   python -m pytest benchmarks                          # comparar con la baseline
+#   python -m pytest benchmarks --bench-save             # nueva baseline
+#   python -m pytest benchmarks --bench-days 30,365,1825
+#
+# Regrabar la baseline: cuando un cambio baja (o justifica subir) las consultas, o
+# para que los tiempos de referencia sean de otra máquina. Correr --bench-save con
+# los mismos --bench-days en una máquina sin carga y commitear baseline.json junto
+# al cambio; el diff muestra qué consultas cambiaron.
+import json
+import statistics
+import time
+from pathlib import Path
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+BASELINE = Path(__file__).with_name("baseline.json")
+_resultados = {}
+_avisos = []
+
+
+def pytest_addoption(parser):
+    g = parser.getgroup("bench")
+    g.addoption("--bench-days", default="30,365", help="Días de historia sembrada (separados por coma)")
+    g.addoption("--bench-rounds", type=int, default=5, help="Repeticiones por medición (se toma la mediana)")
+    g.addoption("--bench-save", action="store_true", help="Escribe los resultados como nueva baseline")
+    g.addoption("--bench-baseline", default=str(BASELINE))
+    g.addoption("--bench-tolerance", type=float, default=1.0,
+                help="Regresión de tiempo tolerada (1.0 = hasta 2x la baseline)")
+    g.addoption("--bench-strict-time", action="store_true",
+                help="Falla también por tiempo (sólo en la máquina que grabó la baseline)")
+
+
+def pytest_generate_tests(metafunc):
+    if "history_days" in metafunc.fixturenames:
+        dias = [int(d) for d in metafunc.config.getoption("--bench-days").split(",") if d.strip()]
+        metafunc.parametrize("history_days", dias, ids=[f"{d}d" for d in dias], scope="session")
+
+
+@pytest.fixture(scope="session")
+def seeded(history_days, django_db_setup, django_db_blocker):
+    """Historia sintética de `history_days` días (misma semilla siempre)."""
+    from django.utils import timezone
+    from core.models import Item, Prestamo, Reserva
+    from core.synthetic import generate
+    from core.inventory import bump_version
+    with django_db_blocker.unblock():
+        Reserva.objects.all().delete()
+        Prestamo.objects.all().delete()
+        Item.objects.all().delete()
+        # fecha fija: mismos datos en cada corrida
+        total, _ = generate(days=history_days, seed=42,
+                            now=timezone.make_aware(timezone.datetime(2025, 12, 1, 12, 0)))
+        bump_version()
+    return {"days": history_days, "prestamos": total}
+
+
+@pytest.fixture
+def bench(request, seeded, db):
+    """
+    bench(fn, setup=None) -> resultado de fn
+    Corre fn una vez en caliente y luego --bench-rounds veces; `setup` (opcional)
+    prepara los argumentos de cada ronda y no se mide.
+    """
+    cfg = request.config
+    rounds = cfg.getoption("--bench-rounds")
+
+    def run(fn, setup=None):
+        args = setup() if setup else ()
+        out = fn(*args)  # calentamiento (caches, modelos ML, índice de inventario)
+        tiempos, consultas = [], None
+        for _ in range(rounds):
+            args = setup() if setup else ()
+            with CaptureQueriesContext(connection) as q:
+                t0 = time.perf_counter()
+                out = fn(*args)
+                tiempos.append((time.perf_counter() - t0) * 1000)
+            consultas = len(q) if consultas is None else max(consultas, len(q))
+        key = request.node.name
+        res = {"ms": round(statistics.median(tiempos), 3), "queries": consultas,
+               "prestamos": seeded["prestamos"]}
+        _resultados[key] = res
+        _comparar(cfg, key, res)
+        return out
+
+    return run
+
+
+def _baseline(cfg):
+    p = Path(cfg.getoption("--bench-baseline"))
+    return json.loads(p.read_text()) if p.exists() else {}
+
+
+def _comparar(cfg, key, res):
+    if cfg.getoption("--bench-save"):
+        return
+    base = _baseline(cfg).get(key)
+    if not base:
+        return
+    errores = []
+    if res["queries"] > base["queries"]:
+        errores.append(f"consultas {base['queries']} -> {res['queries']}")
+    limite = base["ms"] * (1 + cfg.getoption("--bench-tolerance"))
+    if res["ms"] > limite and res["ms"] - base["ms"] > 1.0:  # <1 ms es ruido
+        tiempo = f"tiempo {base['ms']} ms -> {res['ms']} ms (límite {limite:.1f} ms)"
+        if cfg.getoption("--bench-strict-time"):
+            errores.append(tiempo)
+        else:
+            _avisos.append(f"{key}: {tiempo}")
+    if errores:
+        pytest.fail(f"Regresión en {key}: " + "; ".join(errores))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not _resultados:
+        return
+    tr = terminalreporter
+    tr.section("benchmarks")
+    base = _baseline(config)
+    for key, r in sorted(_resultados.items()):
+        b = base.get(key)
+        ref = f"  (baseline {b['ms']} ms, {b['queries']} q)" if b else ""
+        tr.write_line(f"{key:<55} {r['ms']:>10.2f} ms {r['queries']:>5} q{ref}")
+    if _avisos:
+        tr.write_line("")
+        tr.write_line("Tiempos por encima de la baseline (aviso; la baseline es de otra corrida/máquina):")
+        for a in _avisos:
+            tr.write_line(f"  {a}")
+    if config.getoption("--bench-save"):
+        p = Path(config.getoption("--bench-baseline"))
+        datos = {**base, **_resultados}
+        p.write_text(json.dumps(dict(sorted(datos.items())), indent=2) + "\n")
+        tr.write_line(f"Baseline guardada en {p}")
@@ -0,0 +1,104 @@
+# Caminos calientes: vistas/API, chat, préstamo/devolución y tareas de cron.
+import datetime as dt
+import io
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import RequestFactory
+from django.utils import timezone
+
+from core.models import Item, Prestamo, Reserva, EstadoItem, Nivel, Turno, TipoItem
+from core.views import KPIs, PrediccionesML
+from core.chat import chat_api
+from core.forms import PrestamoRapidoForm
+
+rf = RequestFactory()
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(username="bench", password="x")
+
+
+def _get(view, url):
+    return lambda: view.as_view()(rf.get(url))
+
+
+def test_kpis(bench):
+    r = bench(_get(KPIs, "/api/stats/kpis/?days=30"))
+    assert r.status_code == 200
+
+
+def test_kpis_filtrado(bench):
+    r = bench(_get(KPIs, "/api/stats/kpis/?days=90&tipo=NB&nivel=SEC"))
+    assert r.status_code == 200
+
+
+@pytest.mark.parametrize("h", [7, 30])
+def test_predicciones_demanda(bench, h):
+    r = bench(_get(PrediccionesML, f"/api/predicciones_ml/?kind=demanda&h={h}&mode=ml"))
+    assert r.status_code == 200
+
+
+def test_predicciones_tardanza(bench):
+    r = bench(_get(PrediccionesML, "/api/predicciones_ml/?kind=tardanza&tipo=NB&nivel=SEC&turno=N"))
+    assert r.status_code == 200
+
+
+@pytest.mark.parametrize("mensaje", ["menu", "mis reservas", "mis préstamos", "reservar NB-01", "devolver NB-01"],
+                         ids=["menu", "mis_reservas", "mis_prestamos", "reservar", "devolver"])
+def test_chat_intent(bench, user, mensaje):
+    def post():
+        req = rf.post("/api/chat/", data=json.dumps({"message": mensaje}), content_type="application/json")
+        req.user = user
+        return chat_api(req)
+    r = bench(post)
+    assert r.status_code == 200
+
+
+def _prestamo_abierto():
+    it = Item.objects.filter(estado=EstadoItem.DISPONIBLE).first()
+    inicio = timezone.now() - dt.timedelta(hours=2)
+    return (Prestamo.objects.create(item=it, nivel=Nivel.SECUNDARIO, turno=Turno.MANANA,
+                                    solicitante="bench", inicio=inicio),)
+
+
+def test_prestamo_cerrar(bench):
+    bench(lambda p: p.cerrar(), setup=_prestamo_abierto)
+
+
+def test_prestamo_form_init(bench):
+    form = bench(lambda: PrestamoRapidoForm(initial={"tipo": TipoItem.NOTEBOOK}))
+    assert form.fields["code"].choices
+
+
+def test_prestamo_form_save(bench):
+    def setup():
+        code = Item.objects.filter(tipo=TipoItem.NOTEBOOK, estado=EstadoItem.DISPONIBLE).values_list("code", flat=True)[0]
+        return (PrestamoRapidoForm(data={"tipo": "NB", "code": code, "nivel": Nivel.SECUNDARIO,
+                                         "turno": Turno.MANANA, "aula": "3"}),)
+
+    def guardar(form):
+        assert form.is_valid(), form.errors
+        return form.save()
+    assert bench(guardar, setup=setup) is not None
+
+
+def test_expire_reservas(bench):
+    def setup():
+        ahora = timezone.now()
+        items = list(Item.objects.filter(estado=EstadoItem.DISPONIBLE)[:20])
+        Item.objects.filter(pk__in=[i.pk for i in items]).update(estado=EstadoItem.RESERVADO)
+        Reserva.objects.bulk_create([
+            Reserva(item=it, tipo=it.tipo, nivel=Nivel.SECUNDARIO, turno=Turno.MANANA,
+                    solicitante=f"r{i}", expira=ahora - dt.timedelta(minutes=5))
+            for i, it in enumerate(items)
+        ])
+        return ()
+    bench(lambda: call_command("expire_reservas", stdout=io.StringIO()), setup=setup)
+
+
+def test_predict_risk(bench):
+    bench(lambda: call_command("predict_risk", stdout=io.StringIO()))
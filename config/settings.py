@@ -36,10 +36,15 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.roles.RolesMiddleware",  # grupos/perfil una vez por request (cacheados en sesión)
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Prueba de carga (manage.py load_test): el servidor marca con X-DB-Lock los 500 por lock de BD
+if env.bool("LOAD_TEST", default=False):
+    MIDDLEWARE.insert(0, "core.loadtest.LockHeaderMiddleware")
+
 ROOT_URLCONF = "config.urls"
 
 # Templates
@@ -66,6 +71,15 @@ ASGI_APPLICATION = "config.asgi.application"
 DATABASES = {
     "default": env.db("DATABASE_URL", default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}")
 }
+# SQLite en producción (core/sqlite): WAL + pragmas, BEGIN IMMEDIATE y reintentos
+# con backoff si la BD sigue ocupada. SQLITE_TUNING=False vuelve al backend de Django.
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3" and env.bool("SQLITE_TUNING", default=True):
+    DATABASES["default"]["ENGINE"] = "core.sqlite"
+    DATABASES["default"].setdefault("OPTIONS", {}).update({
+        "timeout": env.float("SQLITE_BUSY_TIMEOUT", default=5),  # busy_timeout de SQLite (segundos)
+        "transaction_mode": "IMMEDIATE",
+        "busy_retries": env.int("SQLITE_BUSY_RETRIES", default=4),
+    })
 
 # Passwords: en desarrollo, sin validadores; en prod, validación completa
 if DEBUG:
@@ -98,6 +112,24 @@ REST_FRAMEWORK = {
     "UNAUTHENTICATED_USER": None,
 }
 
+# KPIs: "sql" (agregaciones en BD) o "columnar" (arrays NumPy en memoria, ver core/analytics.py)
+ANALYTICS_ENGINE = env("ANALYTICS_ENGINE", default="sql")
+ANALYTICS_REFRESH_SECONDS = env.float("ANALYTICS_REFRESH_SECONDS", default=5.0)
+ANALYTICS_RELOAD_SECONDS = env.int("ANALYTICS_RELOAD_SECONDS", default=3600)  # recarga completa periódica
+
+# Cache compartido por workers, bot y cron (ver core/caching.py). Sin CACHE_URL es
+# LocMem (por proceso): alcanza para desarrollo y tests, no para producción.
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
+# Índice en memoria del inventario (core/inventory.py). Con un cache compartido
+# (CACHE_URL) el contador de versión invalida a todos los workers.
+INVENTORY_CACHE_ALIAS = "default"
+INVENTORY_STATE_MAX_AGE = env.int("INVENTORY_STATE_MAX_AGE", default=60)
+
+# Chat: estado de conversación en cache (TTL, si es compartido) o cookie firmada, fuera de django_session
+CHAT_STATE_CACHE_ALIAS = "default"
+CHAT_STATE_TTL = env.int("CHAT_STATE_TTL", default=30 * 60)
+
 # Login / Logout
 LOGIN_URL = "/accounts/login/"
 LOGIN_REDIRECT_URL = "/"
@@ -110,9 +142,44 @@ JOIN_CODE_STAFF = env("JOIN_CODE_STAFF", default="STAFF-123")
 
 # Cron (reportes y expiración de reservas)
 CRONJOBS = [
-    ("0 18 * * FRI", "django.core.management.call_command", ["weekly_report"]),   # Viernes 18:00
+    ("0 8 * * MON", "django.core.management.call_command", ["weekly_report"]),    # Lunes 08:00 (semana cerrada)
     ("*/5 * * * *", "django.core.management.call_command", ["expire_reservas"]), # Cada 5 min
+    ("* * * * *", "django.core.management.call_command", ["discord_outbox"]),    # Outbox Discord (o correr discord_outbox --loop)
+    ("*/15 * * * *", "django.core.management.call_command", ["predict_risk"]),   # Riesgo de mantenimiento (historial)
+    ("30 3 * * SUN", "django.core.management.call_command", ["archivar"]),       # Archivo de préstamos viejos
 ]
 
+# Lecturas analíticas / ML (train_ml, eval_ml, KPIs, reportes) en una réplica o en un
+# snapshot SQLite (core/db_router.py); si atrasan más de ANALYTICS_MAX_LAG segundos se lee la principal
+ANALYTICS_DATABASE_URL = env("ANALYTICS_DATABASE_URL", default="")
+ANALYTICS_SNAPSHOT = env("ANALYTICS_SNAPSHOT", default="")  # p.ej. /var/lib/esim/analytics.sqlite3
+ANALYTICS_MAX_LAG = env.int("ANALYTICS_MAX_LAG", default=900)
+if ANALYTICS_DATABASE_URL or ANALYTICS_SNAPSHOT:
+    DATABASES["analytics"] = (env.db("ANALYTICS_DATABASE_URL") if ANALYTICS_DATABASE_URL
+                              else {"ENGINE": "django.db.backends.sqlite3", "NAME": ANALYTICS_SNAPSHOT})
+    DATABASES["analytics"]["TEST"] = {"MIRROR": "default"}
+    if not ANALYTICS_DATABASE_URL:
+        CRONJOBS.append(("*/10 * * * *", "django.core.management.call_command", ["snapshot_analytics"]))
+DATABASE_ROUTERS = ["core.db_router.AnalyticsRouter"]
+
+# Reportes por período: TTL del cache del período en curso / de los ya cerrados
+REPORT_CACHE_TTL = env.int("REPORT_CACHE_TTL", default=300)
+REPORT_CACHE_TTL_CERRADO = env.int("REPORT_CACHE_TTL_CERRADO", default=7 * 24 * 3600)
+
+# Días de historial de ItemRiskScore que se conservan (0 = todo)
+RISK_HISTORY_DAYS = env.int("RISK_HISTORY_DAYS", default=90)
+
+# Préstamos cerrados hace más de esto pasan al archivo (manage.py archivar).
+# Agrandarlo no desarchiva: las lecturas asumen que nada archivado es más nuevo que el horizonte.
+ARCHIVE_AFTER_DAYS = env.int("ARCHIVE_AFTER_DAYS", default=365)
+
+# Discord: webhook y outbox (send_discord encola; el worker envía en segundo plano)
+DISCORD_WEBHOOK_URL = env("DISCORD_WEBHOOK_URL", default="")
+DISCORD_OUTBOX = env.bool("DISCORD_OUTBOX", default=True)
+
+# Bot: hilos para el ORM (comandos en paralelo) y TTL del cache de perfiles vinculados
+DISCORD_BOT_DB_WORKERS = env.int("DISCORD_BOT_DB_WORKERS", default=8)
+DISCORD_PROFILE_TTL = env.int("DISCORD_PROFILE_TTL", default=300)
+
 # Opcional: si vas a usar CSRF en host público, ajusta esto
 # CSRF_TRUSTED_ORIGINS = env.list("CSRF_TRUSTED_ORIGINS", default=[])
\ No newline at end of file
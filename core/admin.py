@@ -1,65 +1,224 @@
+import datetime as dt
+
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList, ORDER_VAR, PAGE_VAR
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import OuterRef, Subquery, Min, Max
 from django.utils import timezone
-from .models import Item, Prestamo, Mantenimiento, Reserva, Profile, DiscordLinkToken
+from django.utils.functional import cached_property
+from .models import (Item, Prestamo, Mantenimiento, Reserva, Profile, DiscordLinkToken, DiscordOutbox,
+                     ItemRiskScore, PrestamoArchivado, EstadoItem)
+from .bulk import aprobar_reservas_lote
+from .inventory import bump_version
+
+# ---------- Tablas grandes (Prestamo, Reserva, Mantenimiento) ----------
+CURSOR_VAR = "cursor"
+
+
+class ConteoEstimadoPaginator(Paginator):
+    """
+    Sin filtros en PostgreSQL usa la estimación del planner (pg_class.reltuples);
+    si no, cuenta hasta TOPE filas (COUNT sobre un LIMIT) en lugar de un COUNT(*) completo.
+    """
+    TOPE = 10000
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        conn = connections[qs.db]
+        if not qs.query.where and conn.vendor == "postgresql":
+            with conn.cursor() as c:
+                c.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [qs.model._meta.db_table])
+                fila = c.fetchone()
+            if fila and fila[0] > 0:
+                return int(fila[0])
+        return qs.order_by().values("pk")[:self.TOPE].count()
+
+
+class _JerarquiaPorRangos:
+    """
+    Mixin de QuerySet para date_hierarchy: los niveles año y mes se arman con
+    MIN/MAX y un EXISTS por rango (usa el índice de la fecha) en vez de un
+    DISTINCT sobre trunc(fecha), que recorre la tabla entera.
+    """
+
+    def datetimes(self, field_name, kind, *args, **kwargs):
+        if kind not in ("year", "month"):
+            return super().datetimes(field_name, kind, *args, **kwargs)
+        r = self.aggregate(a=Min(field_name), b=Max(field_name))
+        if r["a"] is None:
+            return []
+        a, b = timezone.localtime(r["a"]), timezone.localtime(r["b"])
+        if kind == "year":
+            bordes = [(y, 1) for y in range(a.year, b.year + 2)]
+        else:
+            bordes = [(a.year + (a.month - 1 + i) // 12, (a.month - 1 + i) % 12 + 1)
+                      for i in range((b.year - a.year) * 12 + b.month - a.month + 2)]
+        bordes = [timezone.make_aware(dt.datetime(y, m, 1)) for y, m in bordes]
+        return [ini for ini, fin in zip(bordes, bordes[1:])
+                if self.filter(**{f"{field_name}__gte": ini, f"{field_name}__lt": fin}).exists()]
+
+
+_CLASES_JERARQUIA = {}
+
+
+def _con_jerarquia_por_rangos(qs):
+    cls = qs.__class__
+    if cls not in _CLASES_JERARQUIA:
+        _CLASES_JERARQUIA[cls] = type(f"Rangos{cls.__name__}", (_JerarquiaPorRangos, cls), {})
+    qs.__class__ = _CLASES_JERARQUIA[cls]
+    return qs
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Con el orden por defecto (-id), "Siguientes" pagina por clave (?cursor=<id>:
+    WHERE id < cursor) en vez de OFFSET, que en páginas profundas recorre todo.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.keyset = ORDER_VAR not in request.GET
+        try:
+            self.cursor = int(request.GET[CURSOR_VAR]) if self.keyset and CURSOR_VAR in request.GET else None
+        except ValueError:
+            self.cursor = None
+        self.siguientes_url = self.primeros_url = None
+        super().__init__(request, *args, **kwargs)
+        if self.cursor is not None:
+            self.primeros_url = self.get_query_string(remove=[CURSOR_VAR, PAGE_VAR])
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if self.cursor is not None:
+            qs = qs.filter(pk__lt=self.cursor)
+        return _con_jerarquia_por_rangos(qs) if self.date_hierarchy else qs
+
+    def get_results(self, request):
+        if self.cursor is not None:
+            self.page_num = 1
+        super().get_results(request)
+        if self.keyset and not self.show_all and self.multi_page:
+            filas = list(self.result_list)
+            if len(filas) == self.list_per_page:
+                self.siguientes_url = self.get_query_string({CURSOR_VAR: filas[-1].pk}, remove=[PAGE_VAR])
+
+
+class TablaGrandeAdmin(admin.ModelAdmin):
+    paginator = ConteoEstimadoPaginator
+    show_full_result_count = False
+    ordering = ("-id",)
+    list_per_page = 100
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
 
 @admin.register(Item)
 class ItemAdmin(admin.ModelAdmin):
-    list_display = ("code","tipo","estado","uso_acumulado_horas","usos_acumulados")
+    list_display = ("code","tipo","estado","uso_acumulado_horas","usos_acumulados","riesgo")
     list_filter  = ("tipo","estado")
     search_fields = ("code",)
     actions = ["poner_mantenimiento","sacar_mantenimiento"]
 
+    def get_queryset(self, request):
+        # Último score de riesgo como subconsulta (sin una consulta por fila)
+        ultimo = ItemRiskScore.objects.filter(item=OuterRef("pk")).order_by("-calculado")
+        return super().get_queryset(request).annotate(riesgo_actual=Subquery(ultimo.values("score")[:1]))
+
+    def riesgo(self, obj):
+        return obj.riesgo_actual if obj.riesgo_actual is not None else "-"
+    riesgo.short_description = "Riesgo"
+    riesgo.admin_order_field = "riesgo_actual"
+
+    # Acciones por conjunto: un INSERT masivo + un UPDATE, sin save() por ítem
     def poner_mantenimiento(self, request, queryset):
-        for it in queryset.exclude(estado="MANT"):
-            Mantenimiento.objects.create(item=it, tipo="preventivo", severidad=1, descripcion="Puesta manual en mantenimiento")
-            it.estado = "MANT"
-            it.save(update_fields=["estado"])
-        self.message_user(request, "Ítems en mantenimiento.")
+        ids = list(queryset.exclude(estado=EstadoItem.MANTENIMIENTO).values_list("id", flat=True))
+        with transaction.atomic():
+            Mantenimiento.objects.bulk_create([
+                Mantenimiento(item_id=i, tipo="preventivo", severidad=1, descripcion="Puesta manual en mantenimiento")
+                for i in ids
+            ], batch_size=500)
+            Item.objects.filter(id__in=ids).update(estado=EstadoItem.MANTENIMIENTO)
+        bump_version()  # update() no dispara las señales del inventario
+        self.message_user(request, f"{len(ids)} ítems en mantenimiento.")
     poner_mantenimiento.short_description = "Poner en mantenimiento"
 
     def sacar_mantenimiento(self, request, queryset):
-        for it in queryset.filter(estado="MANT"):
-            Mantenimiento.objects.filter(item=it, estado__in=["abierto","en_proceso"]).update(estado="cerrado", fecha_cierre=timezone.now())
-            it.estado = "DISP"
-            it.save(update_fields=["estado"])
-        self.message_user(request, "Ítems fuera de mantenimiento.")
+        en_mant = Item.objects.filter(pk__in=queryset.values("pk"), estado=EstadoItem.MANTENIMIENTO)
+        with transaction.atomic():
+            Mantenimiento.objects.filter(item__in=en_mant.values("pk"), estado__in=["abierto","en_proceso"]).update(
+                estado="cerrado", fecha_cierre=timezone.now())
+            n = en_mant.update(estado=EstadoItem.DISPONIBLE)
+        bump_version()
+        self.message_user(request, f"{n} ítems fuera de mantenimiento.")
     sacar_mantenimiento.short_description = "Sacar de mantenimiento"
 
 @admin.register(Prestamo)
-class PrestamoAdmin(admin.ModelAdmin):
+class PrestamoAdmin(TablaGrandeAdmin):
     list_display = ("item","nivel","carrera","anio_display","turno","inicio","fin_real","duracion_horas","estado","solicitante")
     list_filter  = ("nivel","carrera","anio","turno","estado")
     search_fields = ("item__code","solicitante","aula")
+    list_select_related = ("item",)
+    date_hierarchy = "inicio"
+    raw_id_fields = ("item",)
     def anio_display(self, obj):
         return obj.get_anio_display() if obj.anio is not None else "-"
     anio_display.short_description = "Año"
     anio_display.admin_order_field = "anio"
 
+@admin.register(PrestamoArchivado)
+class PrestamoArchivadoAdmin(TablaGrandeAdmin):
+    """Sólo lectura: lo escribe manage.py archivar (y ya está sumado al rollup)."""
+    list_display = ("id","item","nivel","turno","inicio","fin_real","duracion_horas","solicitante","archivado")
+    list_filter  = ("nivel","turno")
+    search_fields = ("item__code","solicitante")
+    list_select_related = ("item",)
+    date_hierarchy = "fin_real"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 @admin.register(Mantenimiento)
-class MantAdmin(admin.ModelAdmin):
+class MantAdmin(TablaGrandeAdmin):
     list_display = ("item","tipo","severidad","estado","fecha_apertura","fecha_cierre")
     list_filter  = ("estado","tipo","severidad")
     search_fields = ("item__code",)
+    list_select_related = ("item",)
+    date_hierarchy = "fecha_apertura"
+    raw_id_fields = ("item",)
 
 @admin.register(Reserva)
-class ReservaAdmin(admin.ModelAdmin):
+class ReservaAdmin(TablaGrandeAdmin):
     list_display = ("id","item","tipo","nivel","turno","solicitante","expira","estado","aprobada_por","aprobada_at")
     list_filter  = ("estado","tipo","turno","nivel")
     search_fields = ("item__code","solicitante")
+    list_select_related = ("item","aprobada_por")
+    date_hierarchy = "inicio"
+    raw_id_fields = ("item","aprobada_por","cancelada_por")
     actions = ["aprobar_convertir","cancelar_reserva"]
 
     def aprobar_convertir(self, request, queryset):
-        count_ok = 0
-        for r in queryset.filter(estado="activa"):
-            p = r.aprobar_y_convertir(request.user)
-            if p: count_ok += 1
+        ids = list(queryset.filter(estado="activa").values_list("id", flat=True))
+        count_ok = len(aprobar_reservas_lote(ids, request.user))
         self.message_user(request, f"{count_ok} reservas aprobadas y convertidas a préstamo.")
     aprobar_convertir.short_description = "Aprobar y convertir a préstamo"
 
     def cancelar_reserva(self, request, queryset):
-        for r in queryset.filter(estado="activa"):
-            r.cancelar(user=request.user, motivo="Cancelado desde admin")
-        self.message_user(request, "Reservas canceladas.")
+        n = sum(r.cancelar(user=request.user, motivo="Cancelado desde admin")
+                for r in queryset.filter(estado="activa"))
+        self.message_user(request, f"{n} reservas canceladas.")
     cancelar_reserva.short_description = "Cancelar reservas seleccionadas"
 
 @admin.register(Profile)
@@ -75,4 +234,18 @@ class ProfileAdmin(admin.ModelAdmin):
 @admin.register(DiscordLinkToken)
 class DiscordLinkTokenAdmin(admin.ModelAdmin):
     list_display = ("user","token","created_at","used_at")
-    search_fields = ("token","user__username")
\ No newline at end of file
+    search_fields = ("token","user__username")
+
+@admin.register(DiscordOutbox)
+class DiscordOutboxAdmin(admin.ModelAdmin):
+    list_display = ("id","estado","intentos","creado","proximo_intento","enviado_at","ultimo_error")
+    list_filter  = ("estado",)
+    search_fields = ("contenido",)
+
+@admin.register(ItemRiskScore)
+class ItemRiskScoreAdmin(admin.ModelAdmin):
+    list_display = ("item","score","horas","usos","tickets","calculado")
+    list_filter  = ("item__tipo",)
+    search_fields = ("item__code",)
+    date_hierarchy = "calculado"
+    list_select_related = ("item",)
@@ -0,0 +1,99 @@
+# core/allocation.py
+# Asignación atómica de ítems (préstamo / reserva) sin carreras entre pedidos.
+# - Postgres (y motores con skip-locked): SELECT ... FOR UPDATE SKIP LOCKED,
+#   así los pedidos concurrentes toman filas distintas sin esperarse.
+# - SQLite: UPDATE condicional (WHERE estado IN (...)) con RETURNING, en una sola
+#   sentencia; en motores sin RETURNING, gana quien afecta 1 fila por candidato.
+# Siempre debe llamarse dentro de transaction.atomic() junto con la creación
+# del Prestamo/Reserva, para que un fallo posterior libere el ítem.
+from django.db import connections, router, transaction
+
+from .models import Item, EstadoItem
+from .inventory import bump_version
+
+# Cuántos candidatos probar por ronda en el camino de UPDATE condicional
+CANDIDATOS = 20
+
+
+def _skip_locked():
+    conn = connections[router.db_for_write(Item)]
+    return conn.features.has_select_for_update_skip_locked
+
+
+def _candidatos(tipo=None, item_id=None, code=None, desde=(EstadoItem.DISPONIBLE,), item_ids=None):
+    qs = Item.objects.filter(estado__in=desde)
+    if item_id is not None:
+        qs = qs.filter(pk=item_id)
+    if item_ids is not None:
+        qs = qs.filter(pk__in=item_ids)
+    if code is not None:
+        qs = qs.filter(code=code)
+    if tipo is not None:
+        qs = qs.filter(tipo=tipo)
+    return qs.order_by("code")
+
+
+def _claim_returning(conn, n, qs, nuevo_estado, desde):
+    # Un solo UPDATE ... WHERE id IN (SELECT ... LIMIT n) AND estado IN (...) RETURNING id:
+    # SQLite toma el lock de escritura al empezar la sentencia, así que la elección
+    # del candidato y el cambio de estado no se intercalan con otros pedidos.
+    sub_sql, sub_params = qs.values("pk")[:n].query.sql_with_params()
+    table = conn.ops.quote_name(Item._meta.db_table)
+    estados = ", ".join(["%s"] * len(desde))
+    sql = (f"UPDATE {table} SET estado = %s "
+           f"WHERE id IN ({sub_sql}) AND estado IN ({estados}) RETURNING id")
+    with conn.cursor() as cur:
+        cur.execute(sql, [nuevo_estado, *sub_params, *desde])
+        return [row[0] for row in cur.fetchall()]
+
+
+def claim_items(n, tipo=None, item_id=None, code=None,
+                nuevo_estado=EstadoItem.EN_USO, desde=(EstadoItem.DISPONIBLE,), item_ids=None):
+    """
+    Reclama hasta n ítems que estén en alguno de los estados `desde` y los pasa
+    a `nuevo_estado`. Devuelve la lista de Item reclamados (puede ser < n).
+    Con `item_ids` se limita a esos ítems (p.ej. los de un lote de reservas).
+    """
+    if n <= 0:
+        return []
+    qs = _candidatos(tipo, item_id, code, desde, item_ids)
+
+    if _skip_locked():
+        with transaction.atomic():
+            items = list(qs.select_for_update(skip_locked=True)[:n])
+            if items:
+                Item.objects.filter(pk__in=[it.pk for it in items]).update(estado=nuevo_estado)
+                bump_version()
+            for it in items:
+                it.estado = nuevo_estado
+            return items
+
+    conn = connections[router.db_for_write(Item)]
+    if conn.vendor == "sqlite" and conn.Database.sqlite_version_info >= (3, 35, 0):
+        ganados = _claim_returning(conn, n, qs, nuevo_estado, desde)
+        if ganados:
+            bump_version()
+        return list(Item.objects.filter(pk__in=ganados).order_by("code"))
+
+    ganados = []
+    vistos = set()
+    while len(ganados) < n:
+        ids = [pk for pk in qs.exclude(pk__in=vistos).values_list("pk", flat=True)[:max(CANDIDATOS, n)]]
+        if not ids:
+            break
+        for pk in ids:
+            vistos.add(pk)
+            if Item.objects.filter(pk=pk, estado__in=desde).update(estado=nuevo_estado) == 1:
+                ganados.append(pk)
+                if len(ganados) >= n:
+                    break
+    if ganados:
+        bump_version()
+    return list(Item.objects.filter(pk__in=ganados).order_by("code"))
+
+
+def claim_item(tipo=None, item_id=None, code=None,
+               nuevo_estado=EstadoItem.EN_USO, desde=(EstadoItem.DISPONIBLE,)):
+    """Reclama un ítem (el primero por código) o devuelve None si no hay."""
+    items = claim_items(1, tipo=tipo, item_id=item_id, code=code, nuevo_estado=nuevo_estado, desde=desde)
+    return items[0] if items else None
@@ -0,0 +1,241 @@
+# core/analytics.py
+# Motor columnar (opcional) para los KPIs del dashboard.
+# Mantiene los préstamos cerrados como arrays NumPy (una columna por atributo),
+# cargados una sola vez y ampliados incrementalmente; cualquier combinación de
+# filtros (días, tipo, nivel, carrera, año) se resuelve con máscaras y bincount.
+# Las columnas se publican juntas (una tupla, una sola asignación): un lector que
+# toma `self.cols` ve todas del mismo largo aunque otro hilo esté refrescando.
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .inventory import current_version
+from .models import Prestamo, PrestamoArchivado, UsoDiario, Item, TipoItem, Turno, Nivel, CarreraSup
+
+TIPOS = [k for k, _ in TipoItem.choices]
+TURNOS = [k for k, _ in Turno.choices]
+NIVELES = [k for k, _ in Nivel.choices]
+CARRERAS = [None] + [k for k, _ in CarreraSup.choices]  # 0 = sin carrera
+
+_TIPO_IDX = {k: i for i, k in enumerate(TIPOS)}
+_TURNO_IDX = {k: i for i, k in enumerate(TURNOS)}
+_NIVEL_IDX = {k: i for i, k in enumerate(NIVELES)}
+_CARRERA_IDX = {k: i for i, k in enumerate(CARRERAS)}
+
+_FIELDS = ("id", "item_id", "item__tipo", "turno", "nivel", "carrera", "anio",
+           "inicio", "fin_real", "duracion_horas", "fin_prevista")
+
+
+def _epoch(d):
+    return d.timestamp() if d is not None else np.nan
+
+
+_DTYPES = {"id": np.int64, "item": np.int32, "tipo": np.int8, "turno": np.int8, "nivel": np.int8,
+           "carrera": np.int8, "anio": np.int8, "inicio": np.float64, "fin": np.float64,
+           "dur": np.float64, "late": bool}
+Columnas = namedtuple("Columnas", list(_DTYPES))
+
+
+def _vacias():
+    return Columnas(*(np.empty(0, dtype=t) for t in _DTYPES.values()))
+
+
+class LoanColumns:
+    """
+    Préstamos cerrados en formato columnar (`cols`: índice denso del ítem, tipo,
+    turno, nivel, carrera, año 0 = sin año, inicio/fin en epoch, horas con NaN
+    si falta, tardía).
+    refresh() no consulta la BD mientras no cambie la versión del inventario
+    (core/inventory.py; la suben los guardados/borrados de Prestamo y los UPDATE
+    de cierre/archivo). Si cambió, agrega sólo lo nuevo (ids mayores o cerrados
+    desde la última marca) y compara cantidad y horas con la BD; si no
+    coinciden (cierres retroactivos, borrados, ediciones de duración) recarga
+    todo. Cada ANALYTICS_RELOAD_SECONDS recarga igual (ediciones de turno/nivel).
+    """
+
+    def __init__(self, min_interval=None):
+        if min_interval is None:
+            min_interval = getattr(settings, "ANALYTICS_REFRESH_SECONDS", 5)
+        self.min_interval = float(min_interval)
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+        self._version = None
+        self.codes = {}        # item_id -> code
+        self.item_pos = {}     # item_id -> índice denso
+        self.item_ids = []     # índice denso -> item_id
+        self.item_tipo = []    # índice denso -> índice de tipo
+        self.cols = _vacias()
+        self._max_id = 0
+        self._max_fin = None
+
+    def __len__(self):
+        return int(self.cols.id.size)
+
+    # ---------- carga ----------
+    def _columns_from_rows(self, rows):
+        n = len(rows)
+        cols = {k: np.empty(n, dtype=t) for k, t in _DTYPES.items()}
+        for i, (pk, item_id, tipo, turno, nivel, carrera, anio, inicio, fin, dur, prev) in enumerate(rows):
+            pos = self.item_pos.get(item_id)
+            if pos is None:
+                pos = self.item_pos[item_id] = len(self.item_ids)
+                self.item_ids.append(item_id)
+                self.item_tipo.append(_TIPO_IDX.get(tipo, -1))
+            cols["id"][i] = pk
+            cols["item"][i] = pos
+            cols["tipo"][i] = _TIPO_IDX.get(tipo, -1)
+            cols["turno"][i] = _TURNO_IDX.get(turno, -1)
+            cols["nivel"][i] = _NIVEL_IDX.get(nivel, -1)
+            cols["carrera"][i] = _CARRERA_IDX.get(carrera, 0)
+            cols["anio"][i] = anio or 0
+            cols["inicio"][i] = _epoch(inicio)
+            cols["fin"][i] = _epoch(fin)
+            cols["dur"][i] = float(dur) if dur is not None else np.nan
+            cols["late"][i] = prev is not None and fin > prev
+        return cols
+
+    def _publicar(self, base, rows):
+        """Publica `base` + `rows` en una sola asignación (los lectores no toman el lock)."""
+        if not rows:
+            self.cols = base
+            return
+        nuevas = self._columns_from_rows(rows)
+        self.cols = Columnas(*(np.concatenate([getattr(base, k), nuevas[k]]) for k in _DTYPES))
+        self._max_id = max(self._max_id, int(nuevas["id"].max()))
+        mx = max(r[8] for r in rows)
+        if self._max_fin is None or mx > self._max_fin:
+            self._max_fin = mx
+
+    def _load_codes(self):
+        self.codes = dict(Item.objects.values_list("id", "code"))
+
+    def _huella(self):
+        """(cantidad, horas) de los cerrados en la BD: tabla caliente + rollups archivados."""
+        caliente = Prestamo.objects.filter(fin_real__isnull=False).aggregate(n=Count("id"), h=Sum("duracion_horas"))
+        archivo = UsoDiario.objects.aggregate(n=Sum("prestamos"), h=Sum("horas"))
+        return ((caliente["n"] or 0) + (archivo["n"] or 0),
+                float(caliente["h"] or 0) + float(archivo["h"] or 0))
+
+    def reload(self):
+        with self._lock:
+            self._version = current_version()  # antes de leer: un cambio durante la carga se vuelve a ver
+            self._load_codes()
+            # También los archivados (core/archive.py): la ventana puede ir más atrás que el horizonte
+            rows = []
+            for model in (PrestamoArchivado, Prestamo):
+                qs = model.objects.filter(fin_real__isnull=False).order_by("id").values_list(*_FIELDS)
+                rows.extend(qs.iterator(chunk_size=5000))
+            self._max_id, self._max_fin = 0, None
+            self._publicar(_vacias(), rows)
+            self._checked_at = self._loaded_at = time.monotonic()
+
+    def refresh(self, force=False):
+        ahora = time.monotonic()
+        if not force and ahora - self._checked_at < self.min_interval:
+            return
+        if not len(self) or ahora - self._loaded_at > getattr(settings, "ANALYTICS_RELOAD_SECONDS", 3600):
+            return self.reload()
+        v = current_version()
+        if v == self._version:
+            self._checked_at = ahora
+            return
+        with self._lock:
+            self._version = v
+            cond = Q(id__gt=self._max_id)
+            if self._max_fin is not None:
+                cond |= Q(fin_real__gte=self._max_fin)
+            rows = list(Prestamo.objects.filter(cond, fin_real__isnull=False)
+                        .order_by("id").values_list(*_FIELDS))
+            cols = self.cols
+            known = np.isin(np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows)), cols.id)
+            nuevos = [r for r, k in zip(rows, known) if not k]
+            if any(r[1] not in self.codes for r in nuevos):
+                self._load_codes()
+            self._publicar(cols, nuevos)
+            n, horas = self._huella()
+            self._checked_at = time.monotonic()
+        if n != len(self) or abs(horas - float(np.nansum(self.cols.dur))) > 0.01:
+            # Cierres con fecha retroactiva, borrados o ediciones: recarga completa
+            self.reload()
+
+    # ---------- consultas ----------
+    def mask(self, since=None, tipo=None, nivel=None, carrera=None, anio=None, cols=None):
+        c = self.cols if cols is None else cols
+        m = np.ones(c.id.size, dtype=bool)
+        if since is not None:
+            m &= c.fin >= since.timestamp()
+        if tipo in _TIPO_IDX:
+            m &= c.tipo == _TIPO_IDX[tipo]
+        if nivel in _NIVEL_IDX:
+            m &= c.nivel == _NIVEL_IDX[nivel]
+            if nivel == Nivel.SUPERIOR:
+                if carrera in _CARRERA_IDX and carrera is not None:
+                    m &= c.carrera == _CARRERA_IDX[carrera]
+                if anio in {"1", "2"}:
+                    m &= c.anio == int(anio)
+        return m
+
+    def kpis(self, days=30, tipo=None, nivel=None, carrera=None, anio=None, now=None):
+        """Mismo contrato que la respuesta de KPIs (salvo en_mantenimiento)."""
+        now = now or timezone.now()
+        since = now - timezone.timedelta(days=days)
+        c = self.cols  # una sola lectura: todas las columnas del mismo refresh
+        m = self.mask(since, tipo, nivel, carrera, anio, cols=c)
+        dur = np.nan_to_num(c.dur[m])
+
+        por_item = np.bincount(c.item[m], weights=dur, minlength=len(self.item_ids))
+        presentes = np.bincount(c.item[m], minlength=len(self.item_ids)) > 0
+        orden = [i for i in np.argsort(-por_item, kind="stable") if presentes[i]][:5]
+        top = []
+        for pos in orden:
+            item_id = self.item_ids[pos]
+            top.append({"item__code": self.codes.get(item_id, str(item_id)),
+                        "item__tipo": TIPOS[self.item_tipo[pos]], "horas": round(float(por_item[pos]), 2)})
+
+        tipos = c.tipo[m]
+        por_tipo = np.bincount(tipos, weights=dur, minlength=len(TIPOS))
+        cnt_tipo = np.bincount(tipos, minlength=len(TIPOS))
+        horas_por_tipo = {TIPOS[i]: round(float(por_tipo[i]), 2) for i in range(len(TIPOS)) if cnt_tipo[i]}
+
+        por_turno = np.bincount(c.turno[m], weights=dur, minlength=len(TURNOS))
+        uso_por_turno = {TURNOS[i]: round(float(por_turno[i]), 2) for i in range(len(TURNOS))}
+
+        validos = ~np.isnan(c.dur[m])
+        promedio = float(c.dur[m][validos].mean()) if validos.any() else 0.0
+
+        return {
+            "top_items": top,
+            "uso_por_turno": uso_por_turno,
+            "horas_por_tipo": horas_por_tipo,
+            "promedio_duracion": round(promedio, 2),
+            "devoluciones_tardias": int(c.late.sum()),
+        }
+
+
+_ENGINE = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def get_engine():
+    global _ENGINE
+    if _ENGINE is None:
+        with _ENGINE_LOCK:
+            if _ENGINE is None:
+                _ENGINE = LoanColumns()
+    _ENGINE.refresh()
+    return _ENGINE
+
+
+def reset_engine():
+    global _ENGINE
+    _ENGINE = None
+
+
+def columnar_enabled():
+    return getattr(settings, "ANALYTICS_ENGINE", "sql") == "columnar"
@@ -3,4 +3,5 @@ class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
     def ready(self):
-        import core.signals  # noqa
\ No newline at end of file
+        import core.signals  # noqa
+        import core.caching  # noqa (system check del cache compartido)
\ No newline at end of file
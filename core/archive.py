@@ -0,0 +1,157 @@
+# core/archive.py
+# Particionado caliente/frío del historial de préstamos.
+# Prestamo queda con lo abierto y lo reciente; `manage.py archivar` mueve los
+# cerrados hace más de ARCHIVE_AFTER_DAYS a PrestamoArchivado (mismo id), por
+# lotes y en una transacción por lote, después de sumarlos a UsoDiario.
+# Lecturas:
+#   - KPIs y reportes: si la ventana llega más atrás que el horizonte, suman
+#     UsoDiario (granularidad de día) a lo que sale de la tabla caliente.
+#   - Export: une (UNION ALL) la tabla de archivo.
+# Nada archivado puede ser más nuevo que now - ARCHIVE_AFTER_DAYS, así que
+# saber si hace falta el archivo no cuesta ninguna consulta.
+import datetime as dt
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Prestamo, PrestamoArchivado, UsoDiario
+from .inventory import bump_version
+
+LOTE = 5000
+_CAMPOS = [f.attname for f in PrestamoArchivado._meta.concrete_fields if f.name != "archivado"]
+_CLAVE = ("dia", "item_id", "turno", "nivel", "carrera", "anio")
+_TARDIAS_KEY = "archivo:tardias"
+TARDIAS_TTL = 3600  # si archivó otro proceso (cron), el total se ve a lo sumo una hora tarde
+
+
+def horizonte_dias():
+    return getattr(settings, "ARCHIVE_AFTER_DAYS", 365)
+
+
+def corte(now=None):
+    """Los préstamos cerrados antes de esto se pueden archivar."""
+    return (now or timezone.now()) - dt.timedelta(days=horizonte_dias())
+
+
+def alcanza(desde):
+    """¿Una consulta desde `desde` (None = todo) puede necesitar datos archivados?"""
+    return desde is None or desde < corte()
+
+
+def _dia(d):
+    return timezone.localtime(d).date()
+
+
+def inicio_del_dia(d):
+    """Medianoche local de `d`: el corte que entienden los rollups (un día es la unidad de UsoDiario)."""
+    return timezone.localtime(d).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+# ---------- Escritura ----------
+def _rollup(filas):
+    acc = defaultdict(lambda: [0, 0, Decimal("0"), 0])
+    for f in filas:
+        a = acc[(_dia(f["fin_real"]),) + tuple(f[k] for k in _CLAVE[1:])]
+        a[0] += 1
+        if f["duracion_horas"] is not None:
+            a[1] += 1
+            a[2] += f["duracion_horas"]
+        if f["fin_prevista"] is not None and f["fin_real"] > f["fin_prevista"]:
+            a[3] += 1
+    return acc
+
+
+def _sumar_rollup(acc):
+    dias = {k[0] for k in acc}
+    existentes = {tuple(getattr(u, c) for c in _CLAVE): u
+                  for u in UsoDiario.objects.filter(dia__gte=min(dias), dia__lte=max(dias),
+                                                    item_id__in={k[1] for k in acc})}
+    nuevos, cambiados = [], []
+    for clave, (n, nd, h, t) in acc.items():
+        u = existentes.get(clave)
+        if u is None:
+            nuevos.append(UsoDiario(**dict(zip(_CLAVE, clave)), prestamos=n, con_duracion=nd, horas=h, tardias=t))
+            continue
+        u.prestamos += n; u.con_duracion += nd; u.horas += h; u.tardias += t
+        cambiados.append(u)
+    UsoDiario.objects.bulk_create(nuevos)
+    UsoDiario.objects.bulk_update(cambiados, ["prestamos", "con_duracion", "horas", "tardias"])
+
+
+def archivar_lote(hasta, lote=LOTE):
+    """Archiva hasta `lote` préstamos cerrados antes de `hasta`; devuelve cuántos."""
+    with transaction.atomic():
+        filas = list(Prestamo.objects.filter(fin_real__lt=hasta).order_by("id").values(*_CAMPOS)[:lote])
+        if not filas:
+            return 0
+        ahora = timezone.now()
+        _sumar_rollup(_rollup(filas))
+        PrestamoArchivado.objects.bulk_create([PrestamoArchivado(**f, archivado=ahora) for f in filas])
+        Prestamo.objects.filter(id__in=[f["id"] for f in filas]).delete()
+    return len(filas)
+
+
+def archivar(now=None, lote=LOTE, log=None):
+    """Archiva todo lo cerrado antes del horizonte, lote por lote."""
+    hasta = corte(now)
+    total = 0
+    while True:
+        n = archivar_lote(hasta, lote)
+        if not n:
+            break
+        total += n
+        if log:
+            log(f"{total} préstamos archivados…")
+    if total:
+        cache.delete(_TARDIAS_KEY)
+        bump_version()
+    return total
+
+
+# ---------- Lectura ----------
+def uso_diario(desde=None, hasta=None, tipo=None, nivel=None, carrera=None, anio=None):
+    """Rollups archivados con fin_real en [desde, hasta) (por día local) y los filtros de KPIs."""
+    qs = UsoDiario.objects.all()
+    if desde is not None:
+        qs = qs.filter(dia__gte=_dia(desde))
+    if hasta is not None:
+        qs = qs.filter(dia__lt=_dia(hasta))
+    if tipo:
+        qs = qs.filter(item__tipo=tipo)
+    if nivel:
+        qs = qs.filter(nivel=nivel)
+        if carrera:
+            qs = qs.filter(carrera=carrera)
+        if anio:
+            qs = qs.filter(anio=int(anio))
+    return qs
+
+
+def tardias():
+    """Devoluciones tardías archivadas (total histórico; sólo cambia al archivar)."""
+    n = cache.get(_TARDIAS_KEY)
+    if n is None:
+        n = UsoDiario.objects.aggregate(t=Sum("tardias"))["t"] or 0
+        cache.set(_TARDIAS_KEY, n, TARDIAS_TTL)
+    return n
+
+
+def kpis(since, tipo=None, nivel=None, carrera=None, anio=None):
+    """Parciales de KPIs del archivo: horas por ítem/tipo/turno y totales para el promedio."""
+    qs = uso_diario(since, tipo=tipo, nivel=nivel, carrera=carrera, anio=anio)
+    out = {"por_item": {}, "por_tipo": defaultdict(float), "por_turno": defaultdict(float), "n": 0, "horas": 0.0}
+    for r in (qs.values("item__code", "item__tipo", "turno")
+                .annotate(h=Sum("horas"), n=Sum("con_duracion")).order_by()):
+        h = float(r["h"] or 0)
+        clave = (r["item__code"], r["item__tipo"])
+        out["por_item"][clave] = out["por_item"].get(clave, 0.0) + h
+        out["por_tipo"][r["item__tipo"]] += h
+        out["por_turno"][r["turno"]] += h
+        out["n"] += r["n"] or 0
+        out["horas"] += h
+    return out
@@ -0,0 +1,219 @@
+# core/bot_data.py
+# Capa de datos del bot de Discord (sin depender de discord.py).
+# sync_to_async por defecto es thread_sensitive: todo el ORM del bot corría en
+# un único hilo y los comandos de una clase entera se atendían de a uno. Acá
+# cada helper corre en un pool acotado de hilos (thread_sensitive=False), cada
+# hilo con su conexión, cerrada/renovada según CONN_MAX_AGE entre tareas.
+# Los perfiles vinculados se cachean en memoria con TTL (is_linked() ya no
+# consulta la BD antes de cada comando).
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Item, Prestamo, Reserva, Profile, EstadoItem, DiscordLinkToken
+from .discord import send_discord
+from .allocation import claim_item
+from .inventory import state as inventory_state, complete
+
+POOL = ThreadPoolExecutor(max_workers=getattr(settings, "DISCORD_BOT_DB_WORKERS", 8),
+                          thread_name_prefix="bot-db")
+
+
+def db_task(fn):
+    """Convierte un helper sync de ORM en corrutina que corre en POOL."""
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False, executor=POOL)
+
+
+# send_discord escribe en el outbox (BD): desde el loop async va por el pool
+notify_discord = db_task(send_discord)
+
+
+def _perfil_dict(p):
+    return {
+        "user_username": p.user.username,
+        "full_name": p.user.get_full_name(),
+        "nivel": p.nivel,
+        "carrera": p.carrera,
+        "anio": p.anio,
+        "discord_user_id": p.discord_user_id,
+    }
+
+
+@db_task
+def get_perfil_dict_by_discord_sync(discord_id):
+    p = Profile.objects.select_related("user").filter(discord_user_id=str(discord_id)).first()
+    return _perfil_dict(p) if p else None
+
+
+class ProfileCache:
+    """
+    discord_id -> perfil (dict) con TTL. Los no vinculados se cachean menos
+    tiempo (pueden vincularse desde la web en cualquier momento). Pedidos
+    simultáneos del mismo id comparten una sola consulta.
+    """
+
+    def __init__(self, ttl=None, ttl_negativo=None, loader=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, "DISCORD_PROFILE_TTL", 300)
+        self.ttl_negativo = ttl_negativo if ttl_negativo is not None else min(self.ttl, 30)
+        self.loader = loader or get_perfil_dict_by_discord_sync
+        self._datos = {}
+        self._en_curso = {}
+
+    async def get(self, discord_id):
+        key = str(discord_id)
+        hit = self._datos.get(key)
+        if hit and hit[0] > time.monotonic():
+            return hit[1]
+        fut = self._en_curso.get(key)
+        if fut is None:
+            fut = self._en_curso[key] = asyncio.ensure_future(self.loader(key))
+            try:
+                perfil = await fut
+            finally:
+                self._en_curso.pop(key, None)
+            self._datos[key] = (time.monotonic() + (self.ttl if perfil else self.ttl_negativo), perfil)
+            return perfil
+        return await asyncio.shield(fut)
+
+    def invalidate(self, discord_id=None):
+        if discord_id is None:
+            self._datos.clear()
+        else:
+            self._datos.pop(str(discord_id), None)
+
+
+perfiles = ProfileCache()
+
+
+@db_task
+def link_user_by_token_sync(token: str, discord_user_id: int):
+    # Ya vinculado
+    p = Profile.objects.select_related("user").filter(discord_user_id=str(discord_user_id)).first()
+    if p:
+        return ("already", p.user.username)
+
+    tok = (DiscordLinkToken.objects
+           .filter(token=token, used_at__isnull=True)
+           .select_related("user").order_by("-created_at").first())
+    if not tok:
+        return ("bad", None)
+
+    prof, _ = Profile.objects.get_or_create(user=tok.user)  # <— acá aseguramos que exista
+    if prof.discord_user_id and prof.discord_user_id != str(discord_user_id):
+        return ("user_has_other", tok.user.username)
+
+    prof.discord_user_id = str(discord_user_id)
+    prof.save(update_fields=["discord_user_id"])
+    tok.used_at = timezone.now()
+    tok.save(update_fields=["used_at"])
+    return ("ok", tok.user.username)
+
+@db_task
+def get_available_codes_sync(tipo: str) -> list[str]:
+    return inventory_state.available_codes(tipo)
+
+@db_task
+def has_active_reserva_or_prestamo_sync(discord_user_id: int) -> bool:
+    # Bloquear múltiples reservas simultáneas del mismo usuario
+    return Reserva.objects.filter(discord_user_id=str(discord_user_id), estado="activa").exists()
+
+@db_task
+def reserve_first_available_sync(tipo: str, nivel: str, turno: str,
+                                 aula: str, solicitante_username: str, discord_user_id: str,
+                                 expira) -> str | None:
+    with transaction.atomic():
+        it = claim_item(tipo=tipo, nuevo_estado=EstadoItem.RESERVADO)
+        if not it:
+            return None
+        Reserva.objects.create(
+            item=it, tipo=tipo, nivel=nivel, turno=turno,
+            aula=aula, solicitante=solicitante_username,
+            discord_user_id=str(discord_user_id),
+            expira=expira, estado="activa"
+        )
+    return it.code
+
+@db_task
+def start_prestamo_sync(code: str, perfil: dict, turno: str, aula: str):
+    # El código se resuelve en el índice (sin distinguir mayúsculas); el estado se lee fresco
+    found = inventory_state.lookup(code)
+    it = Item.objects.filter(pk=found.pk).first() if found else None
+    if it is None:
+        return {"error": "noexist"}
+    if it.estado == EstadoItem.EN_USO:
+        return {"error": "inuse"}
+
+    res = Reserva.objects.filter(item=it, estado="activa").order_by("-inicio").first()
+    if res and (res.discord_user_id and res.discord_user_id != (perfil.get("discord_user_id") or "")):
+        return {"error": "reserved"}
+
+    with transaction.atomic():
+        # Reclamo atómico: si otro pedido lo pasó a EN_USO en el medio, no hay doble préstamo
+        claimed = claim_item(item_id=it.id, nuevo_estado=EstadoItem.EN_USO,
+                             desde=(EstadoItem.DISPONIBLE, EstadoItem.RESERVADO, EstadoItem.MANTENIMIENTO))
+        if not claimed:
+            return {"error": "inuse"}
+        if res:
+            res.transicion("convertida")  # condicional: si el cron la expiró en el medio, queda expirada
+
+        solicitante = perfil["user_username"]  # SIEMPRE username
+        p = Prestamo.objects.create(
+            item=claimed, nivel=perfil["nivel"],
+            carrera=perfil["carrera"] or None, anio=perfil["anio"] or None,
+            turno=turno, aula=aula, solicitante=solicitante, fin_prevista=None
+        )
+    return {"ok": True, "nivel_disp": p.get_nivel_display(), "turno_disp": p.get_turno_display()}
+
+@db_task
+def entregar_prestamo_sync(code: str):
+    it = inventory_state.lookup(code)
+    try:
+        p = Prestamo.objects.filter(item_id=it.pk if it else None, fin_real__isnull=True).latest("inicio")
+    except Prestamo.DoesNotExist:
+        return {"error": "noactive"}
+    p.cerrar()
+    return {"ok": True, "dur": float(p.duracion_horas or 0)}
+
+@db_task
+def activos_list_sync() -> list[str]:
+    qs = inventory_state.active_loans(limit=10)
+    return [
+        f"- {p.item.code} · {p.get_nivel_display()} {p.get_turno_display()} · {p.solicitante or 'N/D'} · {p.inicio.astimezone().strftime('%H:%M')}"
+        for p in qs
+    ]
+
+_refresh_inventory = db_task(inventory_state.snapshot)
+
+
+async def complete_codes(prefijo, estados=None, limit=25):
+    """
+    Autocompletado de códigos para los slash commands. Con el índice vigente
+    (caso normal: una lectura del cache por tecla) no toca la BD ni el pool.
+    """
+    snap = inventory_state.fresh() or await _refresh_inventory()
+    return [it.code for it in complete(snap, prefijo, estados, limit)]
+
+
+@db_task
+def status_sync(code: str):
+    it = inventory_state.lookup(code)
+    if it is None:
+        return {"error": "noexist"}
+    out = {"code": code, "tipo": it.get_tipo_display(), "estado": it.get_estado_display(), "extra": ""}
+    p = inventory_state.active_loan_for(it.id)
+    if it.estado == EstadoItem.EN_USO and p:
+        out["extra"] = f" · En uso desde {p.inicio.astimezone().strftime('%d/%m %H:%M')} · {p.solicitante or 'N/D'}"
+    return out
@@ -0,0 +1,249 @@
+# core/bot_harness.py
+# Banco de pruebas local del bot de Discord: ejecuta los callbacks de los slash
+# commands de discord_bot.py con Interaction falsas (sin conexión a Discord) y
+# un webhook HTTP local para los avisos. Lo usan los tests y `manage.py bench_bot`.
+import asyncio
+import itertools
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubWebhook:
+    """Webhook local: guarda los posts y responde con los códigos encolados en `respuestas`."""
+
+    def __init__(self):
+        self.posts = []
+        self.respuestas = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                status = stub.respuestas.pop(0) if stub.respuestas else 204
+                if status < 300:
+                    stub.posts.append(json.loads(body)["content"])
+                self.send_response(status)
+                payload = json.dumps({"retry_after": 0.05}).encode() if status == 429 else b""
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/webhook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# ---------- Interaction falsa ----------
+class FakeUser:
+    def __init__(self, id, name=None):
+        self.id = id
+        self.name = name or f"user{id}"
+
+
+class _Response:
+    def __init__(self, inter):
+        self._inter = inter
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def defer(self, ephemeral=False, **kwargs):
+        self._done = True
+
+    async def send_message(self, content=None, ephemeral=False, **kwargs):
+        self._done = True
+        self._inter.mensajes.append(content)
+
+    async def autocomplete(self, choices):
+        self._done = True
+        self._inter.choices = choices
+
+
+class _Followup:
+    def __init__(self, inter):
+        self._inter = inter
+
+    async def send(self, content=None, ephemeral=False, **kwargs):
+        self._inter.mensajes.append(content)
+
+
+class FakeInteraction:
+    """Lo mínimo de discord.Interaction que usan los comandos; guarda las respuestas."""
+
+    def __init__(self, user_id, name=None, guild_id=1):
+        self.user = FakeUser(user_id, name)
+        self.guild_id = guild_id
+        self.mensajes = []
+        self.choices = None
+        self.response = _Response(self)
+        self.followup = _Followup(self)
+
+    @property
+    def reply(self):
+        return self.mensajes[-1] if self.mensajes else None
+
+
+def _bot():
+    # Importa discord.py recién acá: StubWebhook se usa sin tenerlo instalado
+    from core.management.commands import discord_bot
+    return discord_bot
+
+
+def choice(valor, nombre=None):
+    from discord import app_commands
+    return app_commands.Choice(name=nombre or valor, value=valor)
+
+
+async def invoke(nombre, interaction, **kwargs):
+    """Corre /<nombre> como lo haría discord.py: checks (is_linked) y después el callback."""
+    bot = _bot()
+    from discord import app_commands
+    cmd = bot.tree.get_command(nombre)
+    for check in cmd.checks:
+        if not await check(interaction):
+            await bot.tree.on_error(interaction, app_commands.CheckFailure())
+            return interaction
+    await cmd.callback(interaction, **kwargs)
+    return interaction
+
+
+async def autocomplete(nombre, parametro, interaction, actual):
+    cmd = _bot().tree.get_command(nombre)
+    cb = cmd._params[parametro].autocomplete
+    return await cb(interaction, actual)
+
+
+# ---------- Benchmark ----------
+class BotBench:
+    """
+    Dispara en paralelo /reservar, /prestar y /entregar de `usuarios` usuarios
+    vinculados contra `items` notebooks y verifica que no haya dobles asignaciones.
+    Crea ítems BENCH-NNN y usuarios benchbot_<corrida>_N; cleanup() borra sólo
+    las filas que creó esta corrida (por id) y lo que esos usuarios reservaron o
+    prestaron.
+    """
+
+    PREFIJO = "BENCH"
+
+    def __init__(self, usuarios=200, items=50):
+        self.usuarios = usuarios
+        self.items = items
+        self.latencias = {}
+        self.errores = []
+        self._ids = itertools.count(10**17)
+        self.corrida = secrets.token_hex(3)
+        self.item_ids, self.user_ids, self.usernames = [], [], []
+
+    def setup(self):
+        from django.contrib.auth.models import User
+        from core.models import Item, Profile, TipoItem, EstadoItem, Nivel
+        codes = [f"{self.PREFIJO}-{i:03d}" for i in range(self.items)]
+        if Item.objects.filter(code__in=codes).exists():
+            raise RuntimeError(f"Ya existen ítems {self.PREFIJO}-NNN (¿datos reales o una corrida que no terminó?)")
+        self.item_ids = [it.pk for it in Item.objects.bulk_create([
+            Item(code=c, tipo=TipoItem.NOTEBOOK, estado=EstadoItem.DISPONIBLE) for c in codes])]
+        if self.item_ids and self.item_ids[0] is None:  # backends sin RETURNING en bulk_create
+            self.item_ids = list(Item.objects.filter(code__in=codes).values_list("id", flat=True))
+        self.usernames = [f"benchbot_{self.corrida}_{i}" for i in range(self.usuarios)]
+        users = User.objects.bulk_create([User(username=u) for u in self.usernames])
+        if users[0].pk is None:
+            users = list(User.objects.filter(username__in=self.usernames))
+        self.user_ids = [u.pk for u in users]
+        self.discord_ids = [next(self._ids) for _ in users]
+        Profile.objects.bulk_create([
+            Profile(user=u, nivel=Nivel.SECUNDARIO, discord_user_id=str(d))
+            for u, d in zip(users, self.discord_ids)
+        ])
+        from core.inventory import bump_version
+        bump_version()
+
+    def cleanup(self):
+        from django.contrib.auth.models import User
+        from django.db.models import Q
+        from core.models import Item, Reserva, Prestamo
+        propias = Q(item_id__in=self.item_ids) | Q(solicitante__in=self.usernames)
+        Reserva.objects.filter(propias).delete()
+        Prestamo.objects.filter(propias).delete()
+        Item.objects.filter(id__in=self.item_ids).delete()
+        User.objects.filter(id__in=self.user_ids).delete()
+        self.item_ids, self.user_ids = [], []
+        from core.bot_data import perfiles
+        from core.inventory import bump_version
+        perfiles.invalidate()
+        bump_version()
+
+    async def _timed(self, comando, inter, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            await invoke(comando, inter, **kwargs)
+        except Exception as e:  # un comando que explota no corta el benchmark
+            self.errores.append(f"/{comando}: {e!r}")
+        self.latencias.setdefault(comando, []).append((time.perf_counter() - t0) * 1000)
+        return inter
+
+    async def _ronda(self):
+        from core.bot_data import db_task
+        nb = choice("NB", "Notebooks")
+        # 1) todos reservan a la vez (hay menos ítems que usuarios)
+        res = await asyncio.gather(*[self._timed("reservar", FakeInteraction(d), tipo=nb)
+                                     for d in self.discord_ids])
+        reservados = {}
+        for d, inter in zip(self.discord_ids, res):
+            if inter.reply and inter.reply.startswith("🔒 Reservado "):
+                reservados[d] = inter.reply.split()[2]
+        # 2) cada uno presta lo suyo y, a la vez, otro usuario intenta llevarse el mismo código
+        otros = itertools.cycle([d for d in self.discord_ids if d not in reservados] or self.discord_ids)
+        tareas = []
+        for d, code in reservados.items():
+            tareas.append(self._timed("prestar", FakeInteraction(d), code=code))
+            tareas.append(self._timed("prestar", FakeInteraction(next(otros)), code=code))
+        prestados = [i for i in await asyncio.gather(*tareas)
+                     if i.reply and i.reply.startswith("✅ Préstamo registrado")]
+        dobles = await db_task(self.dobles_asignaciones)()
+        # 3) devolución de todo lo prestado
+        await asyncio.gather(*[self._timed("entregar", FakeInteraction(d), code=code)
+                               for d, code in reservados.items()])
+        return reservados, prestados, dobles
+
+    def dobles_asignaciones(self):
+        """Ítems con más de un préstamo abierto o más de una reserva activa."""
+        from django.db.models import Count
+        from core.models import Prestamo, Reserva
+        return {
+            "prestamos": (Prestamo.objects.filter(item_id__in=self.item_ids, fin_real__isnull=True)
+                          .values("item_id").annotate(n=Count("id")).filter(n__gt=1).count()),
+            "reservas": (Reserva.objects.filter(item_id__in=self.item_ids, estado="activa")
+                         .values("item_id").annotate(n=Count("id")).filter(n__gt=1).count()),
+        }
+
+    def run(self):
+        from core.loadtest import percentiles
+        from core.models import Prestamo
+        t0 = time.perf_counter()
+        reservados, prestados, dobles = asyncio.run(self._ronda())
+        total = time.perf_counter() - t0
+        comandos = sum(len(v) for v in self.latencias.values())
+        return {
+            "usuarios": self.usuarios,
+            "items": self.items,
+            "reservados": len(reservados),
+            "prestados": len(prestados),
+            "segundos": round(total, 2),
+            "comandos_por_seg": round(comandos / total, 1) if total else None,
+            "latencia_ms": {k: percentiles(v) for k, v in self.latencias.items()},
+            "errores": self.errores[:10],
+            "n_errores": len(self.errores),
+            "dobles_asignaciones": dobles,
+            "prestamos_abiertos": Prestamo.objects.filter(item_id__in=self.item_ids, fin_real__isnull=True).count(),
+        }
@@ -0,0 +1,223 @@
+# core/bulk.py
+# Operaciones en lote (mostrador): resuelven N ítems con un número constante de
+# consultas dentro de una sola transacción, usando UPDATE con F()/Case en lugar
+# de guardar objeto por objeto.
+import re
+from decimal import Decimal
+
+from django.db import connections, router, transaction
+from django.db.models import Case, When, Value, DecimalField
+from django.utils import timezone
+
+from .models import Item, Prestamo, Reserva, EstadoItem, Nivel, Turno, acumular_uso
+from .allocation import claim_items
+from .inventory import bump_version
+
+
+def parse_codes(texto):
+    """'nb-01, NB-02\\nTB-01' -> ['NB-01', 'NB-02', 'TB-01'] (sin repetidos, en orden)."""
+    vistos = []
+    for c in re.split(r"[\s,;]+", texto or ""):
+        c = c.strip().upper()
+        if c and c not in vistos:
+            vistos.append(c)
+    return vistos
+
+
+def _horas(desde, hasta):
+    return Decimal(str(round((hasta - desde).total_seconds() / 3600, 2)))
+
+
+@transaction.atomic
+def devolver_lote(codes, cuando=None):
+    """
+    Cierra el préstamo activo (el más reciente) de cada código.
+    Devuelve {"devueltos": [(code, horas), ...], "no_encontrados": [code, ...]}.
+    """
+    cuando = cuando or timezone.now()
+    codes = [c.upper() for c in codes]
+    abiertos = (Prestamo.objects
+                .filter(item__code__in=codes, fin_real__isnull=True)
+                .order_by("item_id", "-inicio")
+                .values_list("id", "item_id", "item__code", "inicio"))
+    por_item = {}
+    for pk, item_id, code, inicio in abiertos:
+        por_item.setdefault(item_id, (pk, code, inicio))  # el más reciente por ítem
+    if not por_item:
+        return {"devueltos": [], "no_encontrados": codes}
+
+    horas = {pk: _horas(inicio, cuando) for pk, _, inicio in por_item.values()}
+    dec = DecimalField(max_digits=8, decimal_places=2)
+
+    n = Prestamo.objects.filter(pk__in=horas.keys(), fin_real__isnull=True).update(
+        fin_real=cuando, estado="devuelto",
+        duracion_horas=Case(*[When(pk=pk, then=Value(h)) for pk, h in horas.items()], output_field=dec),
+    )
+    if n < len(horas):
+        # Otra devolución cerró alguno entre la lectura y el UPDATE: sólo cuentan los que cerró éste
+        cerrados = set(Prestamo.objects.filter(pk__in=horas.keys(), fin_real=cuando).values_list("pk", flat=True))
+        por_item = {i: v for i, v in por_item.items() if v[0] in cerrados}
+    acumular_uso({item_id: horas[pk] for item_id, (pk, _, _) in por_item.items()})
+    bump_version()
+
+    devueltos = [(code, float(horas[pk])) for pk, code, _ in por_item.values()]
+    devueltos.sort()
+    encontrados = {code for code, _ in devueltos}
+    return {"devueltos": devueltos, "no_encontrados": [c for c in codes if c not in encontrados]}
+
+
+def resumen_devolucion(usuario, devueltos):
+    """Mensaje único para Discord con el resumen del lote."""
+    total = sum(h for _, h in devueltos)
+    detalle = ", ".join(f"{c} ({h} h)" for c, h in devueltos)
+    return f"📦 {usuario} registró la devolución de {len(devueltos)} ítems ({total:.2f} h): {detalle}"
+
+
+class SinDisponibilidad(Exception):
+    pass
+
+
+def _nuevo_prestamo(item, nivel, turno, **kw):
+    # bulk_create no pasa por Prestamo.save: se aplica acá la regla Superior => Noche
+    if nivel == Nivel.SUPERIOR:
+        turno = Turno.NOCHE
+    return Prestamo(item=item, nivel=nivel, turno=turno, fin_prevista=None, **kw)
+
+
+@transaction.atomic
+def prestar_lote(tipo, cantidad, nivel, turno, aula="", solicitante="", carrera=None, anio=None):
+    """
+    Presta `cantidad` ítems de un tipo a un mismo solicitante/aula (todo o nada).
+    Lanza SinDisponibilidad si no alcanzan los disponibles.
+    """
+    items = claim_items(cantidad, tipo=tipo, nuevo_estado=EstadoItem.EN_USO)
+    if len(items) < cantidad:
+        raise SinDisponibilidad(f"Sólo hay {len(items)} disponibles.")
+    ahora = timezone.now()
+    prestamos = Prestamo.objects.bulk_create([
+        _nuevo_prestamo(it, nivel, turno, aula=aula, solicitante=solicitante,
+                        carrera=carrera, anio=anio, inicio=ahora)
+        for it in items
+    ])
+    bump_version()
+    return prestamos
+
+
+@transaction.atomic
+def aprobar_reservas_lote(reserva_ids, user_aprobador):
+    """
+    Aprueba y convierte a préstamo las reservas activas indicadas.
+    Las que no tienen ítem o cuyo ítem ya no está RES/DISP quedan igual.
+    Devuelve la lista de Prestamo creados.
+    """
+    reservas = list(Reserva.objects.filter(pk__in=reserva_ids, estado="activa", item__isnull=False)
+                    .values("id", "item_id", "nivel", "turno", "aula", "solicitante"))
+    if not reservas:
+        return []
+    items = claim_items(len(reservas), item_ids=[r["item_id"] for r in reservas],
+                        nuevo_estado=EstadoItem.EN_USO,
+                        desde=(EstadoItem.RESERVADO, EstadoItem.DISPONIBLE))
+    por_id = {it.pk: it for it in items}
+    ok, vistos = [], set()
+    for r in reservas:  # una reserva por ítem reclamado
+        if r["item_id"] in por_id and r["item_id"] not in vistos:
+            vistos.add(r["item_id"])
+            ok.append(r)
+    if not ok:
+        return []
+    ahora = timezone.now()
+    n = Reserva.objects.filter(pk__in=[r["id"] for r in ok], estado="activa").update(
+        estado="convertida", aprobada_por=user_aprobador, aprobada_at=ahora)
+    if n < len(ok):
+        # Alguna se canceló/expiró/aprobó entre el SELECT y el UPDATE: sólo cuentan
+        # las que convirtió este UPDATE y sus ítems vuelven a estar libres
+        ganadas = set(Reserva.objects.filter(pk__in=[r["id"] for r in ok], estado="convertida",
+                                             aprobada_por=user_aprobador, aprobada_at=ahora)
+                      .values_list("id", flat=True))
+        perdidas = [r["item_id"] for r in ok if r["id"] not in ganadas]
+        Item.objects.filter(pk__in=perdidas, estado=EstadoItem.EN_USO).update(estado=EstadoItem.DISPONIBLE)
+        ok = [r for r in ok if r["id"] in ganadas]
+    prestamos = Prestamo.objects.bulk_create([
+        _nuevo_prestamo(por_id[r["item_id"]], r["nivel"], r["turno"],
+                        aula=r["aula"], solicitante=r["solicitante"], inicio=ahora)
+        for r in ok
+    ])
+    bump_version()
+    return prestamos
+
+
+def resumen_prestamos(titulo, prestamos):
+    codes = ", ".join(p.item.code for p in prestamos)
+    return f"✅ {titulo}: {len(prestamos)} préstamos iniciados ({codes})."
+
+
+def _actualizar_activas(ids, **campos):
+    # UPDATE ... WHERE id IN (...) AND estado = 'activa': devuelve los id que cambió
+    # esta sentencia (no los que otro dejó en el mismo estado entre el SELECT y el UPDATE)
+    conn = connections[router.db_for_write(Reserva)]
+    if conn.vendor == "postgresql" or (conn.vendor == "sqlite"
+                                       and conn.Database.sqlite_version_info >= (3, 35, 0)):
+        campos_sql, params = [], []
+        for nombre, valor in campos.items():
+            f = Reserva._meta.get_field(nombre)
+            campos_sql.append(f"{conn.ops.quote_name(f.column)} = %s")
+            params.append(f.get_db_prep_save(valor, conn))
+        table = conn.ops.quote_name(Reserva._meta.db_table)
+        sql = (f"UPDATE {table} SET {', '.join(campos_sql)} "
+               f"WHERE id IN ({', '.join(['%s'] * len(ids))}) AND estado = %s RETURNING id")
+        with conn.cursor() as cur:
+            cur.execute(sql, [*params, *ids, "activa"])
+            return {row[0] for row in cur.fetchall()}
+    # Sin RETURNING: una sentencia por reserva; cuenta la que afectó su fila
+    return {pk for pk in ids if Reserva.objects.filter(pk=pk, estado="activa").update(**campos)}
+
+
+def _cerrar_reservas(qs, **campos):
+    # SELECT de lo afectado (para el aviso) + UPDATE de reservas + UPDATE de ítems
+    filas = list(qs.values_list("id", "item_id", "item__code", "tipo"))
+    if not filas:
+        return []
+    hechas = _actualizar_activas([f[0] for f in filas], **campos)
+    # Un operador pudo aprobar/cancelar alguna en el medio (y su ítem ya estar
+    # reservado de nuevo): sólo se liberan y avisan las que cerró este UPDATE
+    filas = [f for f in filas if f[0] in hechas]
+    item_ids = [f[1] for f in filas if f[1]]
+    if item_ids:
+        Item.objects.filter(pk__in=item_ids, estado=EstadoItem.RESERVADO).update(estado=EstadoItem.DISPONIBLE)
+    return [code or tipo for _, _, code, tipo in filas]
+
+
+@transaction.atomic
+def expirar_reservas(now=None, hora_corte=23):
+    """
+    Expira las reservas activas vencidas y, desde `hora_corte` (hora local),
+    cancela todas las que sigan activas. Devuelve las etiquetas afectadas:
+    {"expiradas": [...], "canceladas": [...]}.
+    """
+    now = now or timezone.now()
+    expiradas = _cerrar_reservas(Reserva.objects.filter(estado="activa", expira__lte=now),
+                                 estado="expirada")
+    canceladas = []
+    if timezone.localtime(now).hour >= hora_corte:
+        canceladas = _cerrar_reservas(Reserva.objects.filter(estado="activa"),
+                                      estado="cancelada", cancelada_por=None, cancelada_at=now,
+                                      cancel_motivo=f"Auto-cancel {hora_corte}:00")
+    if expiradas or canceladas:
+        bump_version()
+    return {"expiradas": expiradas, "canceladas": canceladas}
+
+
+def _lista_corta(etiquetas, maximo=30):
+    extra = len(etiquetas) - maximo
+    texto = ", ".join(etiquetas[:maximo])
+    return texto + (f" y {extra} más" if extra > 0 else "")
+
+
+def resumen_expiracion(res):
+    """Un único mensaje con todo lo expirado/cancelado en la corrida (o None)."""
+    partes = []
+    if res["expiradas"]:
+        partes.append(f"⏰ Reservas expiradas ({len(res['expiradas'])}): {_lista_corta(res['expiradas'])}")
+    if res["canceladas"]:
+        partes.append(f"🌙 Reservas canceladas por horario ({len(res['canceladas'])}): {_lista_corta(res['canceladas'])}")
+    return "\n".join(partes) or None
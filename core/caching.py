@@ -0,0 +1,38 @@
+# core/caching.py
+# Cache compartido entre procesos (workers web, bot de Discord, cron). Las
+# versiones del índice de inventario (core/inventory.py) y de roles/perfil en la
+# sesión (core/roles.py), y el estado del chat (core/chat_state.py), sólo llegan
+# a todos los procesos si el cache lo ven todos: CACHE_URL con Redis, Memcached
+# o un directorio (filecache). LocMem es por proceso: desarrollo y tests.
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Warning, register
+
+# (setting con el alias, para qué se usa)
+USOS = [
+    ("INVENTORY_CACHE_ALIAS", "versión del índice de inventario"),
+    (None, "versión de roles/perfil (sin ella se leen de la BD en cada request)"),
+    ("CHAT_STATE_CACHE_ALIAS", "conversación del chat (sin ella va en una cookie firmada)"),
+]
+
+
+def compartido(alias="default"):
+    """True si el cache `alias` lo ven todos los procesos (no LocMem ni Dummy)."""
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+@register()
+def check_cache_compartido(app_configs, **kwargs):
+    avisos = []
+    for setting, uso in USOS:
+        alias = getattr(settings, setting, "default") if setting else "default"
+        if not compartido(alias):
+            avisos.append(Warning(
+                f"El cache '{alias}' es por proceso: la {uso} no se comparte "
+                "entre workers, bot y cron.",
+                hint="Configurar CACHE_URL (p.ej. redis://127.0.0.1:6379/1 o filecache:///var/tmp/esim_cache).",
+                id="core.W001",
+            ))
+    return avisos
@@ -0,0 +1,429 @@
+# core/chat.py
+# Chat asistente (solo logueados) como router de intenciones dirigido por tabla:
+# - patrones precompilados y un trie de palabras clave sobre el texto normalizado
+# - máquina de estados explícita para los flujos de reserva y devolución
+# - ChatContext trae las reservas/préstamos activos del usuario como mucho una
+#   vez por turno (cada intención declara cuántas consultas puede hacer)
+import json
+import re
+import unicodedata
+import datetime as dt
+from functools import cached_property
+
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+
+from .models import (
+    Prestamo, Item, Turno, EstadoItem, Nivel,
+    Reserva, CarreraSup, AnioSup
+)
+from .allocation import claim_item
+from .chat_state import ChatStateStore
+from .inventory import state as inventory_state
+
+
+def _now():
+    return timezone.localtime()
+
+def _expira_2300(dtref=None):
+    dtref = dtref or _now()
+    exp = dtref.replace(hour=23, minute=0, second=0, microsecond=0)
+    if dtref > exp:
+        exp = exp + dt.timedelta(days=1)
+    return exp
+
+def _infer_turno(dtref=None):
+    dtref = dtref or _now()
+    t = dtref.time()
+    if dt.time(6,0) <= t <= dt.time(12,0):
+        return Turno.MANANA
+    if dt.time(13,0) <= t <= dt.time(17,0):
+        return Turno.TARDE
+    if dt.time(17,15) <= t <= dt.time(23,0):
+        return Turno.NOCHE
+    return Turno.NOCHE
+
+def _norm(s):
+    s = (s or '').lower().strip()
+    s = ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn')
+    return s
+
+def _parse_nivel(s):
+    s = _norm(s)
+    if s.startswith('sup'): return Nivel.SUPERIOR
+    if s.startswith('per') or 'docente' in s: return Nivel.PERSONAL
+    return Nivel.SECUNDARIO
+
+def _parse_turno(s):
+    s = _norm(s)
+    if s.startswith('man'): return Turno.MANANA
+    if s.startswith('tar'): return Turno.TARDE
+    if s.startswith('noc'): return Turno.NOCHE
+    return None
+
+def _parse_carrera(s):
+    s = _norm(s)
+    if s.startswith('tcd'): return CarreraSup.TCD
+    if s.startswith('pte') or 'prof' in s: return CarreraSup.PTEC
+    return None
+
+def _parse_anio(s):
+    s = _norm(s)
+    if s.startswith('1'): return AnioSup.PRIMERO
+    if s.startswith('2'): return AnioSup.SEGUNDO
+    return None
+
+def _suggestions(base=None):
+    return base or ["Menú","Mis reservas","Mis préstamos","Reservar NB-01","Devolver NB-01","Cancelar reserva"]
+
+def _menu_text():
+    return (
+        "Opciones rápidas:\n"
+        "• Reservar NB-01 (o cualquier código)\n"
+        "• Devolver NB-01\n"
+        "• Mis reservas | Mis préstamos\n"
+        "• Cancelar reserva\n"
+        "También podés cambiar turno: “cambiar a noche”."
+    )
+
+
+# =========================
+# Matching
+# =========================
+class KeywordTrie:
+    """Trie de frases; find() devuelve las etiquetas de las frases contenidas en el texto."""
+
+    def __init__(self, frases=()):
+        self.root = {}
+        for frase, etiqueta in frases:
+            self.add(frase, etiqueta)
+
+    def add(self, frase, etiqueta):
+        nodo = self.root
+        for ch in frase:
+            nodo = nodo.setdefault(ch, {})
+        nodo.setdefault(None, set()).add(etiqueta)
+
+    def find(self, texto):
+        encontradas = set()
+        for i in range(len(texto)):
+            nodo = self.root
+            for ch in texto[i:]:
+                nodo = nodo.get(ch)
+                if nodo is None:
+                    break
+                if None in nodo:
+                    encontradas |= nodo[None]
+        return encontradas
+
+
+_KEYWORDS = KeywordTrie([
+    ('mis reservas', 'mis_reservas'),
+    ('mis prestamos', 'mis_prestamos'),
+    ('cancelar reserva', 'cancelar_reserva'),
+])
+_NIVEL_KEYWORDS = KeywordTrie([(k, 'nivel') for k in ('sec', 'sup', 'per', 'docente')])
+_RE_RET = re.compile(r'(devolver|entregar)\s+([a-z0-9\-]+)')
+_RE_RES = re.compile(r'reserv(ar|a)\s+([a-z0-9\-]+)')
+
+MENU = frozenset({'menu'})
+CONFIRMA = frozenset({'si', 'confirmo', 'ok'})
+CANCELA = frozenset({'no', 'cancelar', 'cancel'})
+
+
+# =========================
+# Contexto por turno
+# =========================
+class ChatContext:
+    def __init__(self, request, msg, msg_raw, store):
+        self.request = request
+        self.user = request.user
+        self.username = request.user.username
+        self.msg = msg
+        self.msg_raw = msg_raw
+        self.store = store
+        self.keywords = _KEYWORDS.find(msg)
+        self.match = None
+
+    @property
+    def pending(self):
+        return self.store.pending
+
+    @cached_property
+    def reservas_activas(self):
+        return list(Reserva.objects.filter(solicitante=self.username, estado='activa')
+                    .select_related('item').order_by('-inicio'))
+
+    @cached_property
+    def prestamos_activos(self):
+        return list(Prestamo.objects.filter(solicitante=self.username, fin_real__isnull=True)
+                    .select_related('item').order_by('-inicio'))
+
+    def reply(self, texto, sugerencias=None):
+        return {'reply': texto, 'suggestions': sugerencias if sugerencias is not None else _suggestions()}
+
+
+def _find_item(code):
+    # Índice en memoria de códigos normalizados ('nb01' == 'NB-01'), sin consulta
+    return inventory_state.lookup(code)
+
+
+# =========================
+# Intenciones
+# =========================
+def h_menu(ctx):
+    return ctx.reply(_menu_text())
+
+def h_mis_reservas(ctx):
+    rs = ctx.reservas_activas
+    if not rs:
+        return ctx.reply('No tenés reservas activas.')
+    lines = []
+    for r in rs:
+        code = r.item.code if r.item else '(sin asignar)'
+        lines.append(f'- {code} · {r.get_turno_display()} · expira {timezone.localtime(r.expira).strftime("%d/%m %H:%M")}')
+    return ctx.reply("Tus reservas activas:\n" + "\n".join(lines), ['Cancelar reserva'])
+
+def h_mis_prestamos(ctx):
+    ps = ctx.prestamos_activos
+    if not ps:
+        return ctx.reply('No tenés préstamos activos.')
+    lines = [f'- {p.item.code} · {p.get_turno_display()} · desde {timezone.localtime(p.inicio).strftime("%d/%m %H:%M")}' for p in ps]
+    return ctx.reply("Tus préstamos activos:\n" + "\n".join(lines), ['Devolver ' + ps[0].item.code])
+
+def h_cancelar_reserva(ctx):
+    rs = ctx.reservas_activas
+    if not rs:
+        return ctx.reply('No encontré reservas activas para cancelar.')
+    r = rs[-1]  # la más antigua (una por usuario)
+    if not r.cancelar(user=ctx.user, motivo='cancelada desde chatbot'):
+        return ctx.reply('La reserva ya no estaba activa.')
+    return ctx.reply(f'Reserva cancelada ({r.item.code if r.item else r.tipo}).')
+
+def h_cambiar_turno(ctx):
+    t = _parse_turno(ctx.msg[len('cambiar a '):])
+    pending = ctx.pending or {}
+    if pending.get('flow') == 'reserve' and t:
+        pending['turno'] = t
+        ctx.store.set_pending(pending)
+        return ctx.reply(f'Turno actualizado a {dict(Turno.choices)[t]}. Decí "confirmo" para crear la reserva o "cancelar".', ['confirmo','cancelar'])
+    return ctx.reply('Podés decir: "cambiar a mañana/tarde/noche" cuando estés reservando.')
+
+def h_devolver(ctx):
+    code = ctx.match.group(2).upper()
+    it = _find_item(code)
+    if it is None:
+        return ctx.reply(f'No encontré el ítem {code}.')
+    code = it.code
+    p = next((p for p in ctx.prestamos_activos if p.item_id == it.id), None)
+    if not p:
+        return ctx.reply(f'No tenés un préstamo activo de {code}.', ['Mis préstamos'])
+    ctx.store.set_pending({'flow':'return','code':code,'prestamo_id':p.id})
+    return ctx.reply(f'Voy a registrar la devolución de {code}. ¿Confirmás? (sí/no)', ['sí','no'])
+
+def h_reservar(ctx):
+    code = ctx.match.group(2).upper()
+    if ctx.reservas_activas:
+        return ctx.reply('Ya tenés una reserva activa. Primero cancelala o esperá a que se convierta.', ['Mis reservas','Cancelar reserva'])
+    it = _find_item(code)
+    if it is None:
+        return ctx.reply(f'No encontré el ítem {code}.')
+    code = it.code
+    if it.estado in (EstadoItem.EN_USO, EstadoItem.MANTENIMIENTO, EstadoItem.RESERVADO):
+        return ctx.reply(f'El ítem {code} no está disponible para reservar (estado: {dict(EstadoItem.choices)[it.estado]}).')
+    turno = _infer_turno()
+    ctx.store.set_pending({
+        'flow':'reserve', 'code':code, 'item_id':it.id, 'tipo':it.tipo,
+        'nivel': None, 'carrera': None, 'anio': None, 'turno': turno, 'aula': None
+    })
+    return ctx.reply(
+        f'Voy a reservar {code}. ¿Cuál es tu nivel? (Secundario / Superior / Personal)\nTurno sugerido: {dict(Turno.choices)[turno]} (podés decir "cambiar a mañana/tarde/noche").',
+        ['Secundario','Superior','Personal','cambiar a noche','cancelar'])
+
+def h_cancelar_flujo(ctx):
+    ctx.store.clear()
+    return ctx.reply('Operación cancelada. ¿Algo más?')
+
+def h_fallback(ctx):
+    return ctx.reply('Puedo reservar por código, devolver, y listar tus reservas/préstamos. Decí "Menú" para ver opciones.')
+
+
+# ---------- Flujo de reserva (máquina de estados) ----------
+def reserve_step(pending):
+    """Siguiente dato que falta en la reserva: nivel → carrera → anio → aula → confirmar."""
+    if not pending.get('nivel'):
+        return 'nivel'
+    if pending['nivel'] == Nivel.SUPERIOR and not pending.get('carrera'):
+        return 'carrera'
+    if pending['nivel'] == Nivel.SUPERIOR and not pending.get('anio'):
+        return 'anio'
+    if pending.get('aula') is None:
+        return 'aula'
+    return 'confirmar'
+
+def s_nivel(ctx, pending):
+    if not _NIVEL_KEYWORDS.find(ctx.msg):
+        return ctx.reply('Indicá tu nivel: Secundario / Superior / Personal', ['Secundario','Superior','Personal'])
+    pending['nivel'] = _parse_nivel(ctx.msg)
+    ctx.store.set_pending(pending)
+    if pending['nivel'] == Nivel.SUPERIOR:
+        return ctx.reply('Carrera (TCD / PTEC)?', ['TCD','PTEC'])
+    return ctx.reply('¿Aula? (o escribí "-" para dejar vacío)', ['-'])
+
+def s_carrera(ctx, pending):
+    car = _parse_carrera(ctx.msg)
+    if not car:
+        return ctx.reply('Carrera no válida. Opciones: TCD o PTEC.', ['TCD','PTEC'])
+    pending['carrera'] = car
+    ctx.store.set_pending(pending)
+    return ctx.reply('¿Año? (1 o 2)', ['1','2'])
+
+def s_anio(ctx, pending):
+    an = _parse_anio(ctx.msg)
+    if not an:
+        return ctx.reply('Año no válido. Indicá 1 o 2.', ['1','2'])
+    pending['anio'] = an
+    ctx.store.set_pending(pending)
+    return ctx.reply('¿Aula? (o escribí "-" para dejar vacío)', ['-'])
+
+def s_aula(ctx, pending):
+    aula = ctx.msg_raw.strip()
+    pending['aula'] = '' if aula in ('-', '') else aula
+    ctx.store.set_pending(pending)
+    resumen = [
+        f'Ítem: {pending["code"]}',
+        f'Nivel: {dict(Nivel.choices)[pending["nivel"]]}',
+        f'Turno: {dict(Turno.choices)[pending["turno"]]}',
+        f'Aula: {pending["aula"] or "—"}'
+    ]
+    if pending['nivel'] == Nivel.SUPERIOR:
+        resumen.insert(2, f'Carrera/Año: {dict(CarreraSup.choices)[pending["carrera"]]} · {dict(AnioSup.choices)[pending["anio"]]}')
+    return ctx.reply("Confirmar reserva:\n" + "\n".join(resumen) + "\n¿Confirmás? (sí/no)", ['sí','no','cambiar a noche','cancelar'])
+
+def s_confirmar(ctx, pending):
+    if ctx.msg in CONFIRMA:
+        return confirmar_reserva(ctx, pending)
+    if ctx.msg in CANCELA:
+        return h_cancelar_flujo(ctx)
+    return None  # sigue el ruteo normal (fallback)
+
+RESERVE_STEPS = {
+    'nivel': s_nivel,
+    'carrera': s_carrera,
+    'anio': s_anio,
+    'aula': s_aula,
+    'confirmar': s_confirmar,
+}
+
+def confirmar_reserva(ctx, pending):
+    try:
+        it = Item.objects.get(id=pending['item_id'])
+    except Item.DoesNotExist:
+        ctx.store.clear()
+        return ctx.reply('El ítem ya no está disponible.')
+    if ctx.reservas_activas:
+        ctx.store.clear()
+        return ctx.reply('Ya tenés una reserva activa.', ['Mis reservas'])
+
+    expira = _expira_2300()
+    with transaction.atomic():
+        claimed = claim_item(item_id=it.id, nuevo_estado=EstadoItem.RESERVADO)
+        if claimed:
+            Reserva.objects.create(
+                item=claimed, tipo=claimed.tipo, nivel=pending['nivel'],
+                turno=pending['turno'], aula=pending['aula'] or '',
+                solicitante=ctx.username, expira=expira
+            )
+    ctx.store.clear()
+    if not claimed:
+        it.refresh_from_db(fields=['estado'])
+        return ctx.reply(f'El ítem cambió de estado a {dict(EstadoItem.choices)[it.estado]}.')
+    return ctx.reply(f'Listo. Reserva creada para {it.code}. Expira el {expira.strftime("%d/%m %H:%M")}.', _suggestions(['Mis reservas']))
+
+# ---------- Flujo de devolución ----------
+def confirmar_devolucion(ctx, pending):
+    p = (Prestamo.objects.select_related('item')
+         .filter(id=pending.get('prestamo_id'), solicitante=ctx.username, fin_real__isnull=True).first())
+    ctx.store.clear()
+    if not p:
+        return ctx.reply('No encontré el préstamo a devolver.')
+    p.cerrar()
+    return ctx.reply(f'Devolución registrada para {p.item.code}. ¡Gracias!')
+
+def h_flujo(ctx):
+    """Continúa el flujo pendiente; None si el mensaje no aplica al paso actual."""
+    pending = ctx.pending
+    if ctx.msg in ('cancelar', 'cancel'):
+        return h_cancelar_flujo(ctx)
+    if pending['flow'] == 'reserve':
+        return RESERVE_STEPS[reserve_step(pending)](ctx, pending)
+    if ctx.msg in CONFIRMA:
+        return confirmar_devolucion(ctx, pending)
+    if ctx.msg in CANCELA:
+        return h_cancelar_flujo(ctx)
+    return None
+
+
+# =========================
+# Tabla de ruteo (en orden de prioridad)
+# =========================
+def _exact(palabras):
+    return lambda ctx: ctx.msg in palabras
+
+def _keyword(etiqueta):
+    return lambda ctx: etiqueta in ctx.keywords
+
+def _prefix(prefijo):
+    return lambda ctx: ctx.msg.startswith(prefijo)
+
+def _regex(patron):
+    def m(ctx):
+        ctx.match = patron.search(ctx.msg)
+        return ctx.match is not None
+    return m
+
+def _pending():
+    return lambda ctx: ctx.pending is not None
+
+
+# (nombre, matcher, handler, consultas máximas del handler con el índice de
+# inventario vigente — ver tests)
+INTENTS = [
+    ('menu',             _exact(MENU),                     h_menu,             0),
+    ('mis_reservas',     _keyword('mis_reservas'),         h_mis_reservas,     1),
+    ('mis_prestamos',    _keyword('mis_prestamos'),        h_mis_prestamos,    1),
+    ('cancelar_reserva', _keyword('cancelar_reserva'),     h_cancelar_reserva, 4),
+    ('cambiar_turno',    _prefix('cambiar a '),            h_cambiar_turno,    0),
+    ('devolver',         _regex(_RE_RET),                  h_devolver,         1),
+    ('reservar',         _regex(_RE_RES),                  h_reservar,         1),
+    ('flujo',            _pending(),                       h_flujo,            8),
+    ('cancelar_reserva', _exact({'cancelar'}),             h_cancelar_reserva, 4),
+    ('cancelar',         _exact(CANCELA),                  h_cancelar_flujo,   0),
+]
+INTENT_BUDGET = {nombre: budget for nombre, _, _, budget in INTENTS}
+INTENT_BUDGET['fallback'] = 0
+
+
+def route(ctx):
+    """Devuelve (intención, payload) para el mensaje del contexto."""
+    for nombre, matcher, handler, _ in INTENTS:
+        if matcher(ctx):
+            payload = handler(ctx)
+            if payload is not None:
+                return nombre, payload
+    return 'fallback', h_fallback(ctx)
+
+
+@login_required
+@require_POST
+def chat_api(request):
+    data = json.loads(request.body or '{}')
+    msg_raw = data.get('message') or ''
+    store = ChatStateStore(request)
+    ctx = ChatContext(request, _norm(msg_raw), msg_raw, store)
+    _, payload = route(ctx)
+    # El estado de la conversación vive en ChatStateStore (cache/cookie), no en la sesión
+    return store.persist(JsonResponse(payload))
@@ -0,0 +1,106 @@
+# core/chat_state.py
+# Estado de conversación del chat fuera de la sesión (django_session).
+# Se guarda en el cache de Django con TTL (clave por usuario) si es compartido
+# entre workers (CACHE_URL, ver core/caching.py) y, si no, en una cookie firmada:
+# con LocMem el mensaje siguiente puede caer en otro worker que no ve el estado. La representación es compacta: una
+# lista posicional por flujo en lugar de un dict con nombres de campo.
+import json
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+
+from .caching import compartido
+
+COOKIE = "chat_state"
+_SALT = "core.chat_state"
+
+# Campos por flujo, en orden: el primer elemento del estado compacto es el flujo
+_CAMPOS = {
+    "r": ("reserve", ("code", "item_id", "tipo", "nivel", "carrera", "anio", "turno", "aula")),
+    "d": ("return", ("code", "prestamo_id")),
+}
+_CODIGO = {flow: (cod, campos) for cod, (flow, campos) in _CAMPOS.items()}
+
+
+def pack(pending):
+    """{'flow': 'reserve', 'code': 'NB-01', ...} -> ['r', 'NB-01', ...]"""
+    if not pending or pending.get("flow") not in _CODIGO:
+        return None
+    cod, campos = _CODIGO[pending["flow"]]
+    return [cod] + [pending.get(c) for c in campos]
+
+
+def unpack(data):
+    if not data or data[0] not in _CAMPOS:
+        return None
+    flow, campos = _CAMPOS[data[0]]
+    pending = {"flow": flow}
+    pending.update(zip(campos, data[1:]))
+    return pending
+
+
+def _ttl():
+    return getattr(settings, "CHAT_STATE_TTL", 30 * 60)
+
+
+class ChatStateStore:
+    """
+    store = ChatStateStore(request)
+    store.pending / store.set_pending(dict) / store.clear()
+    store.persist(response)  # escribe sólo si hubo cambios
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.key = f"chat:{request.user.pk}"
+        alias = getattr(settings, "CHAT_STATE_CACHE_ALIAS", "default")
+        self.cache = caches[alias]
+        self.use_cache = compartido(alias)
+        self.dirty = False
+        self.pending = unpack(self._load())
+
+    def _load(self):
+        if self.use_cache:
+            try:
+                raw = self.cache.get(self.key)
+                return json.loads(raw) if raw else None
+            except Exception:
+                self.use_cache = False
+        raw = self.request.COOKIES.get(COOKIE)
+        if not raw:
+            return None
+        try:
+            data = signing.loads(raw, salt=_SALT, max_age=_ttl())
+        except signing.BadSignature:
+            return None
+        # La cookie es de un usuario; si cambió la sesión, no se reutiliza
+        return data.get("s") if data.get("u") == self.request.user.pk else None
+
+    def set_pending(self, pending):
+        self.pending = pending
+        self.dirty = True
+
+    def clear(self):
+        if self.pending is not None:
+            self.set_pending(None)
+
+    def persist(self, response):
+        if not self.dirty:
+            return response
+        data = pack(self.pending)
+        if self.use_cache:
+            try:
+                if data is None:
+                    self.cache.delete(self.key)
+                else:
+                    self.cache.set(self.key, json.dumps(data, separators=(",", ":")), _ttl())
+                return response
+            except Exception:
+                pass
+        if data is None:
+            response.delete_cookie(COOKIE)
+        else:
+            value = signing.dumps({"u": self.request.user.pk, "s": data}, salt=_SALT, compress=True)
+            response.set_cookie(COOKIE, value, max_age=_ttl(), httponly=True, samesite="Lax")
+        return response
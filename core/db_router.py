@@ -0,0 +1,116 @@
+# core/db_router.py
+# Lecturas analíticas / ML en una BD secundaria (alias "analytics"):
+#   - ANALYTICS_DATABASE_URL: una réplica (p.ej. standby de PostgreSQL).
+#   - ANALYTICS_SNAPSHOT: con SQLite, una copia que `manage.py snapshot_analytics`
+#     rehace por cron con la API de backup (en WAL no frena a los que escriben).
+# Sólo se desvían las lecturas hechas dentro de `with analiticas():` (o con
+# @analiticas() en un handle/función): train_ml, eval_ml, KPIs y reportes. Si el
+# alias no existe, no responde o está más atrasado que ANALYTICS_MAX_LAG, se lee
+# la BD principal. Las escrituras van siempre a "default".
+import contextvars
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+ALIAS = "analytics"
+CHEQUEO = 10  # segundos entre mediciones del atraso (por proceso)
+
+_activo = contextvars.ContextVar("lecturas_analiticas", default=False)
+_medido = [0.0, None]  # (cuándo, atraso en segundos)
+
+
+@contextmanager
+def analiticas():
+    token = _activo.set(True)
+    try:
+        yield
+    finally:
+        _activo.reset(token)
+
+
+def _medir_atraso():
+    db = connections.databases[ALIAS]
+    if db["ENGINE"].endswith("sqlite3"):
+        return time.time() - os.path.getmtime(db["NAME"])
+    if connections[ALIAS].vendor == "postgresql":
+        with connections[ALIAS].cursor() as c:
+            # 0 si la réplica está conectada y ya aplicó todo lo recibido (sin escrituras, el último
+            # replay puede ser viejo). Desconectada, "todo lo recibido" no dice nada: se cuenta
+            # desde el último replay (NULL si nunca aplicó nada -> se usa la principal).
+            c.execute("SELECT CASE WHEN EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') "
+                      "AND pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                      "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END")
+            fila = c.fetchone()
+        return float(fila[0]) if fila[0] is not None else None
+    return 0.0
+
+
+def atraso(refrescar=False):
+    """Segundos de atraso del alias analítico (None si no hay alias o no se pudo medir)."""
+    if ALIAS not in connections.databases:
+        return None
+    if refrescar or time.monotonic() - _medido[0] > CHEQUEO:
+        try:
+            valor = _medir_atraso()
+        except Exception:  # noqa: BLE001 (réplica caída / snapshot inexistente: se usa la principal)
+            valor = None
+        _medido[:] = [time.monotonic(), valor]
+    return _medido[1]
+
+
+def alias_lectura():
+    """Alias para una lectura analítica en este momento."""
+    lag = atraso()
+    if lag is None or lag > getattr(settings, "ANALYTICS_MAX_LAG", 900):
+        return DEFAULT_DB_ALIAS
+    return ALIAS
+
+
+def atraso_lectura():
+    """Segundos que le pueden faltar a una lectura analítica hecha ahora (0 si va a la principal)."""
+    return atraso() if alias_lectura() == ALIAS else 0.0
+
+
+class AnalyticsRouter:
+    def db_for_read(self, model, **hints):
+        return alias_lectura() if _activo.get() else None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS  # aunque la instancia se haya leído del alias analítico
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # mismos datos en ambos alias
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != ALIAS  # la réplica/snapshot copia el esquema de la principal
+
+
+# ---------- Snapshot SQLite ----------
+def snapshot(destino=None):
+    """
+    Copia la BD principal (SQLite) a `destino` con la API de backup. Se escribe a
+    un temporal y se reemplaza de una vez: quien esté leyendo el snapshot anterior
+    sigue con ese archivo. Devuelve los segundos que tardó.
+    """
+    destino = destino or settings.ANALYTICS_SNAPSHOT
+    conn = connections[DEFAULT_DB_ALIAS]
+    if conn.vendor != "sqlite":
+        raise ValueError("snapshot_analytics es sólo para SQLite (con PostgreSQL usar una réplica)")
+    t0 = time.perf_counter()
+    conn.ensure_connection()
+    tmp = f"{destino}.tmp"
+    dest = sqlite3.connect(tmp)
+    try:
+        # Todo en un paso: una sola transacción de lectura (en WAL no bloquea escrituras);
+        # por páginas, cada escritura de otra conexión haría reiniciar la copia
+        conn.connection.backup(dest)
+        dest.execute("PRAGMA journal_mode = DELETE")  # el snapshot se abre sólo para leer, sin -wal
+    finally:
+        dest.close()
+    os.replace(tmp, destino)
+    _medido[0] = 0.0  # volver a medir el atraso en la próxima lectura
+    return time.perf_counter() - t0
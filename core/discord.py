@@ -1,10 +1,191 @@
-import os, requests
-WEBHOOK = os.getenv("DISCORD_WEBHOOK_URL")
+# core/discord.py
+# Avisos al webhook de Discord.
+# Por defecto (DISCORD_OUTBOX=True) send_discord() sólo inserta una fila en
+# DiscordOutbox dentro de la transacción en curso; el worker (manage.py
+# discord_outbox) la envía en segundo plano: agrupa mensajes en posts de hasta
+# 2000 caracteres, respeta los rate limits del webhook y reintenta con backoff.
+# Cada pasada toma sus filas con un UPDATE condicional (pendiente -> enviando):
+# dos workers (o el cron y un --loop) no envían el mismo aviso. Si un worker
+# muere con filas tomadas, vuelven a pendiente cuando vence RECLAMO.
+import logging
+import random
+import time
+from datetime import timedelta
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+log = logging.getLogger(__name__)
+
+MAX_CONTENT = 2000          # límite de Discord por mensaje
+BACKOFF_BASE = 5            # segundos
+BACKOFF_MAX = 15 * 60
+MAX_INTENTOS = 8
+RECLAMO = 10 * 60           # segundos que una pasada retiene sus filas en "enviando"
+
+
+def _webhook():
+    return getattr(settings, "DISCORD_WEBHOOK_URL", "")
+
 
 def send_discord(msg: str):
-    if not WEBHOOK:
+    url = _webhook()
+    if not url:
+        return
+    if getattr(settings, "DISCORD_OUTBOX", True):
+        from .models import DiscordOutbox
+        DiscordOutbox.objects.create(contenido=msg)
         return
     try:
-        requests.post(WEBHOOK, json={"content": msg}, timeout=5)
+        requests.post(url, json={"content": msg[:MAX_CONTENT]}, timeout=5)
     except Exception:
-        pass
\ No newline at end of file
+        pass
+
+
+def coalesce(mensajes, limite=MAX_CONTENT):
+    """
+    Agrupa [(id, texto), ...] en lotes [(ids, contenido), ...] de a lo sumo
+    `limite` caracteres, separados por salto de línea y respetando el orden.
+    """
+    lotes, ids, partes, largo = [], [], [], 0
+    for pk, texto in mensajes:
+        texto = texto[:limite]
+        extra = len(texto) + (1 if partes else 0)
+        if partes and largo + extra > limite:
+            lotes.append((ids, "\n".join(partes)))
+            ids, partes, largo = [], [], 0
+            extra = len(texto)
+        ids.append(pk)
+        partes.append(texto)
+        largo += extra
+    if partes:
+        lotes.append((ids, "\n".join(partes)))
+    return lotes
+
+
+def backoff(intentos):
+    """Espera exponencial con jitter para el reintento número `intentos`."""
+    base = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** max(0, intentos - 1)))
+    return base * random.uniform(0.5, 1.0)
+
+
+class OutboxWorker:
+    """Drena DiscordOutbox con una sesión HTTP reutilizada (keep-alive)."""
+
+    def __init__(self, url=None, lote=50, min_intervalo=0.4, timeout=5):
+        self.url = url or _webhook()
+        self.lote = lote
+        self.min_intervalo = min_intervalo  # ~5 posts / 2 s por webhook
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self._ultimo_post = 0.0
+        self._pausa_hasta = 0.0
+        self.metrics = {"posts": 0, "enviados": 0, "reintentos": 0, "fallidos": 0,
+                        "rate_limited": 0, "latencia_ms": 0.0}
+
+    def _esperar_turno(self):
+        ahora = time.monotonic()
+        espera = max(self._pausa_hasta - ahora, self._ultimo_post + self.min_intervalo - ahora)
+        if espera > 0:
+            time.sleep(espera)
+
+    def _post(self, contenido):
+        self._esperar_turno()
+        t0 = time.monotonic()
+        r = self.session.post(self.url, json={"content": contenido}, timeout=self.timeout)
+        self._ultimo_post = time.monotonic()
+        self.metrics["posts"] += 1
+        self.metrics["latencia_ms"] = round((self._ultimo_post - t0) * 1000, 1)
+        # Rate limit "preventivo": si no quedan requests en el bucket, esperar el reset
+        if r.headers.get("X-RateLimit-Remaining") == "0":
+            try:
+                self._pausa_hasta = time.monotonic() + float(r.headers.get("X-RateLimit-Reset-After", 0))
+            except ValueError:
+                pass
+        return r
+
+    def _retry_after(self, r):
+        try:
+            return float(r.json().get("retry_after"))
+        except Exception:
+            try:
+                return float(r.headers.get("Retry-After", 1))
+            except ValueError:
+                return 1.0
+
+    def _fallo(self, ids, error):
+        from .models import DiscordOutbox
+        now = timezone.now()
+        for m in DiscordOutbox.objects.filter(pk__in=ids):
+            m.intentos += 1
+            m.ultimo_error = str(error)[:200]
+            if m.intentos >= MAX_INTENTOS:
+                m.estado = "fallido"
+                self.metrics["fallidos"] += 1
+            else:
+                m.estado = "pendiente"
+                m.proximo_intento = now + timedelta(seconds=backoff(m.intentos))
+                self.metrics["reintentos"] += 1
+            m.save(update_fields=["intentos", "ultimo_error", "estado", "proximo_intento"])
+
+    def _tomar(self):
+        """Reclama hasta `lote` avisos vencidos para esta pasada: [(id, contenido), ...]."""
+        from .models import DiscordOutbox
+        now = timezone.now()
+        # Filas de un worker que murió a mitad de una pasada
+        DiscordOutbox.objects.filter(estado="enviando", proximo_intento__lte=now).update(estado="pendiente")
+        ids = list(DiscordOutbox.objects.filter(estado="pendiente", proximo_intento__lte=now)
+                   .order_by("id").values_list("id", flat=True)[:self.lote])
+        if not ids:
+            return []
+        hasta = now + timedelta(seconds=RECLAMO)
+        DiscordOutbox.objects.filter(pk__in=ids, estado="pendiente").update(estado="enviando", proximo_intento=hasta)
+        # Sólo las que tomó esta pasada (otro worker pudo ganar alguna entre la lectura y el UPDATE)
+        return list(DiscordOutbox.objects.filter(pk__in=ids, estado="enviando", proximo_intento=hasta)
+                    .order_by("id").values_list("id", "contenido"))
+
+    def drain(self):
+        """Envía lo pendiente y vencido. Devuelve cuántos mensajes se enviaron."""
+        from .models import DiscordOutbox
+        if not self.url:
+            return 0
+        pendientes = self._tomar()
+        enviados = 0
+        lotes = coalesce(pendientes)
+        for i, (ids, contenido) in enumerate(lotes):
+            try:
+                r = self._post(contenido)
+            except requests.RequestException as e:
+                self._fallo(ids, e)
+                continue
+            if r.status_code == 429:
+                # Rate limited: se posterga este lote y los que siguen, sin contar intento
+                self.metrics["rate_limited"] += 1
+                espera = self._retry_after(r)
+                self._pausa_hasta = time.monotonic() + espera
+                resto = [pk for lote_ids, _ in lotes[i:] for pk in lote_ids]
+                DiscordOutbox.objects.filter(pk__in=resto).update(
+                    estado="pendiente", proximo_intento=timezone.now() + timedelta(seconds=espera))
+                break
+            if 200 <= r.status_code < 300:
+                DiscordOutbox.objects.filter(pk__in=ids).update(estado="enviado", enviado_at=timezone.now())
+                enviados += len(ids)
+                self.metrics["enviados"] += len(ids)
+            else:
+                self._fallo(ids, f"HTTP {r.status_code}")
+        return enviados
+
+    def run_forever(self, intervalo=2.0, stop=None):
+        while not (stop and stop.is_set()):
+            close_old_connections()
+            try:
+                if not self.drain():
+                    time.sleep(intervalo)
+            except Exception:
+                log.exception("Error drenando DiscordOutbox")
+                time.sleep(intervalo)
@@ -0,0 +1,98 @@
+# core/export.py
+# Exportación del historial de préstamos y reservas en CSV o NDJSON.
+# Las filas salen de values_list(...).iterator(chunk_size=...) y se escriben a
+# medida que se leen (StreamingHttpResponse): memoria constante aunque se
+# exporten años de historia. Los préstamos archivados (core/archive.py) se
+# agregan con UNION ALL cuando el rango puede incluirlos.
+import csv
+import datetime as dt
+import json
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .models import Prestamo, PrestamoArchivado, Reserva, TipoItem, Nivel
+from . import archive
+
+CHUNK = 2000
+
+# columna -> campo (values_list)
+EXPORTS = {
+    "prestamos": (Prestamo, {
+        "id": "id", "item": "item__code", "tipo": "item__tipo", "nivel": "nivel", "carrera": "carrera",
+        "anio": "anio", "turno": "turno", "aula": "aula", "solicitante": "solicitante", "inicio": "inicio",
+        "fin_prevista": "fin_prevista", "fin_real": "fin_real", "duracion_horas": "duracion_horas", "estado": "estado",
+    }),
+    "reservas": (Reserva, {
+        "id": "id", "item": "item__code", "tipo": "tipo", "nivel": "nivel", "turno": "turno", "aula": "aula",
+        "solicitante": "solicitante", "inicio": "inicio", "expira": "expira", "estado": "estado",
+        "aprobada_at": "aprobada_at", "cancelada_at": "cancelada_at",
+    }),
+}
+FORMATOS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+class FiltroInvalido(ValueError):
+    pass
+
+
+def _fecha(valor, nombre):
+    try:
+        return timezone.make_aware(dt.datetime.strptime(valor, "%Y-%m-%d"))
+    except ValueError:
+        raise FiltroInvalido(f"{nombre} debe ser YYYY-MM-DD")
+
+
+def queryset(modelo, desde=None, hasta=None, tipo=None, nivel=None, estado=None):
+    """Filas (tuplas) del export, por id ascendente. desde/hasta filtran por inicio (hasta inclusive)."""
+    model, campos = EXPORTS[modelo]
+    filtro = {}
+    if desde:
+        desde = filtro["inicio__gte"] = _fecha(desde, "desde")
+    if hasta:
+        filtro["inicio__lt"] = _fecha(hasta, "hasta") + dt.timedelta(days=1)
+    if tipo:
+        if tipo not in TipoItem.values:
+            raise FiltroInvalido("tipo inválido")
+        filtro[campos["tipo"]] = tipo
+    if nivel:
+        if nivel not in Nivel.values:
+            raise FiltroInvalido("nivel inválido")
+        filtro["nivel"] = nivel
+    if estado:
+        filtro["estado"] = estado
+    qs = model.objects.filter(**filtro).values_list(*campos.values())
+    if model is Prestamo and archive.alcanza(desde or None):
+        qs = qs.union(PrestamoArchivado.objects.filter(**filtro).values_list(*campos.values()), all=True)
+    return qs.order_by("id")
+
+
+def _conversor():
+    tz = timezone.get_current_timezone()  # una vez por export, no por celda
+
+    def valor(v):
+        if isinstance(v, dt.datetime):
+            return v.astimezone(tz).isoformat(timespec="seconds")
+        if isinstance(v, Decimal):
+            return float(v)
+        return v
+    return valor
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de guardarla."""
+    def write(self, valor):
+        return valor
+
+
+def stream(modelo, formato, filas):
+    columnas = list(EXPORTS[modelo][1])
+    _valor = _conversor()
+    if formato == "csv":
+        w = csv.writer(_Eco())
+        yield w.writerow(columnas)
+        for fila in filas.iterator(chunk_size=CHUNK):
+            yield w.writerow([_valor(v) for v in fila])
+    else:
+        for fila in filas.iterator(chunk_size=CHUNK):
+            yield json.dumps(dict(zip(columnas, map(_valor, fila))), ensure_ascii=False) + "\n"
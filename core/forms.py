@@ -2,11 +2,15 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import get_user_model
 from django.conf import settings as djsettings
+from django.db import transaction
 
 from .models import (
     Prestamo, Item, EstadoItem, Nivel, Turno,
     TipoItem, CarreraSup, AnioSup
 )
+from .allocation import claim_item
+from .bulk import parse_codes
+from .inventory import state as inventory_state
 
 User = get_user_model()
 
@@ -29,8 +33,7 @@ class PrestamoRapidoForm(forms.Form):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         tipo = self.data.get("tipo") or self.initial.get("tipo") or TipoItem.NOTEBOOK
-        items = Item.objects.filter(tipo=tipo, estado=EstadoItem.DISPONIBLE).order_by("code")
-        self.fields["code"].choices = [(i.code, i.code) for i in items]
+        self.fields["code"].choices = [(c, c) for c in inventory_state.available_codes(tipo)]
 
     def clean_aula(self):
         aula = self.cleaned_data.get("aula", "")
@@ -68,8 +71,13 @@ class PrestamoRapidoForm(forms.Form):
 
         return data
 
+    @transaction.atomic
     def save(self):
-        item = self.cleaned_data["item"]
+        # El ítem se reclama atómicamente: si otro pedido lo tomó entre clean() y save(), devuelve None
+        item = claim_item(item_id=self.cleaned_data["item"].pk, nuevo_estado=EstadoItem.EN_USO)
+        if item is None:
+            self.add_error("code", "El ítem ya no está disponible.")
+            return None
         p = Prestamo.objects.create(
             item=item,
             nivel=self.cleaned_data["nivel"],
@@ -80,8 +88,6 @@ class PrestamoRapidoForm(forms.Form):
             solicitante=self.cleaned_data.get("solicitante", ""),
             fin_prevista=None,
         )
-        item.estado = EstadoItem.EN_USO
-        item.save(update_fields=["estado"])
         return p
 
 # ------------- Devolución -------------
@@ -91,7 +97,8 @@ class DevolucionForm(forms.Form):
         data = super().clean()
         code = data.get("code")
         try:
-            self.prestamo = Prestamo.objects.filter(item__code=code, fin_real__isnull=True).latest("inicio")
+            self.prestamo = (Prestamo.objects.select_related("item")
+                             .filter(item__code=code, fin_real__isnull=True).latest("inicio"))
         except Prestamo.DoesNotExist:
             raise forms.ValidationError("No hay préstamo activo para ese código.")
         return data
@@ -99,6 +106,17 @@ class DevolucionForm(forms.Form):
         self.prestamo.cerrar()
         return self.prestamo
 
+class DevolucionLoteForm(forms.Form):
+    codes = forms.CharField(
+        label="Códigos (uno por línea, o separados por coma)",
+        widget=forms.Textarea(attrs={"rows": 8, "autofocus": True, "placeholder": "NB-01\nNB-02\n..."})
+    )
+    def clean_codes(self):
+        codes = parse_codes(self.cleaned_data.get("codes"))
+        if not codes:
+            raise forms.ValidationError("Ingresá al menos un código.")
+        return codes
+
 # ------------- Registro (Signup) -------------
 class SignupForm(UserCreationForm):
     first_name = forms.CharField(label="Nombre", max_length=30)
@@ -0,0 +1,162 @@
+# core/inventory.py
+# Índice en memoria del estado actual del inventario (unas decenas de ítems):
+# - códigos disponibles por tipo (listas ordenadas)
+# - ítems por código y préstamos abiertos por ítem
+# - códigos normalizados ordenados (búsqueda sin distinguir mayúsculas/guiones
+#   y autocompletado por prefijo con bisect, sin consultar la BD)
+# Se mantiene coherente con un contador de versión guardado en el cache de
+# Django (compartido entre procesos si CACHES apunta a Redis/Memcached):
+# las señales de Item/Prestamo lo incrementan y cada lectura compara su versión
+# local; si cambió (o pasó INVENTORY_STATE_MAX_AGE) se reconstruye desde la BD.
+import bisect
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Item, Prestamo, TipoItem, EstadoItem
+
+VERSION_KEY = "inventario:version"
+
+
+def _cache():
+    return caches[getattr(settings, "INVENTORY_CACHE_ALIAS", "default")]
+
+
+def current_version():
+    v = _cache().get(VERSION_KEY)
+    if v is None:
+        _cache().add(VERSION_KEY, 1, timeout=None)
+        v = _cache().get(VERSION_KEY, 1)
+    return v
+
+
+def _incr():
+    c = _cache()
+    try:
+        c.incr(VERSION_KEY)
+    except ValueError:  # la clave no existe (cache reiniciado)
+        c.add(VERSION_KEY, 1, timeout=None)
+
+
+def bump_version():
+    """
+    Invalida el índice en todos los procesos. Se incrementa ya (el propio hilo ve
+    sus cambios) y otra vez al confirmar la transacción, por si otro hilo
+    reconstruyó con datos previos al commit.
+    """
+    _incr()
+    transaction.on_commit(_incr)
+
+
+def norm_code(code):
+    """'nb 01' / 'Nb-01' -> 'NB01' (clave del índice de códigos)."""
+    return re.sub(r"[^A-Z0-9]", "", (code or "").upper())
+
+
+def _build():
+    items = list(Item.objects.order_by("code"))
+    activos = list(Prestamo.objects.filter(fin_real__isnull=True)
+                   .select_related("item").order_by("-inicio"))
+    disponibles = {k: [] for k, _ in TipoItem.choices}
+    for it in items:
+        if it.estado == EstadoItem.DISPONIBLE and it.tipo in disponibles:
+            disponibles[it.tipo].append(it)
+    por_item = {}
+    for p in activos:  # orden -inicio: el primero es el más reciente
+        por_item.setdefault(p.item_id, p)
+    por_norm = {}
+    for it in items:
+        por_norm.setdefault(norm_code(it.code), it)
+    return SimpleNamespace(
+        items={it.code: it for it in items},
+        por_norm=por_norm,
+        norm_codes=sorted(por_norm),
+        disponibles=disponibles,
+        disponibles_codes={k: [it.code for it in v] for k, v in disponibles.items()},
+        activos=activos,
+        activo_por_item=por_item,
+    )
+
+
+def complete(snap, prefijo, estados=None, limit=25):
+    """Ítems cuyo código normalizado empieza con `prefijo`, en orden de código."""
+    p = norm_code(prefijo)
+    claves = snap.norm_codes
+    out = []
+    for i in range(bisect.bisect_left(claves, p), len(claves)):
+        if not claves[i].startswith(p):
+            break
+        it = snap.por_norm[claves[i]]
+        if estados is None or it.estado in estados:
+            out.append(it)
+            if len(out) >= limit:
+                break
+    return out
+
+
+class InventoryState:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snap = None
+        self._version = None
+        self._built_at = 0.0
+
+    def fresh(self):
+        """El snapshot actual si sigue vigente (sólo lee el cache, nunca la BD); si no, None."""
+        max_age = getattr(settings, "INVENTORY_STATE_MAX_AGE", 60)
+        snap = self._snap
+        if snap is not None and current_version() == self._version and time.monotonic() - self._built_at < max_age:
+            return snap
+        return None
+
+    def snapshot(self):
+        max_age = getattr(settings, "INVENTORY_STATE_MAX_AGE", 60)
+        v = current_version()
+        snap = self._snap
+        if snap is not None and v == self._version and time.monotonic() - self._built_at < max_age:
+            return snap
+        with self._lock:
+            if self._snap is not None and v == self._version and time.monotonic() - self._built_at < max_age:
+                return self._snap
+            # La versión se lee antes de consultar la BD: si cambia durante la
+            # carga, la próxima lectura vuelve a reconstruir.
+            snap = _build()
+            self._snap, self._version, self._built_at = snap, v, time.monotonic()
+            return snap
+
+    def reset(self):
+        with self._lock:
+            self._snap = None
+            self._version = None
+
+    # ---------- lecturas ----------
+    def available_codes(self, tipo):
+        return list(self.snapshot().disponibles_codes.get(tipo, []))
+
+    def available_items(self, tipo):
+        return list(self.snapshot().disponibles.get(tipo, []))
+
+    def item(self, code):
+        return self.snapshot().items.get(code)
+
+    def lookup(self, code):
+        """Ítem por código sin distinguir mayúsculas ni separadores ('nb01' -> NB-01)."""
+        return self.snapshot().por_norm.get(norm_code(code))
+
+    def complete(self, prefijo, estados=None, limit=25):
+        return complete(self.snapshot(), prefijo, estados, limit)
+
+    def active_loans(self, limit=None):
+        activos = self.snapshot().activos
+        return activos[:limit] if limit else list(activos)
+
+    def active_loan_for(self, item_id):
+        return self.snapshot().activo_por_item.get(item_id)
+
+
+state = InventoryState()
@@ -0,0 +1,205 @@
+# core/loadtest.py
+# Generador de carga para el arranque de un turno: varios procesos, cada uno con
+# N usuarios (hilos con su sesión HTTP logueada) que arrancan a la vez y repiten
+# una mezcla realista de operaciones contra un servidor ya levantado:
+#   prestamo   GET /api/items/disponibles/ + POST /prestamo/
+#   devolucion POST /devolucion/ (de algo que ese usuario prestó)
+#   chat       POST /api/chat/
+#   dashboard  GET /api/stats/kpis/
+# Reporta por endpoint: throughput, p50/p95/p99, errores y errores de lock.
+# Lo usa `manage.py load_test` (que además puede preparar usuarios e ítems).
+# Los locks los marca el servidor: con LOAD_TEST=True, LockHeaderMiddleware agrega
+# X-DB-Lock a los 500 causados por un lock de la BD (con DEBUG=False el cuerpo
+# del 500 no dice nada); sin él sólo se reconocen por la página de error de DEBUG.
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from multiprocessing import Pool
+
+import requests
+from django.core.signals import got_request_exception
+from django.db import OperationalError
+
+MIX = {"prestamo": 3, "devolucion": 2, "chat": 3, "dashboard": 2}
+TIPOS = ["NB", "TB", "AL"]
+CHAT = ["menu", "mis préstamos", "mis reservas", "hola"]
+_LOCK = "database is locked|deadlock detected|could not serialize|lock timeout"
+_LOCK_BYTES = re.compile(_LOCK.encode(), re.I)
+HEADER = "X-DB-Lock"
+
+
+def es_lock(exc):
+    return isinstance(exc, OperationalError) and re.search(_LOCK, str(exc), re.I) is not None
+
+
+def _marcar_lock(sender, request=None, **kwargs):
+    if request is not None and es_lock(sys.exc_info()[1]):
+        request._db_lock = True
+
+
+class LockHeaderMiddleware:
+    """(Servidor, sólo en pruebas de carga) 500 por lock de BD -> header X-DB-Lock: 1."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # La excepción puede salir de cualquier vista o middleware: se ve en la señal
+        got_request_exception.connect(_marcar_lock, dispatch_uid="loadtest_lock")
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if getattr(request, "_db_lock", False):
+            response[HEADER] = "1"
+        return response
+
+
+class Cliente:
+    """Un usuario: sesión con cookies (login + CSRF) y lo que tiene prestado."""
+
+    def __init__(self, base, username, password, think=(0.1, 0.5), timeout=30):
+        self.base = base.rstrip("/")
+        self.s = requests.Session()
+        self.username, self.password = username, password
+        self.think = think
+        self.timeout = timeout
+        self.prestados = []
+        self.muestras = []  # (endpoint, ms, resultado)
+
+    def _csrf(self):
+        return self.s.cookies.get("csrftoken", "")
+
+    def _medir(self, endpoint, metodo, path, **kw):
+        t0 = time.perf_counter()
+        try:
+            r = self.s.request(metodo, self.base + path, timeout=self.timeout, allow_redirects=False, **kw)
+        except requests.RequestException:
+            self.muestras.append((endpoint, (time.perf_counter() - t0) * 1000, "error"))
+            return None
+        ms = (time.perf_counter() - t0) * 1000
+        if r.status_code >= 500:
+            res = "lock" if r.headers.get(HEADER) or _LOCK_BYTES.search(r.content[:20000]) else "error"
+        elif r.status_code >= 400:
+            res = "error"
+        else:
+            res = "ok"
+        self.muestras.append((endpoint, ms, res))
+        return r
+
+    def login(self):
+        self.s.get(self.base + "/accounts/login/", timeout=self.timeout)
+        r = self.s.post(self.base + "/accounts/login/", timeout=self.timeout, allow_redirects=False, data={
+            "username": self.username, "password": self.password, "csrfmiddlewaretoken": self._csrf()})
+        return r.status_code == 302
+
+    # ---------- operaciones ----------
+    def prestamo(self):
+        tipo = random.choice(TIPOS)
+        r = self._medir("disponibles", "GET", f"/api/items/disponibles/?tipo={tipo}")
+        libres = r.json() if r is not None and r.ok else []
+        if not libres:
+            return
+        code = random.choice(libres)["code"]
+        r = self._medir("prestamo", "POST", "/prestamo/", data={
+            "tipo": tipo, "code": code, "nivel": "SEC", "turno": "M", "aula": "3",
+            "csrfmiddlewaretoken": self._csrf()})
+        if r is not None and r.status_code == 302:
+            self.prestados.append(code)
+        elif r is not None and r.status_code == 200:
+            # el formulario volvió con error: otro usuario se llevó el ítem
+            self.muestras[-1] = ("prestamo", self.muestras[-1][1], "conflicto")
+
+    def devolucion(self):
+        if not self.prestados:
+            return self.prestamo()
+        code = self.prestados.pop(0)
+        self._medir("devolucion", "POST", "/devolucion/", data={"code": code, "csrfmiddlewaretoken": self._csrf()})
+
+    def chat(self):
+        self._medir("chat", "POST", "/api/chat/", json={"message": random.choice(CHAT)},
+                    headers={"X-CSRFToken": self._csrf()})
+
+    def dashboard(self):
+        self._medir("dashboard", "GET", "/api/stats/kpis/?days=30")
+
+    def correr(self, hasta, mix):
+        ops, pesos = zip(*mix.items())
+        while time.monotonic() < hasta:
+            getattr(self, random.choices(ops, pesos)[0])()
+            time.sleep(random.uniform(*self.think))
+        # al final del turno se devuelve lo que quedó prestado (no se mide)
+        for code in self.prestados:
+            self.s.post(self.base + "/devolucion/", data={"code": code, "csrfmiddlewaretoken": self._csrf()},
+                        timeout=self.timeout)
+
+
+def _proceso(args):
+    base, usuarios, password, duracion, mix, think, semilla = args
+    random.seed(semilla)
+    clientes = [Cliente(base, u, password, think) for u in usuarios]
+    logueados = [c for c in clientes if c.login()]
+    inicio = threading.Barrier(len(logueados) + 1) if logueados else None
+    hasta = [0.0]
+
+    def run(c):
+        inicio.wait()  # todos arrancan juntos: el pico de inicio de turno
+        c.correr(hasta[0], mix)
+
+    hilos = [threading.Thread(target=run, args=(c,)) for c in logueados]
+    for h in hilos:
+        h.start()
+    if inicio:
+        hasta[0] = time.monotonic() + duracion
+        inicio.wait()
+    for h in hilos:
+        h.join()
+    return {"muestras": [m for c in logueados for m in c.muestras],
+            "login_fallidos": len(clientes) - len(logueados)}
+
+
+def percentiles(valores):
+    """{"n", "p50", "p95", "p99", "max"} de una lista de latencias en ms ({} si está vacía)."""
+    if not valores:
+        return {}
+    v = sorted(valores)
+    pick = lambda q: v[min(len(v) - 1, int(q * len(v)))]
+    return {"n": len(v), "p50": round(pick(0.50), 1), "p95": round(pick(0.95), 1),
+            "p99": round(pick(0.99), 1), "max": round(v[-1], 1)}
+
+
+def resumir(muestras, segundos):
+    por = defaultdict(list)
+    for endpoint, ms, res in muestras:
+        por[endpoint].append((ms, res))
+    out = {}
+    for endpoint, filas in sorted(por.items()):
+        lat = percentiles([ms for ms, _ in filas])
+        cuenta = defaultdict(int)
+        for _, res in filas:
+            cuenta[res] += 1
+        out[endpoint] = {
+            "n": len(filas), "rps": round(len(filas) / segundos, 1),
+            "p50": lat["p50"], "p95": lat["p95"], "p99": lat["p99"],
+            "ok": cuenta["ok"], "conflictos": cuenta["conflicto"],
+            "errores": cuenta["error"], "locks": cuenta["lock"],
+        }
+    return out
+
+
+def run(base, usuarios, password, procesos=4, duracion=60, mix=None, think=(0.1, 0.5), semilla=0):
+    """Reparte `usuarios` (usernames) entre `procesos` y devuelve el resumen por endpoint."""
+    mix = mix or MIX
+    partes = [usuarios[i::procesos] for i in range(procesos)]
+    args = [(base, p, password, duracion, mix, think, semilla + i) for i, p in enumerate(partes) if p]
+    t0 = time.monotonic()
+    with Pool(len(args)) as pool:
+        resultados = pool.map(_proceso, args)
+    segundos = time.monotonic() - t0
+    muestras = [m for r in resultados for m in r["muestras"]]
+    return {
+        "procesos": len(args), "usuarios": len(usuarios), "segundos": round(segundos, 1),
+        "requests": len(muestras), "rps": round(len(muestras) / segundos, 1) if segundos else None,
+        "login_fallidos": sum(r["login_fallidos"] for r in resultados),
+        "endpoints": resumir(muestras, duracion),
+    }
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.archive import archivar, corte, horizonte_dias, LOTE
+from core.models import Prestamo
+
+
+class Command(BaseCommand):
+    help = "Mueve los préstamos cerrados hace más de ARCHIVE_AFTER_DAYS al archivo (sumándolos al rollup diario)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=LOTE, help="Préstamos por transacción")
+        parser.add_argument("--dry-run", action="store_true", help="Sólo informa cuántos se archivarían")
+
+    def handle(self, *args, **opts):
+        if opts["dry_run"]:
+            n = Prestamo.objects.filter(fin_real__lt=corte()).count()
+            self.stdout.write(f"{n} préstamos cerrados hace más de {horizonte_dias()} días.")
+            return
+        t0 = time.perf_counter()
+        log = self.stdout.write if opts["verbosity"] > 1 else None
+        n = archivar(lote=opts["lote"], log=log)
+        self.stdout.write(self.style.SUCCESS(
+            f"Archivados {n} préstamos (horizonte {horizonte_dias()} días, {time.perf_counter() - t0:.1f} s)."))
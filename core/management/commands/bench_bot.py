@@ -0,0 +1,65 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from core.bot_harness import BotBench, StubWebhook
+
+
+def _bd_de_prueba():
+    """BD en memoria o un archivo test*/…_test* (la de los tests o una copia hecha para esto)."""
+    nombre = str(connection.settings_dict["NAME"])
+    base = os.path.splitext(os.path.basename(nombre))[0]
+    return nombre == ":memory:" or "mode=memory" in nombre or base.startswith("test") or base.endswith("test")
+
+
+class Command(BaseCommand):
+    help = ("Benchmark local del bot de Discord (sin red): /reservar, /prestar y /entregar concurrentes "
+            "con Interaction falsas; reporta latencias y dobles asignaciones. Borra sus datos al terminar.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuarios", type=int, default=200)
+        parser.add_argument("--items", type=int, default=50)
+        parser.add_argument("--json", action="store_true", help="Salida en JSON")
+        parser.add_argument("--yes-i-mean-it", action="store_true", dest="forzar",
+                            help="Correr aunque la BD no sea de prueba (los usuarios del bench reservan notebooks reales)")
+
+    def handle(self, *args, **opts):
+        if not (_bd_de_prueba() or opts["forzar"]):
+            raise CommandError(f"La BD {connection.settings_dict['NAME']} no parece de prueba: usar una copia "
+                               "(DATABASE_URL=sqlite:///test_bench.sqlite3 + migrate) o --yes-i-mean-it.")
+        bench = BotBench(usuarios=opts["usuarios"], items=opts["items"])
+        stub = StubWebhook()
+        # Los avisos van directo al webhook local: nada pasa por DiscordOutbox, donde el
+        # worker real (cron) podría mandarlos al webhook de producción
+        try:
+            with override_settings(DISCORD_WEBHOOK_URL=stub.url, DISCORD_OUTBOX=False):
+                bench.setup()
+                try:
+                    res = bench.run()
+                finally:
+                    bench.cleanup()
+            res["avisos"] = sum(len(p.splitlines()) for p in stub.posts)
+            res["posts_webhook"] = len(stub.posts)
+        finally:
+            stub.close()
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(res, ensure_ascii=False, indent=2))
+            return
+        self.stdout.write(f"{res['usuarios']} usuarios · {res['items']} ítems · {res['segundos']} s · "
+                          f"{res['comandos_por_seg']} comandos/s")
+        self.stdout.write(f"reservados {res['reservados']} · prestados {res['prestados']} · "
+                          f"avisos {res['avisos']} en {res['posts_webhook']} posts")
+        for cmd, p in res["latencia_ms"].items():
+            self.stdout.write(f"  /{cmd:<9} n={p['n']:<4} p50 {p['p50']} ms · p95 {p['p95']} ms · "
+                              f"p99 {p['p99']} ms · max {p['max']} ms")
+        ok = (not any(res["dobles_asignaciones"].values()) and res["prestamos_abiertos"] == 0
+              and res["prestados"] == res["reservados"])
+        estilo = self.style.SUCCESS if ok else self.style.ERROR
+        self.stdout.write(estilo(f"dobles asignaciones {res['dobles_asignaciones']} · abiertos al final "
+                                 f"{res['prestamos_abiertos']} · errores {res['n_errores']}"))
+        for e in res["errores"]:
+            self.stderr.write(f"  {e}")
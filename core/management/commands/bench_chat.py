@@ -0,0 +1,78 @@
+import time
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from core.chat import ChatContext, route, _norm, INTENT_BUDGET
+from core.chat_state import ChatStateStore
+from core.inventory import state as inventory_state
+from core.models import Item, TipoItem, EstadoItem
+
+# Conversación típica: consultas, una reserva completa y su cancelación
+GUION = [
+    "menu", "mis reservas", "mis préstamos", "hola",
+    "reservar {code}", "Secundario", "-", "confirmo",
+    "mis reservas", "cancelar reserva", "devolver {code}",
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Mide mensajes/segundo del chat y consultas por intención (no deja datos: todo se revierte)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rondas", type=int, default=50, help="Veces que se repite el guion")
+
+    def handle(self, *args, **opts):
+        try:
+            with transaction.atomic():
+                self._bench(opts["rondas"])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _bench(self, rondas):
+        user = User.objects.create_user(username="__bench_chat__")
+        item = Item.objects.create(code="BENCH-01", tipo=TipoItem.NOTEBOOK, estado=EstadoItem.DISPONIBLE)
+        rf = RequestFactory()
+        consultas, tiempos = defaultdict(list), defaultdict(float)
+        total, t0 = 0, time.perf_counter()
+        for _ in range(rondas):
+            for m in GUION:
+                msg = m.format(code=item.code)
+                req = rf.post("/api/chat/")
+                req.user = user
+                store = ChatStateStore(req)
+                ctx = ChatContext(req, _norm(msg), msg, store)
+                inventory_state.snapshot()  # la reconstrucción del índice no cuenta para el budget
+                t = time.perf_counter()
+                with CaptureQueriesContext(connection) as q:
+                    nombre, _ = route(ctx)
+                tiempos[nombre] += time.perf_counter() - t
+                consultas[nombre].append(len(q))
+                store.persist(_Respuesta())
+                total += 1
+        seg = time.perf_counter() - t0
+        self.stdout.write(f"{total} mensajes en {seg:.2f} s · {total / seg:.0f} msg/s")
+        for nombre, qs in sorted(consultas.items()):
+            budget = INTENT_BUDGET.get(nombre, 0)
+            marca = "" if max(qs) <= budget else "  << excede budget"
+            self.stdout.write(f"  {nombre:<17} {len(qs):>5} msgs · {1000 * tiempos[nombre] / len(qs):6.2f} ms · "
+                              f"consultas máx {max(qs)} (budget {budget}){marca}")
+
+
+class _Respuesta:
+    """Respuesta mínima para ChatStateStore.persist (sólo cookies)."""
+
+    def set_cookie(self, *args, **kwargs):
+        pass
+
+    def delete_cookie(self, *args, **kwargs):
+        pass
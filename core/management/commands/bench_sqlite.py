@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.sqlite import bench
+
+PERFILES = {"django": "0", "produccion": "1"}  # valor de SQLITE_TUNING
+
+
+class Command(BaseCommand):
+    help = ("Benchmark de concurrencia sobre SQLite: hilos con préstamos, devoluciones y lecturas más el cron de "
+            "reservas; ops/s, p50/p95/p99 y errores de lock. --comparar corre el perfil de Django y el de producción. "
+            "Usar una copia de la BD (crea y borra ítems BSQ-).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=16)
+        parser.add_argument("--duracion", type=float, default=10, help="Segundos de carga")
+        parser.add_argument("--items", type=int, default=200)
+        parser.add_argument("--cron-cada", type=float, default=0.5, help="Segundos entre corridas del cron")
+        parser.add_argument("--comparar", action="store_true", help="Corre ambos perfiles (un proceso cada uno)")
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **o):
+        if connection.vendor != "sqlite":
+            raise CommandError("bench_sqlite es sólo para SQLite")
+        if o["comparar"]:
+            return self._comparar(o)
+        if connection.settings_dict["ENGINE"] != "core.sqlite":
+            # journal_mode queda guardado en el archivo: el perfil de Django vuelve al default
+            with connection.cursor() as c:
+                c.execute("PRAGMA journal_mode = DELETE")
+        res = bench.run(hilos=o["hilos"], duracion=o["duracion"], items=o["items"], cron_cada=o["cron_cada"])
+        if o["json"]:
+            self.stdout.write(json.dumps(res, indent=2)); return
+        self._imprimir(connection.settings_dict["ENGINE"], res)
+
+    def _comparar(self, o):
+        resultados = {}
+        for perfil, tuning in PERFILES.items():
+            cmd = [sys.executable, sys.argv[0], "bench_sqlite", "--json", "--hilos", str(o["hilos"]),
+                   "--duracion", str(o["duracion"]), "--items", str(o["items"]), "--cron-cada", str(o["cron_cada"])]
+            out = subprocess.run(cmd, env={**os.environ, "SQLITE_TUNING": tuning},
+                                 capture_output=True, text=True, check=True).stdout
+            resultados[perfil] = json.loads(out)
+        if o["json"]:
+            self.stdout.write(json.dumps(resultados, indent=2)); return
+        for perfil, res in resultados.items():
+            self._imprimir(perfil, res)
+        base, prod = resultados["django"]["ops_por_seg"], resultados["produccion"]["ops_por_seg"]
+        if base:
+            self.stdout.write(self.style.SUCCESS(f"produccion vs django: {prod / base:.2f}x ops/s · locks "
+                                                 f"{resultados['django']['locks']} -> {resultados['produccion']['locks']}"))
+
+    def _imprimir(self, titulo, res):
+        self.stdout.write(f"[{titulo}] {res['hilos']} hilos · {res['segundos']} s · {res['ops_por_seg']} ops/s · "
+                          f"locks {res['locks']} · {res['pragmas']}")
+        self.stdout.write(f"  {'op':<12}{'n':>7}{'ops/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'locks':>7}")
+        for op, r in res["operaciones_detalle"].items():
+            linea = f"  {op:<12}{r['n']:>7}{r['rps']:>8}{r['p50']:>9}{r['p95']:>9}{r['p99']:>9}{r['locks']:>7}"
+            self.stdout.write(self.style.ERROR(linea) if r["locks"] or r["errores"] else linea)
@@ -4,150 +4,25 @@ import discord
 from discord import app_commands
 from datetime import timedelta
 from django.utils import timezone
-from asgiref.sync import sync_to_async
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 django.setup()
 
 from django.core.management.base import BaseCommand
-from core.models import (
-    Item, Prestamo, Reserva, Profile,
-    Nivel, Turno, TipoItem, EstadoItem,
-    DiscordLinkToken
+from core.models import Nivel, Turno, EstadoItem
+# Capa de datos: pool acotado de hilos + cache de perfiles (ver core/bot_data.py)
+from core.bot_data import (
+    perfiles, notify_discord, link_user_by_token_sync, get_available_codes_sync,
+    has_active_reserva_or_prestamo_sync, reserve_first_available_sync,
+    start_prestamo_sync, entregar_prestamo_sync, activos_list_sync, status_sync,
+    complete_codes,
 )
-from core.discord import send_discord
 
 TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 GUILD_ID = os.getenv("DISCORD_GUILD_ID")
 
 intents = discord.Intents.default()
 
-# ---- Helpers async (ORM envuelto) ----
-
-@sync_to_async
-def profile_exists_sync(discord_id: int) -> bool:
-    return Profile.objects.filter(discord_user_id=str(discord_id)).exists()
-
-@sync_to_async
-def get_perfil_dict_by_discord_sync(discord_id: int) -> dict:
-    p = Profile.objects.select_related("user").get(discord_user_id=str(discord_id))
-    return {
-        "user_username": p.user.username,
-        "full_name": p.user.get_full_name(),
-        "nivel": p.nivel,
-        "carrera": p.carrera,
-        "anio": p.anio,
-        "discord_user_id": p.discord_user_id,
-    }
-
-@sync_to_async
-def link_user_by_token_sync(token: str, discord_user_id: int):
-    # Ya vinculado
-    if Profile.objects.filter(discord_user_id=str(discord_user_id)).exists():
-        p = Profile.objects.select_related("user").get(discord_user_id=str(discord_user_id))
-        return ("already", p.user.username)
-
-    tok = (DiscordLinkToken.objects
-           .filter(token=token, used_at__isnull=True)
-           .select_related("user").order_by("-created_at").first())
-    if not tok:
-        return ("bad", None)
-
-    prof, _ = Profile.objects.get_or_create(user=tok.user)  # <— acá aseguramos que exista
-    if prof.discord_user_id and prof.discord_user_id != str(discord_user_id):
-        return ("user_has_other", tok.user.username)
-
-    prof.discord_user_id = str(discord_user_id)
-    prof.save(update_fields=["discord_user_id"])
-    tok.used_at = timezone.now()
-    tok.save(update_fields=["used_at"])
-    return ("ok", tok.user.username)
-
-@sync_to_async
-def get_available_codes_sync(tipo: str) -> list[str]:
-    return list(Item.objects.filter(tipo=tipo, estado=EstadoItem.DISPONIBLE)
-                .order_by("code").values_list("code", flat=True))
-
-@sync_to_async
-def has_active_reserva_or_prestamo_sync(discord_user_id: int) -> bool:
-    # Bloquear múltiples reservas simultáneas del mismo usuario
-    r_count = Reserva.objects.filter(discord_user_id=str(discord_user_id), estado="activa").count()
-    return r_count > 0
-
-@sync_to_async
-def reserve_first_available_sync(tipo: str, nivel: str, turno: str,
-                                 aula: str, solicitante_username: str, discord_user_id: str,
-                                 expira) -> str | None:
-    it = Item.objects.filter(tipo=tipo, estado=EstadoItem.DISPONIBLE).order_by("code").first()
-    if not it:
-        return None
-    it.estado = EstadoItem.RESERVADO
-    it.save(update_fields=["estado"])
-    Reserva.objects.create(
-        item=it, tipo=tipo, nivel=nivel, turno=turno,
-        aula=aula, solicitante=solicitante_username,
-        discord_user_id=str(discord_user_id),
-        expira=expira, estado="activa"
-    )
-    return it.code
-
-@sync_to_async
-def start_prestamo_sync(code: str, perfil: dict, turno: str, aula: str):
-    try:
-        it = Item.objects.get(code=code)
-    except Item.DoesNotExist:
-        return {"error": "noexist"}
-    if it.estado == EstadoItem.EN_USO:
-        return {"error": "inuse"}
-
-    res = Reserva.objects.filter(item=it, estado="activa").order_by("-inicio").first()
-    if res and (res.discord_user_id and res.discord_user_id != (perfil.get("discord_user_id") or "")):
-        return {"error": "reserved"}
-
-    if res:
-        res.estado = "convertida"
-        res.save(update_fields=["estado"])
-
-    solicitante = perfil["user_username"]  # SIEMPRE username
-    p = Prestamo.objects.create(
-        item=it, nivel=perfil["nivel"],
-        carrera=perfil["carrera"] or None, anio=perfil["anio"] or None,
-        turno=turno, aula=aula, solicitante=solicitante, fin_prevista=None
-    )
-    it.estado = EstadoItem.EN_USO
-    it.save(update_fields=["estado"])
-    return {"ok": True, "nivel_disp": p.get_nivel_display(), "turno_disp": p.get_turno_display()}
-
-@sync_to_async
-def entregar_prestamo_sync(code: str):
-    try:
-        p = Prestamo.objects.filter(item__code=code, fin_real__isnull=True).latest("inicio")
-    except Prestamo.DoesNotExist:
-        return {"error": "noactive"}
-    p.cerrar()
-    return {"ok": True, "dur": float(p.duracion_horas or 0)}
-
-@sync_to_async
-def activos_list_sync() -> list[str]:
-    qs = (Prestamo.objects.filter(fin_real__isnull=True)
-          .select_related("item").order_by("-inicio")[:10])
-    return [
-        f"- {p.item.code} · {p.get_nivel_display()} {p.get_turno_display()} · {p.solicitante or 'N/D'} · {p.inicio.astimezone().strftime('%H:%M')}"
-        for p in qs
-    ]
-
-@sync_to_async
-def status_sync(code: str):
-    try:
-        it = Item.objects.get(code=code)
-    except Item.DoesNotExist:
-        return {"error": "noexist"}
-    out = {"code": code, "tipo": it.get_tipo_display(), "estado": it.get_estado_display(), "extra": ""}
-    if it.estado == EstadoItem.EN_USO:
-        p = Prestamo.objects.filter(item=it, fin_real__isnull=True).latest("inicio")
-        out["extra"] = f" · En uso desde {p.inicio.astimezone().strftime('%d/%m %H:%M')} · {p.solicitante or 'N/D'}"
-    return out
-
 # ---- Bot ----
 
 class MyBot(discord.Client):
@@ -174,7 +49,7 @@ tree = app_commands.CommandTree(bot)
 
 def is_linked():
     async def predicate(interaction: discord.Interaction) -> bool:
-        return await profile_exists_sync(interaction.user.id)
+        return await perfiles.get(interaction.user.id) is not None
     return app_commands.check(predicate)
 
 @tree.error
@@ -200,6 +75,7 @@ async def serverid(interaction: discord.Interaction):
 async def vincular(interaction: discord.Interaction, token: str):
     await interaction.response.defer(ephemeral=True)
     status, uname = await link_user_by_token_sync(token, interaction.user.id)
+    perfiles.invalidate(interaction.user.id)
     msg = {
         "ok": "✅ Cuenta vinculada correctamente.",
         "already": "Ya estabas validado: tu cuenta de Discord ya está vinculada.",
@@ -223,6 +99,14 @@ async def disponibles(interaction: discord.Interaction, tipo: app_commands.Choic
     cods = ", ".join(codes) if codes else "Sin disponibilidad"
     await interaction.response.send_message(f"Disponibles {tipo.name}: {cods}", ephemeral=True)
 
+# ---- Autocompletado de códigos (índice en memoria, sin consulta por tecla) ----
+
+def _autocomplete(estados=None):
+    async def cb(interaction: discord.Interaction, current: str):
+        codes = await complete_codes(current, estados)
+        return [app_commands.Choice(name=c, value=c) for c in codes]
+    return cb
+
 def guess_turno(nivel: str) -> str:
     hour = timezone.now().astimezone().hour
     if nivel == Nivel.SUPERIOR:
@@ -240,11 +124,11 @@ async def reservar(interaction: discord.Interaction,
     if await has_active_reserva_or_prestamo_sync(interaction.user.id):
         await interaction.followup.send("Ya tenés una reserva o préstamo activo. Entregá o cancelá antes de reservar nuevamente.", ephemeral=True)
         return
-    perfil = await get_perfil_dict_by_discord_sync(interaction.user.id)
+    perfil = await perfiles.get(interaction.user.id)
     turno = Turno.NOCHE if perfil["nivel"] == Nivel.SUPERIOR else guess_turno(perfil["nivel"])
     expira = timezone.now() + timedelta(minutes=int(minutos))
     code = await reserve_first_available_sync(
-        tipo.value, perfil["nivel"], turno, aula,
+        tipo.value, perfil["nivel"], turno,
         str(aula) if aula is not None else "",
         perfil["user_username"],
         perfil["discord_user_id"] or str(interaction.user.id),
@@ -253,24 +137,26 @@ async def reservar(interaction: discord.Interaction,
     if not code:
         await interaction.followup.send(f"No hay {tipo.name} disponibles.", ephemeral=True)
         return
-    send_discord(f"🔒 {perfil['user_username']} reservó {code} por {minutos} min (vence {expira.astimezone().strftime('%H:%M')}).")
+    await notify_discord(f"🔒 {perfil['user_username']} reservó {code} por {minutos} min (vence {expira.astimezone().strftime('%H:%M')}).")
     await interaction.followup.send(f"🔒 Reservado {code} por {minutos} min. Expira {expira.astimezone().strftime('%H:%M')}.", ephemeral=True)
 
 @tree.command(name="prestar", description="Inicia un préstamo de un código")
+@app_commands.autocomplete(code=_autocomplete((EstadoItem.DISPONIBLE, EstadoItem.RESERVADO)))
 @is_linked()
 async def prestar(interaction: discord.Interaction, code: str, aula: int | None = None):
     await interaction.response.defer(ephemeral=True)
-    perfil = await get_perfil_dict_by_discord_sync(interaction.user.id)
+    perfil = await perfiles.get(interaction.user.id)
     turno = Turno.NOCHE if perfil["nivel"] == Nivel.SUPERIOR else guess_turno(perfil["nivel"])
     res = await start_prestamo_sync(code, perfil, turno, str(aula) if aula is not None else "")
     if "error" in res:
         msg = {"noexist":"Código inexistente.","inuse":"El ítem ya está en uso.","reserved":"Este ítem está reservado por otra persona."}[res["error"]]
         await interaction.followup.send(msg, ephemeral=True)
         return
-    send_discord(f"✅ {perfil['user_username']} inició préstamo de {code} ({res['nivel_disp']} - {res['turno_disp']}).")
+    await notify_discord(f"✅ {perfil['user_username']} inició préstamo de {code} ({res['nivel_disp']} - {res['turno_disp']}).")
     await interaction.followup.send(f"✅ Préstamo registrado: {code}.", ephemeral=True)
 
 @tree.command(name="entregar", description="Cierra el préstamo activo de un código")
+@app_commands.autocomplete(code=_autocomplete((EstadoItem.EN_USO,)))
 @is_linked()
 async def entregar(interaction: discord.Interaction, code: str):
     await interaction.response.defer(ephemeral=True)
@@ -278,7 +164,7 @@ async def entregar(interaction: discord.Interaction, code: str):
     if "error" in res:
         await interaction.followup.send("No hay préstamo activo para ese código.", ephemeral=True)
         return
-    send_discord(f"📦 {interaction.user.name} entregó {code}. Duración: {res['dur']} h")
+    await notify_discord(f"📦 {interaction.user.name} entregó {code}. Duración: {res['dur']} h")
     await interaction.followup.send(f"📦 Entregado {code}. Duración: {res['dur']} h", ephemeral=True)
 
 @tree.command(name="activos", description="Lista hasta 10 préstamos activos")
@@ -291,6 +177,7 @@ async def activos(interaction: discord.Interaction):
     await interaction.response.send_message("\n".join(lines), ephemeral=True)
 
 @tree.command(name="status", description="Estado de un código")
+@app_commands.autocomplete(code=_autocomplete())
 @is_linked()
 async def status(interaction: discord.Interaction, code: str):
     d = await status_sync(code)
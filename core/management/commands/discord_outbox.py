@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from core.discord import OutboxWorker
+from core.models import DiscordOutbox
+
+class Command(BaseCommand):
+    help = "Envía a Discord los avisos pendientes del outbox (una pasada o en bucle)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Queda corriendo y drena cada --interval segundos")
+        parser.add_argument("--interval", type=float, default=2.0)
+        parser.add_argument("--lote", type=int, default=50, help="Mensajes por pasada")
+
+    def handle(self, *args, **opts):
+        worker = OutboxWorker(lote=opts["lote"])
+        if not worker.url:
+            self.stderr.write("Falta DISCORD_WEBHOOK_URL en .env"); return
+        if opts["loop"]:
+            self.stdout.write("Worker de Discord iniciado (Ctrl+C para salir).")
+            try:
+                worker.run_forever(intervalo=opts["interval"])
+            except KeyboardInterrupt:
+                pass
+        else:
+            # Una pasada drena de a `lote`; se repite mientras haya algo listo para enviar
+            while worker.drain():
+                pass
+        pend = DiscordOutbox.objects.filter(estado="pendiente").count()
+        m = worker.metrics
+        self.stdout.write(self.style.SUCCESS(
+            f"Enviados {m['enviados']} avisos en {m['posts']} posts · reintentos {m['reintentos']} · "
+            f"fallidos {m['fallidos']} · rate limited {m['rate_limited']} · pendientes {pend}"))
@@ -9,6 +9,7 @@ from django.db.models.functions import TruncDate
 from django.apps import apps
 from sklearn.metrics import mean_absolute_error, mean_squared_error, roc_auc_score, average_precision_score, brier_score_loss, accuracy_score, balanced_accuracy_score, precision_recall_fscore_support, confusion_matrix
 from core.models import Prestamo
+from core.db_router import analiticas
 from core.ml_runtime import get_demand_model, get_late_model
 
 APP_CONFIG = apps.get_app_config("core")
@@ -135,6 +136,7 @@ def tardiness_eval():
             "metrics_t05": metr(y_test, proba_te, y05), "metrics_topt": metr(y_test, proba_te, yop)}
 
 class Command(BaseCommand):
+    @analiticas()
     def handle(self, *args, **kwargs):
         demand = demand_eval(); tardy = tardiness_eval()
         report = {"generated_at": timezone.localtime().strftime("%Y-%m-%d %H:%M:%S"), "demand": demand, "tardiness": tardy}
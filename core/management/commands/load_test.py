@@ -0,0 +1,64 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from core import loadtest
+from core.synthetic import ensure_items
+
+PREFIJO = "loadtest_"
+
+
+class Command(BaseCommand):
+    help = ("Prueba de carga del arranque de turno contra un servidor levantado (runserver/gunicorn): "
+            "préstamos, devoluciones, chat y dashboard en paralelo; p50/p95/p99 y errores de lock por endpoint.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument("--usuarios", type=int, default=40)
+        parser.add_argument("--procesos", type=int, default=4)
+        parser.add_argument("--duracion", type=float, default=60, help="Segundos de carga")
+        parser.add_argument("--think", default="0.1,0.5", help="Pausa entre operaciones (min,max segundos)")
+        parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in loadtest.MIX.items()),
+                            help="Pesos por operación, p.ej. prestamo=3,devolucion=2,chat=3,dashboard=2")
+        parser.add_argument("--password", default="loadtest-123")
+        parser.add_argument("--preparar", action="store_true",
+                            help="Crea los usuarios loadtest_N y el inventario base en la BD configurada (la del servidor)")
+        parser.add_argument("--limpiar", action="store_true", help="Borra los usuarios loadtest_N y sale")
+        parser.add_argument("--json", action="store_true")
+
+    def handle(self, *args, **o):
+        if o["limpiar"]:
+            n, _ = User.objects.filter(username__startswith=PREFIJO).delete()
+            self.stdout.write(f"Borrados {n} registros de usuarios de prueba."); return
+        nombres = [f"{PREFIJO}{i}" for i in range(o["usuarios"])]
+        if o["preparar"]:
+            self._preparar(nombres, o["password"])
+        try:
+            mix = {k: float(v) for k, v in (p.split("=") for p in o["mix"].split(","))}
+            think = tuple(float(x) for x in o["think"].split(","))
+        except ValueError:
+            raise CommandError("Formato inválido en --mix o --think")
+        if set(mix) - set(loadtest.MIX):
+            raise CommandError(f"Operaciones válidas: {', '.join(loadtest.MIX)}")
+
+        res = loadtest.run(o["url"], nombres, o["password"], procesos=o["procesos"],
+                           duracion=o["duracion"], mix=mix, think=think)
+        if o["json"]:
+            self.stdout.write(json.dumps(res, indent=2)); return
+        self.stdout.write(f"{res['usuarios']} usuarios en {res['procesos']} procesos · {res['requests']} requests "
+                          f"en {res['segundos']} s · login fallidos {res['login_fallidos']}")
+        self.stdout.write(f"{'endpoint':<12}{'n':>7}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}"
+                          f"{'confl.':>8}{'errores':>9}{'locks':>7}")
+        for ep, r in res["endpoints"].items():
+            linea = (f"{ep:<12}{r['n']:>7}{r['rps']:>8}{r['p50']:>9}{r['p95']:>9}{r['p99']:>9}"
+                     f"{r['conflictos']:>8}{r['errores']:>9}{r['locks']:>7}")
+            self.stdout.write(self.style.ERROR(linea) if r["errores"] or r["locks"] else linea)
+
+    def _preparar(self, nombres, password):
+        ensure_items()
+        existentes = set(User.objects.filter(username__in=nombres).values_list("username", flat=True))
+        for u in nombres:
+            if u not in existentes:
+                User.objects.create_user(username=u, password=password)  # la señal crea el Profile
+        self.stdout.write(f"Usuarios de prueba listos ({len(nombres)}; {len(nombres) - len(existentes)} nuevos).")
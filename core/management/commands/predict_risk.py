@@ -1,37 +1,22 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from core.models import Item, Mantenimiento
 
-def riesgo_item(it: Item) -> float:
-    # Heurística 0–100 basada en uso y tickets recientes
-    horas = float(it.uso_acumulado_horas or 0)
-    usos  = float(it.usos_acumulados or 0)
-    since = timezone.now() - timezone.timedelta(days=60)
-    tickets = Mantenimiento.objects.filter(item=it, fecha_apertura__gte=since).count()
+from core.risk import calcular, registrar
 
-    s_horas   = min(horas / 80.0, 1.0)        # 80h = alto uso
-    s_usos    = min(usos  / 100.0, 1.0)       # 100 usos = alto
-    s_tickets = min(tickets / 3.0, 1.0)       # 3 tickets recientes = alto
-
-    score = 100 * (0.5*s_horas + 0.3*s_usos + 0.2*s_tickets)
-    return round(score, 1)
 
 class Command(BaseCommand):
-    help = "Calcula score de riesgo por ítem y alerta si supera umbral"
+    help = "Calcula score de riesgo por ítem (una consulta), lo guarda en el historial y alerta si supera umbral"
 
     def add_arguments(self, parser):
         parser.add_argument("--umbral", type=float, default=70.0)
+        parser.add_argument("--no-guardar", action="store_true", help="Sólo calcula e informa (no escribe ItemRiskScore)")
 
     def handle(self, *args, **opts):
         umbral = opts["umbral"]
-        altos = []
-        for it in Item.objects.all():
-            s = riesgo_item(it)
-            if s >= umbral:
-                altos.append((it.code, s))
+        scores = calcular() if opts["no_guardar"] else registrar()
+        altos = sorted(((r["code"], r["score"]) for r in scores if r["score"] >= umbral),
+                       key=lambda x: x[1], reverse=True)
         if altos:
-            altos.sort(key=lambda x: x[1], reverse=True)
-            msg = "⚠️ Ítems con riesgo alto: " + ", ".join([f"{c} ({s})" for c,s in altos[:8]])
-            print(msg)
+            msg = "⚠️ Ítems con riesgo alto: " + ", ".join([f"{c} ({s})" for c, s in altos[:8]])
+            self.stdout.write(msg)
         else:
-            print("Sin riesgos altos.")
\ No newline at end of file
+            self.stdout.write("Sin riesgos altos.")
@@ -0,0 +1,34 @@
+import datetime as dt
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.discord import send_discord
+from core.reports import PERIODOS, FORMATOS, reporte, rango
+
+
+class Command(BaseCommand):
+    help = "Reporte de uso por período (day/week/month/term) comparado con el período anterior"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--periodo", choices=PERIODOS, default="week")
+        parser.add_argument("--formato", choices=FORMATOS, default="discord")
+        parser.add_argument("--fecha", help="Un día dentro del período (YYYY-MM-DD); default hoy")
+        parser.add_argument("--anterior", action="store_true", help="Reporta el período anterior al de --fecha (ya cerrado)")
+        parser.add_argument("--enviar", action="store_true", help="Envía el texto a Discord")
+        parser.add_argument("--refrescar", action="store_true", help="Ignora el cache")
+
+    def handle(self, *args, **o):
+        try:
+            ref = timezone.make_aware(dt.datetime.strptime(o["fecha"], "%Y-%m-%d")) if o["fecha"] else timezone.now()
+        except ValueError:
+            raise CommandError("--fecha debe ser YYYY-MM-DD")
+        if o["anterior"]:
+            ref = rango(o["periodo"], ref)[0] - dt.timedelta(hours=12)
+        if o["enviar"]:
+            send_discord(reporte(o["periodo"], "discord", ref, o["refrescar"]))
+            self.stdout.write(self.style.SUCCESS("Reporte enviado."))
+            return
+        out = reporte(o["periodo"], o["formato"], ref, o["refrescar"])
+        self.stdout.write(json.dumps(out, indent=2, ensure_ascii=False) if o["formato"] == "json" else out)
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db_router import snapshot
+
+
+class Command(BaseCommand):
+    help = "Rehace el snapshot SQLite para lecturas analíticas/ML (ANALYTICS_SNAPSHOT) con la API de backup"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--destino", default=None, help="Ruta del snapshot (default: ANALYTICS_SNAPSHOT)")
+
+    def handle(self, *args, **opts):
+        destino = opts["destino"] or settings.ANALYTICS_SNAPSHOT
+        if not destino:
+            raise CommandError("Definí ANALYTICS_SNAPSHOT o pasá --destino")
+        try:
+            segundos = snapshot(destino)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Snapshot en {destino} ({segundos:.1f} s)."))
@@ -24,6 +24,7 @@ from sklearn.calibration import CalibratedClassifierCV
 import joblib
 
 from core.models import Prestamo
+from core.db_router import analiticas
 
 APP_CONFIG = apps.get_app_config("core")
 MODEL_DIR = Path(APP_CONFIG.path) / "ml_models"
@@ -184,6 +185,7 @@ def train_tardiness(df):
 class Command(BaseCommand):
     help = "Entrena modelos ML (demanda/tardanza) con features nuevas y guarda en core/ml_models/"
 
+    @analiticas()  # los scans de entrenamiento van a la réplica/snapshot si hay
     def handle(self, *args, **kwargs):
         now = timezone.localtime().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.14 on 2026-10-18 22:42
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_reserva_aprobada_at_reserva_aprobada_por_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiscordOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contenido', models.TextField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=10)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('enviado_at', models.DateTimeField(blank=True, null=True)),
+                ('ultimo_error', models.CharField(blank=True, max_length=200)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='core_discor_estado_26ddc7_idx')],
+            },
+        ),
+    ]
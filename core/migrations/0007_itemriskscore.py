@@ -0,0 +1,30 @@
+# Generated by Django 4.2.14 on 2026-10-18 23:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_discordoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemRiskScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calculado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('score', models.FloatField()),
+                ('horas', models.FloatField(default=0)),
+                ('usos', models.PositiveIntegerField(default=0)),
+                ('tickets', models.PositiveIntegerField(default=0)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='riesgos', to='core.item')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['calculado', 'score'], name='core_itemri_calcula_1d37a1_idx'), models.Index(fields=['item', 'calculado'], name='core_itemri_item_id_800b79_idx')],
+            },
+        ),
+    ]
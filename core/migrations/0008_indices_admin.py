@@ -0,0 +1,57 @@
+# Generated by Django 4.2.14 on 2026-10-18 23:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_itemriskscore'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mantenimiento',
+            index=models.Index(fields=['fecha_apertura'], name='core_manten_fecha_a_f2f8cb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mantenimiento',
+            index=models.Index(fields=['estado', 'fecha_apertura'], name='core_manten_estado_5570d9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mantenimiento',
+            index=models.Index(fields=['item', 'fecha_apertura'], name='core_manten_item_id_b82c87_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['inicio'], name='core_presta_inicio_2c6d98_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['fin_real'], name='core_presta_fin_rea_8441ef_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['estado', 'inicio'], name='core_presta_estado_29b501_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['nivel', 'inicio'], name='core_presta_nivel_5eb1de_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['turno', 'inicio'], name='core_presta_turno_615fd0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['inicio'], name='core_reserv_inicio_8968d9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['estado', 'expira'], name='core_reserv_estado_fcc23d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['estado', 'inicio'], name='core_reserv_estado_ea4967_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.14 on 2026-10-18 23:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_indices_admin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('turno', models.CharField(choices=[('M', 'Mañana'), ('T', 'Tarde'), ('N', 'Noche')], max_length=1)),
+                ('nivel', models.CharField(choices=[('SEC', 'Secundario'), ('SUP', 'Superior'), ('PER', 'Personal/Docente')], max_length=3)),
+                ('carrera', models.CharField(blank=True, choices=[('TCD', 'Tecnicatura en Ciencia de Datos'), ('PTEC', 'Profesorado en Tecnologías')], max_length=4, null=True)),
+                ('anio', models.IntegerField(blank=True, choices=[(1, '1°'), (2, '2°')], null=True)),
+                ('prestamos', models.PositiveIntegerField(default=0)),
+                ('con_duracion', models.PositiveIntegerField(default=0)),
+                ('horas', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('tardias', models.PositiveIntegerField(default=0)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uso_diario', to='core.item')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dia'], name='core_usodia_dia_e38a2c_idx'), models.Index(fields=['item', 'dia'], name='core_usodia_item_id_c09929_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PrestamoArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('nivel', models.CharField(choices=[('SEC', 'Secundario'), ('SUP', 'Superior'), ('PER', 'Personal/Docente')], max_length=3)),
+                ('carrera', models.CharField(blank=True, choices=[('TCD', 'Tecnicatura en Ciencia de Datos'), ('PTEC', 'Profesorado en Tecnologías')], max_length=4, null=True)),
+                ('anio', models.IntegerField(blank=True, choices=[(1, '1°'), (2, '2°')], null=True)),
+                ('turno', models.CharField(choices=[('M', 'Mañana'), ('T', 'Tarde'), ('N', 'Noche')], max_length=1)),
+                ('aula', models.CharField(blank=True, max_length=20)),
+                ('solicitante', models.CharField(blank=True, max_length=80)),
+                ('inicio', models.DateTimeField()),
+                ('fin_prevista', models.DateTimeField(blank=True, null=True)),
+                ('fin_real', models.DateTimeField()),
+                ('duracion_horas', models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True)),
+                ('estado', models.CharField(default='devuelto', max_length=10)),
+                ('observaciones', models.TextField(blank=True)),
+                ('archivado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='prestamos_archivados', to='core.item')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['inicio'], name='core_presta_inicio_5b76dd_idx'), models.Index(fields=['fin_real'], name='core_presta_fin_rea_d96646_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.14 on 2026-10-18 23:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_archivo_prestamos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='discordoutbox',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('enviando', 'Enviando'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=10),
+        ),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 from django.conf import settings
@@ -62,6 +64,16 @@ class Prestamo(models.Model):
     estado = models.CharField(max_length=10, default="activo")
     observaciones = models.TextField(blank=True)
 
+    class Meta:
+        # Filtros del admin (date_hierarchy por inicio + list_filter) y rangos de fin_real (KPIs/reportes)
+        indexes = [
+            models.Index(fields=["inicio"]),
+            models.Index(fields=["fin_real"]),
+            models.Index(fields=["estado", "inicio"]),
+            models.Index(fields=["nivel", "inicio"]),
+            models.Index(fields=["turno", "inicio"]),
+        ]
+
     def save(self, *args, **kwargs):
         # Regla institucional: Superior => Turno Noche
         if self.nivel == Nivel.SUPERIOR:
@@ -75,13 +87,86 @@ class Prestamo(models.Model):
         delta = self.fin_real - self.inicio
         self.duracion_horas = round(delta.total_seconds() / 3600, 2)
         self.estado = "devuelto"
-        self.save(update_fields=["fin_real", "duracion_horas", "estado"])
+        with transaction.atomic(savepoint=False):
+            # Sólo cierra si sigue abierto: dos devoluciones simultáneas no suman dos veces
+            cerrado = Prestamo.objects.filter(pk=self.pk, fin_real__isnull=True).update(
+                fin_real=self.fin_real, duracion_horas=self.duracion_horas, estado=self.estado)
+            if not cerrado:
+                self.refresh_from_db(fields=["fin_real", "duracion_horas", "estado"])
+                return
+            acumular_uso({self.item_id: self.duracion_horas})
+        from .inventory import bump_version  # (import circular: inventory importa models)
+        bump_version()  # update() no dispara post_save
+        it = self._state.fields_cache.get("item")
+        if it is not None:  # la copia en memoria refleja esta devolución (sin otro SELECT)
+            it.uso_acumulado_horas = Decimal(str(it.uso_acumulado_horas)) + Decimal(str(self.duracion_horas))
+            it.usos_acumulados += 1
+            it.estado = EstadoItem.DISPONIBLE
+
+
+def acumular_uso(horas_por_item, estado=EstadoItem.DISPONIBLE):
+    """
+    Suma horas y un uso a cada ítem ({item_id: horas}) en un solo UPDATE con
+    F(): uso_acumulado_horas = uso_acumulado_horas + x (atómico en la BD, sin
+    leer el ítem; devoluciones concurrentes no pisan los contadores).
+    """
+    if not horas_por_item:
+        return 0
+    dec = models.DecimalField(max_digits=8, decimal_places=2)
+    if len(horas_por_item) == 1:
+        (item_id, h), = horas_por_item.items()
+        suma, filtro = models.Value(Decimal(str(h)), output_field=dec), {"pk": item_id}
+    else:
+        suma = models.Case(*[models.When(pk=i, then=models.Value(Decimal(str(h)))) for i, h in horas_por_item.items()],
+                           default=models.Value(Decimal("0")), output_field=dec)
+        filtro = {"pk__in": list(horas_por_item)}
+    campos = {"uso_acumulado_horas": models.F("uso_acumulado_horas") + suma,
+              "usos_acumulados": models.F("usos_acumulados") + 1}
+    if estado:
+        campos["estado"] = estado
+    return Item.objects.filter(**filtro).update(**campos)
+
+# Archivo de préstamos (ver core/archive.py, manage.py archivar): los cerrados
+# hace más de ARCHIVE_AFTER_DAYS salen de Prestamo (tabla caliente) a esta tabla,
+# con el mismo id, después de sumarse a UsoDiario
+class PrestamoArchivado(models.Model):
+    id = models.BigIntegerField(primary_key=True)  # el de Prestamo
+    item = models.ForeignKey(Item, on_delete=models.PROTECT, related_name="prestamos_archivados")
+    nivel = models.CharField(max_length=3, choices=Nivel.choices)
+    carrera = models.CharField(max_length=4, choices=CarreraSup.choices, null=True, blank=True)
+    anio = models.IntegerField(choices=AnioSup.choices, null=True, blank=True)
+    turno = models.CharField(max_length=1, choices=Turno.choices)
+    aula = models.CharField(max_length=20, blank=True)
+    solicitante = models.CharField(max_length=80, blank=True)
+    inicio = models.DateTimeField()
+    fin_prevista = models.DateTimeField(null=True, blank=True)
+    fin_real = models.DateTimeField()
+    duracion_horas = models.DecimalField(max_digits=7, decimal_places=2, null=True, blank=True)
+    estado = models.CharField(max_length=10, default="devuelto")
+    observaciones = models.TextField(blank=True)
+    archivado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["inicio"]), models.Index(fields=["fin_real"])]
+
+
+# Rollup diario de los préstamos archivados: una fila por día (local, de
+# fin_real) × ítem × turno × nivel × carrera × año. KPIs y reportes leen esto en
+# lugar de la tabla de archivo.
+class UsoDiario(models.Model):
+    dia = models.DateField()
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="uso_diario")
+    turno = models.CharField(max_length=1, choices=Turno.choices)
+    nivel = models.CharField(max_length=3, choices=Nivel.choices)
+    carrera = models.CharField(max_length=4, choices=CarreraSup.choices, null=True, blank=True)
+    anio = models.IntegerField(choices=AnioSup.choices, null=True, blank=True)
+    prestamos = models.PositiveIntegerField(default=0)
+    con_duracion = models.PositiveIntegerField(default=0)  # préstamos con duracion_horas (para promedios)
+    horas = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    tardias = models.PositiveIntegerField(default=0)
 
-        it = self.item
-        it.uso_acumulado_horas = round(float(it.uso_acumulado_horas) + float(self.duracion_horas), 2)
-        it.usos_acumulados += 1
-        it.estado = EstadoItem.DISPONIBLE
-        it.save(update_fields=["uso_acumulado_horas", "usos_acumulados", "estado"])
+    class Meta:
+        indexes = [models.Index(fields=["dia"]), models.Index(fields=["item", "dia"])]
 
 # Mantenimiento
 class Mantenimiento(models.Model):
@@ -92,6 +177,14 @@ class Mantenimiento(models.Model):
     estado = models.CharField(max_length=15, choices=[("abierto","Abierto"),("en_proceso","En proceso"),("cerrado","Cerrado")], default="abierto")
     fecha_apertura = models.DateTimeField(auto_now_add=True)
     fecha_cierre = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["fecha_apertura"]),
+            models.Index(fields=["estado", "fecha_apertura"]),
+            models.Index(fields=["item", "fecha_apertura"]),  # tickets recientes por ítem (core/risk.py)
+        ]
+
     def cerrar(self):
         self.estado = "cerrado"
         self.fecha_cierre = timezone.now()
@@ -125,46 +218,70 @@ class Reserva(models.Model):
     cancelada_at = models.DateTimeField(null=True, blank=True)
     cancel_motivo = models.CharField(max_length=120, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["inicio"]),
+            models.Index(fields=["estado", "expira"]),  # pendientes / expire_reservas
+            models.Index(fields=["estado", "inicio"]),
+        ]
+
+    def transicion(self, estado, desde=("activa",), **campos):
+        """
+        Pasa a `estado` sólo si la fila sigue en `desde` (UPDATE ... WHERE
+        estado IN desde): entre operadores y el cron compitiendo por la misma
+        reserva gana uno solo, sin locks. Devuelve True si esta llamada ganó.
+        """
+        campos["estado"] = estado
+        if not Reserva.objects.filter(pk=self.pk, estado__in=desde).update(**campos):
+            self.refresh_from_db(fields=["estado"])
+            return False
+        for k, v in campos.items():
+            setattr(self, k, v)
+        return True
+
+    def _liberar_item(self):
+        # RESERVADO -> DISPONIBLE también condicional (puede haberse prestado en el medio)
+        if self.item_id and Item.objects.filter(pk=self.item_id, estado=EstadoItem.RESERVADO).update(
+                estado=EstadoItem.DISPONIBLE):
+            from .inventory import bump_version
+            bump_version()
+            it = self._state.fields_cache.get("item")
+            if it is not None:
+                it.estado = EstadoItem.DISPONIBLE
+
     def expirar(self):
-        if self.estado != "activa":
-            return
-        self.estado = "expirada"
-        self.save(update_fields=["estado"])
-        if self.item and self.item.estado == EstadoItem.RESERVADO:
-            self.item.estado = EstadoItem.DISPONIBLE
-            self.item.save(update_fields=["estado"])
+        with transaction.atomic():
+            if not self.transicion("expirada"):
+                return False
+            self._liberar_item()
+        return True
 
     def cancelar(self, user=None, motivo=""):
-        if self.estado != "activa":
-            return
-        self.estado = "cancelada"
-        self.cancelada_por = user
-        self.cancelada_at = timezone.now()
-        self.cancel_motivo = motivo
-        self.save(update_fields=["estado","cancelada_por","cancelada_at","cancel_motivo"])
-        if self.item and self.item.estado == EstadoItem.RESERVADO:
-            self.item.estado = EstadoItem.DISPONIBLE
-            self.item.save(update_fields=["estado"])
+        with transaction.atomic():
+            if not self.transicion("cancelada", cancelada_por=user, cancelada_at=timezone.now(),
+                                   cancel_motivo=motivo):
+                return False
+            self._liberar_item()
+        return True
 
     def aprobar_y_convertir(self, user_aprobador):
-        if self.estado != "activa":
+        if not self.item_id:
             return None
-        it = self.item
-        if not it or it.estado not in (EstadoItem.RESERVADO, EstadoItem.DISPONIBLE):
-            return None
-
-        self.aprobada_por = user_aprobador
-        self.aprobada_at = timezone.now()
-        self.estado = "convertida"
-        self.save(update_fields=["aprobada_por","aprobada_at","estado"])
-
-        p = Prestamo.objects.create(
-            item=it, nivel=self.nivel,
-            carrera=None, anio=None,  # si querés, setear desde Profile del solicitante
-            turno=self.turno, aula=self.aula, solicitante=self.solicitante, fin_prevista=None
-        )
-        it.estado = EstadoItem.EN_USO
-        it.save(update_fields=["estado"])
+        from .allocation import claim_item  # (import circular: allocation importa models)
+        with transaction.atomic():
+            it = claim_item(item_id=self.item_id, nuevo_estado=EstadoItem.EN_USO,
+                            desde=(EstadoItem.RESERVADO, EstadoItem.DISPONIBLE))
+            if it is None:
+                return None
+            if not self.transicion("convertida", aprobada_por=user_aprobador, aprobada_at=timezone.now()):
+                transaction.set_rollback(True)  # otro la canceló/aprobó: se suelta el ítem
+                return None
+            p = Prestamo.objects.create(
+                item=it, nivel=self.nivel,
+                carrera=None, anio=None,  # si querés, setear desde Profile del solicitante
+                turno=self.turno, aula=self.aula, solicitante=self.solicitante, fin_prevista=None
+            )
+        self.item = it
         return p
 
 # Usuarios y Discord
@@ -183,4 +300,36 @@ class DiscordLinkToken(models.Model):
     used_at = models.DateTimeField(null=True, blank=True)
     def mark_used(self):
         self.used_at = timezone.now()
-        self.save(update_fields=["used_at"])
\ No newline at end of file
+        self.save(update_fields=["used_at"])
+# Avisos a Discord (outbox): se escriben en la transacción del request y los
+# envía en segundo plano `manage.py discord_outbox` (ver core/discord.py)
+class DiscordOutbox(models.Model):
+    ESTADOS = [
+        ("pendiente", "Pendiente"),
+        ("enviando", "Enviando"),  # tomado por un worker hasta proximo_intento
+        ("enviado", "Enviado"),
+        ("fallido", "Fallido"),
+    ]
+    contenido = models.TextField()
+    estado = models.CharField(max_length=10, choices=ESTADOS, default="pendiente")
+    intentos = models.PositiveIntegerField(default=0)
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    creado = models.DateTimeField(auto_now_add=True)
+    enviado_at = models.DateTimeField(null=True, blank=True)
+    ultimo_error = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["estado", "proximo_intento"])]
+
+# Riesgo de mantenimiento: una fila por ítem y corrida (historial); lo escribe
+# core/risk.py (manage.py predict_risk, por cron)
+class ItemRiskScore(models.Model):
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="riesgos")
+    calculado = models.DateTimeField(default=timezone.now)
+    score = models.FloatField()  # 0–100
+    horas = models.FloatField(default=0)
+    usos = models.PositiveIntegerField(default=0)
+    tickets = models.PositiveIntegerField(default=0)  # Mantenimientos abiertos en la ventana
+
+    class Meta:
+        indexes = [models.Index(fields=["calculado", "score"]), models.Index(fields=["item", "calculado"])]
@@ -0,0 +1,205 @@
+# core/reports.py
+# Reportes por período (día / semana / mes / cuatrimestre) con comparación
+# contra el período anterior. Todo sale de dos consultas agregadas (por
+# tipo×turno con Sum/Count condicionales para ambos períodos, y el top de
+# ítems), sin importar cuántos préstamos haya. El resultado ya renderizado
+# (discord / json / html) se cachea por período: los cerrados casi no cambian
+# y se guardan por días; el vigente se invalida con la versión de inventario.
+import datetime as dt
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Prestamo, TipoItem, Turno
+from .inventory import current_version
+from . import archive
+from .db_router import analiticas, atraso_lectura
+
+PERIODOS = ("day", "week", "month", "term")
+FORMATOS = ("discord", "json", "html")
+TITULOS = {
+    "day": "Resumen Diario",
+    "week": "Resumen Semanal",
+    "month": "Resumen Mensual",
+    "term": "Resumen del Cuatrimestre",
+}
+TIPOS = [k for k, _ in TipoItem.choices]
+TURNOS = [k for k, _ in Turno.choices]
+# Cuatrimestres: 1° de marzo a julio, 2° de agosto a febrero (incluye el receso)
+_INICIO_CUATRI = (3, 8)
+
+
+def _aware(d):
+    return timezone.make_aware(dt.datetime.combine(d, dt.time.min))
+
+
+def rango(periodo, ref=None):
+    """[desde, hasta) del período que contiene `ref` (hora local)."""
+    d = timezone.localtime(ref or timezone.now()).date()
+    if periodo == "day":
+        ini, fin = d, d + dt.timedelta(days=1)
+    elif periodo == "week":
+        ini = d - dt.timedelta(days=d.weekday())
+        fin = ini + dt.timedelta(days=7)
+    elif periodo == "month":
+        ini = d.replace(day=1)
+        fin = (ini + dt.timedelta(days=32)).replace(day=1)
+    elif periodo == "term":
+        m1, m2 = _INICIO_CUATRI
+        if m1 <= d.month < m2:
+            ini, fin = dt.date(d.year, m1, 1), dt.date(d.year, m2, 1)
+        else:
+            anio = d.year if d.month >= m2 else d.year - 1
+            ini, fin = dt.date(anio, m2, 1), dt.date(anio + 1, m1, 1)
+    else:
+        raise ValueError(f"Período inválido: {periodo}")
+    return _aware(ini), _aware(fin)
+
+
+def anterior(periodo, desde):
+    return rango(periodo, desde - dt.timedelta(hours=12))
+
+
+def heuristicas(tipos_horas: dict, dias=7):
+    # Umbrales pensados para una semana; se escalan con el largo del período
+    k = dias / 7
+    tips = []
+    if tipos_horas.get(TipoItem.NOTEBOOK, 0) >= 40 * k: tips.append(f"Revisar notebooks: ≥{40 * k:.0f} h acumuladas.")
+    if tipos_horas.get(TipoItem.TABLET, 0) >= 40 * k: tips.append(f"Revisar tablets: ≥{40 * k:.0f} h.")
+    if tipos_horas.get(TipoItem.ALARGUE, 0) >= 60 * k: tips.append(f"Chequeo de alargues: ≥{60 * k:.0f} h.")
+    return tips or ["Todo dentro de parámetros."]
+
+
+def _delta(actual, previo):
+    return round((actual - previo) / previo * 100, 1) if previo else None
+
+
+def _par(actual, previo, nd=None):
+    if nd is not None:
+        actual, previo = round(actual, nd), round(previo, nd)
+    return {"actual": actual, "anterior": previo, "delta_pct": _delta(actual, previo)}
+
+
+@analiticas()
+def calcular(periodo, ref=None):
+    """Datos del reporte (dict serializable a JSON) en dos consultas (cuatro si toca el archivo)."""
+    desde, hasta = rango(periodo, ref)
+    p_desde, p_hasta = anterior(periodo, desde)
+    act = Q(fin_real__gte=desde, fin_real__lt=hasta)
+    prev = Q(fin_real__gte=p_desde, fin_real__lt=p_hasta)
+    tarde = Q(fin_prevista__isnull=False, fin_real__gt=F("fin_prevista"))
+
+    base = Prestamo.objects.filter(fin_real__gte=p_desde, fin_real__lt=hasta)
+    filas = (base.values("item__tipo", "turno")
+                 .annotate(n_a=Count("id", filter=act), n_p=Count("id", filter=prev),
+                           h_a=Sum("duracion_horas", filter=act), h_p=Sum("duracion_horas", filter=prev),
+                           t_a=Count("id", filter=act & tarde), t_p=Count("id", filter=prev & tarde))
+                 .order_by())
+    con_archivo = archive.alcanza(p_desde)
+    if con_archivo:
+        # Parte del rango ya está archivada: se suma el rollup diario (rangos de días locales enteros)
+        dia = lambda d: timezone.localtime(d).date()
+        d_act = Q(dia__gte=dia(desde), dia__lt=dia(hasta))
+        d_prev = Q(dia__gte=dia(p_desde), dia__lt=dia(p_hasta))
+        filas = list(filas) + list(
+            archive.uso_diario(p_desde, hasta).values("item__tipo", "turno")
+            .annotate(n_a=Sum("prestamos", filter=d_act), n_p=Sum("prestamos", filter=d_prev),
+                      h_a=Sum("horas", filter=d_act), h_p=Sum("horas", filter=d_prev),
+                      t_a=Sum("tardias", filter=d_act), t_p=Sum("tardias", filter=d_prev))
+            .order_by())
+    tot = dict.fromkeys(("n_a", "n_p", "h_a", "h_p", "t_a", "t_p"), 0.0)
+    por_tipo = {t: [0.0, 0.0] for t in TIPOS}
+    por_turno = {t: [0.0, 0.0] for t in TURNOS}
+    for r in filas:
+        for k in tot:
+            tot[k] += float(r[k] or 0)
+        h = (float(r["h_a"] or 0), float(r["h_p"] or 0))
+        for destino, clave in ((por_tipo, r["item__tipo"]), (por_turno, r["turno"])):
+            acc = destino.setdefault(clave, [0.0, 0.0])
+            acc[0] += h[0]; acc[1] += h[1]
+
+    top = (Prestamo.objects.filter(act).values("item__code")
+           .annotate(h=Sum("duracion_horas")).order_by("-h", "item__code"))
+    if con_archivo:
+        por_item = {r["item__code"]: float(r["h"] or 0) for r in top}
+        for r in archive.uso_diario(desde, hasta).values("item__code").annotate(h=Sum("horas")).order_by():
+            por_item[r["item__code"]] = por_item.get(r["item__code"], 0.0) + float(r["h"] or 0)
+        top = [{"item__code": c, "h": h} for c, h in sorted(por_item.items(), key=lambda x: (-x[1], x[0]))]
+    top = top[:5]
+    horas_tipo = {t: round(v[0], 1) for t, v in por_tipo.items()}
+    dias = (hasta - desde).days
+    return {
+        "periodo": periodo,
+        "titulo": TITULOS[periodo],
+        "desde": desde.isoformat(), "hasta": hasta.isoformat(),
+        "anterior": {"desde": p_desde.isoformat(), "hasta": p_hasta.isoformat()},
+        "etiqueta": f"{desde:%d/%m/%Y}–{hasta - dt.timedelta(days=1):%d/%m/%Y}",
+        "cerrado": hasta <= timezone.now(),
+        "prestamos": _par(int(tot["n_a"]), int(tot["n_p"])),
+        "horas": _par(tot["h_a"], tot["h_p"], 1),
+        "tardias": _par(int(tot["t_a"]), int(tot["t_p"])),
+        "horas_por_tipo": {t: _par(v[0], v[1], 1) for t, v in por_tipo.items()},
+        "horas_por_turno": {t: _par(v[0], v[1], 1) for t, v in por_turno.items()},
+        "top_items": [{"code": r["item__code"], "horas": round(float(r["h"] or 0), 1)} for r in top],
+        "recomendaciones": heuristicas(horas_tipo, dias),
+    }
+
+
+# ---------- Salidas ----------
+def _fmt_delta(d):
+    if d is None:
+        return "sin datos previos"
+    return f"{'▲' if d > 0 else '▼' if d < 0 else '='} {abs(d):.0f}% vs. anterior"
+
+
+def render_discord(data):
+    h = data["horas_por_tipo"]
+    top = data["top_items"]
+    top_msg = ", ".join(f"{r['code']} ({r['horas']:.1f} h)" for r in top) if top else "Sin movimientos"
+    return (
+        f"📊 {data['titulo']} ({data['etiqueta']})\n"
+        f"- Préstamos: {data['prestamos']['actual']} ({_fmt_delta(data['prestamos']['delta_pct'])})\n"
+        f"- Horas totales: {data['horas']['actual']:.1f} ({_fmt_delta(data['horas']['delta_pct'])})\n"
+        f"- Notebooks: {h['NB']['actual']:.1f} | Tablets: {h['TB']['actual']:.1f} | Alargues: {h['AL']['actual']:.1f}\n"
+        f"- Devoluciones tardías: {data['tardias']['actual']} ({_fmt_delta(data['tardias']['delta_pct'])})\n"
+        f"- Top ítems: {top_msg}\n"
+        f"- Recomendaciones: " + " ".join(f"• {t}" for t in data["recomendaciones"])
+    )
+
+
+def render_html(data):
+    """Fragmento HTML (tablas) del reporte; lo incluye la página /reportes/."""
+    filas = lambda d, nombres: [(nombres.get(k, k), v) for k, v in d.items()]
+    return render_to_string("reporte_fragmento.html", {
+        "r": data,
+        "tipos": filas(data["horas_por_tipo"], dict(TipoItem.choices)),
+        "turnos": filas(data["horas_por_turno"], dict(Turno.choices)),
+    })
+
+
+_RENDER = {"discord": render_discord, "json": lambda d: d, "html": render_html}
+
+
+def reporte(periodo="week", formato="json", ref=None, refrescar=False):
+    """Reporte renderizado y cacheado por período y formato."""
+    if periodo not in PERIODOS:
+        raise ValueError(f"Período inválido: {periodo}")
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato}")
+    desde, hasta = rango(periodo, ref)
+    # Cerrado también en la réplica/snapshot de la que lee calcular(): si todavía no
+    # tiene el final del período, el resultado se cachea como el del período en curso
+    cerrado = hasta <= timezone.now() - dt.timedelta(seconds=atraso_lectura())
+    key = f"reporte:{periodo}:{desde:%Y%m%d}:{formato}"
+    if not cerrado:
+        key += f":v{current_version()}"  # el período en curso cambia con cada préstamo
+    out = None if refrescar else cache.get(key)
+    if out is None:
+        out = _RENDER[formato](calcular(periodo, ref))
+        ttl = (getattr(settings, "REPORT_CACHE_TTL_CERRADO", 7 * 24 * 3600) if cerrado
+               else getattr(settings, "REPORT_CACHE_TTL", 300))
+        cache.set(key, out, ttl)
+    return out
@@ -0,0 +1,68 @@
+# core/risk.py
+# Score de riesgo de mantenimiento (0–100) para todo el inventario.
+# Antes predict_risk hacía un COUNT de Mantenimiento por ítem (N+1); acá es una
+# sola consulta (Count filtrado por fecha) y el score se calcula vectorizado
+# con NumPy. Cada corrida se guarda en ItemRiskScore (historial); la API y el
+# admin leen la última.
+import datetime as dt
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .models import Item, ItemRiskScore
+
+VENTANA_DIAS = 60
+# (tope, peso): horas de uso, cantidad de usos, tickets recientes
+TOPES = np.array([80.0, 100.0, 3.0])  # 80h / 100 usos / 3 tickets = alto
+PESOS = np.array([0.5, 0.3, 0.2])
+
+
+def score_arrays(horas, usos, tickets):
+    """Heurística 0–100 basada en uso y tickets recientes (arrays de igual largo)."""
+    m = np.column_stack([np.asarray(horas, float), np.asarray(usos, float), np.asarray(tickets, float)])
+    return np.round(100 * np.minimum(m / TOPES, 1.0) @ PESOS, 1)
+
+
+def calcular(now=None, dias=VENTANA_DIAS):
+    """Scores de todo el inventario en una consulta: lista de dicts (id, code, score, horas, usos, tickets)."""
+    since = (now or timezone.now()) - dt.timedelta(days=dias)
+    filas = list(Item.objects.annotate(
+        tickets=Count("mantenimientos", filter=Q(mantenimientos__fecha_apertura__gte=since))
+    ).values_list("id", "code", "uso_acumulado_horas", "usos_acumulados", "tickets").order_by("id"))
+    if not filas:
+        return []
+    ids, codes, horas, usos, tickets = zip(*filas)
+    horas = [float(h or 0) for h in horas]
+    scores = score_arrays(horas, usos, tickets)
+    return [
+        {"id": i, "code": c, "score": float(s), "horas": h, "usos": u, "tickets": t}
+        for i, c, s, h, u, t in zip(ids, codes, scores, horas, usos, tickets)
+    ]
+
+
+def registrar(now=None, dias=VENTANA_DIAS, conservar_dias=None):
+    """Calcula y guarda una corrida; borra historial más viejo que `conservar_dias`."""
+    now = now or timezone.now()
+    scores = calcular(now, dias)
+    conservar = conservar_dias if conservar_dias is not None else getattr(settings, "RISK_HISTORY_DAYS", 90)
+    with transaction.atomic():
+        ItemRiskScore.objects.bulk_create([
+            ItemRiskScore(item_id=r["id"], calculado=now, score=r["score"],
+                          horas=r["horas"], usos=r["usos"], tickets=r["tickets"])
+            for r in scores
+        ], batch_size=1000)
+        if conservar:
+            ItemRiskScore.objects.filter(calculado__lt=now - dt.timedelta(days=conservar)).delete()
+    return scores
+
+
+def ultimos(umbral=None):
+    """Scores de la última corrida (mayor riesgo primero); queryset vacío si nunca corrió."""
+    ultimo = ItemRiskScore.objects.aggregate(m=Max("calculado"))["m"]
+    qs = ItemRiskScore.objects.filter(calculado=ultimo).select_related("item").order_by("-score", "item__code")
+    if umbral is not None:
+        qs = qs.filter(score__gte=umbral)
+    return qs
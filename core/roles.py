@@ -0,0 +1,112 @@
+# core/roles.py
+# Grupos y perfil del usuario resueltos una vez por request y guardados en la
+# sesión. Antes cada chequeo de rol (vistas, {% has_role %} varias veces en
+# base.html) hacía su propio user.groups.filter(...).exists() y varias vistas
+# un Profile.get_or_create por request.
+# La sesión guarda (versión, grupos, perfil); la versión vive en el cache y la
+# cambian las señales (core/signals.py) al tocar grupos o el perfil del usuario,
+# o al renombrar/borrar un Group (versión global).
+# Sólo con un cache compartido (CACHE_URL, ver core/caching.py): con LocMem cada
+# proceso tendría su versión y un bump del bot o de otro worker no llegaría, así
+# que sin él los roles se leen de la BD en cada request.
+import uuid
+
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from .caching import compartido
+from .models import Profile
+
+SESSION_KEY = "_roles_perfil"
+OPERADOR = ("OPERADOR", "STAFF")
+_PERFIL_CAMPOS = ("id", "nivel", "carrera", "anio", "discord_user_id")
+
+
+def _key(user_id=None):
+    return f"roles:version:{user_id}" if user_id is not None else "roles:version"
+
+
+def _version(user_id=None):
+    v = cache.get(_key(user_id))
+    if v is None:
+        # Sin versión en el cache (reiniciado): una nueva invalida lo guardado en sesiones
+        cache.add(_key(user_id), uuid.uuid4().hex, timeout=None)
+        v = cache.get(_key(user_id))
+    return v
+
+
+def bump_roles(user_id=None):
+    """Invalida los roles/perfil cacheados de un usuario (o de todos si user_id es None)."""
+    cache.set(_key(user_id), uuid.uuid4().hex, timeout=None)
+
+
+class Roles:
+    def __init__(self, grupos=(), superuser=False):
+        self.grupos = frozenset(grupos)
+        self.superuser = superuser
+
+    def tiene(self, *nombres):
+        return self.superuser or bool(self.grupos.intersection(nombres))
+
+    @property
+    def es_operador(self):
+        return self.tiene(*OPERADOR)
+
+
+def _cargar(user, version):
+    perfil, _ = Profile.objects.get_or_create(user=user)
+    return {
+        "uid": user.pk,
+        "v": version,
+        "grupos": sorted(user.groups.values_list("name", flat=True)),
+        "perfil": {c: getattr(perfil, c) for c in _PERFIL_CAMPOS},
+    }
+
+
+def _datos(request):
+    if not hasattr(request, "_roles_datos"):
+        user = request.user
+        if not compartido():
+            request._roles_datos = _cargar(user, None)
+            return request._roles_datos
+        version = [_version(), _version(user.pk)]
+        session = getattr(request, "session", None)
+        d = session.get(SESSION_KEY) if session is not None else None
+        if not d or d.get("uid") != user.pk or d.get("v") != version:
+            d = _cargar(user, version)
+            if session is not None:
+                session[SESSION_KEY] = d
+        request._roles_datos = d
+    return request._roles_datos
+
+
+def roles_de(request):
+    user = request.user
+    if not user.is_authenticated:
+        return Roles()
+    return Roles(_datos(request)["grupos"], user.is_superuser)
+
+
+def perfil_de(request):
+    """Profile del usuario (sin consultar la BD si está en la sesión); None si es anónimo."""
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    if not hasattr(request, "_perfil"):
+        p = Profile(user=user, **_datos(request)["perfil"])
+        p._state.adding = False
+        p._state.db = "default"
+        request._perfil = p
+    return request._perfil
+
+
+class RolesMiddleware:
+    """request.roles / request.perfil perezosos (va después de AuthenticationMiddleware)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.roles = SimpleLazyObject(lambda: roles_de(request))
+        request.perfil = SimpleLazyObject(lambda: perfil_de(request))
+        return self.get_response(request)
@@ -1,9 +1,45 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.conf import settings
-from .models import Profile
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from .models import Profile, Item, Prestamo
+from .inventory import bump_version
+from .roles import bump_roles
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
-        Profile.objects.create(user=instance)
\ No newline at end of file
+        Profile.objects.create(user=instance)
+
+@receiver([post_save, post_delete], sender=Item)
+@receiver([post_save, post_delete], sender=Prestamo)
+def invalidate_inventory(sender, **kwargs):
+    # Mantiene coherente el índice en memoria de core/inventory.py
+    bump_version()
+
+# Roles/perfil cacheados en la sesión (core/roles.py)
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+def invalidate_roles_grupos(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        bump_roles(instance.pk)
+    elif pk_set:
+        for uid in pk_set:
+            bump_roles(uid)
+    else:
+        bump_roles()  # group.user_set.clear(): no sabemos a quién afectó
+
+@receiver([post_save, post_delete], sender=Profile)
+def invalidate_roles_perfil(sender, instance, **kwargs):
+    bump_roles(instance.user_id)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_roles_usuario(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) - {"last_login"}:
+        bump_roles(instance.pk)
+
+@receiver([post_save, post_delete], sender=Group)
+def invalidate_roles_global(sender, **kwargs):
+    bump_roles()
@@ -0,0 +1,76 @@
+# core/sqlite/base.py
+# Backend SQLite para producción (ENGINE = "core.sqlite"; settings lo activa
+# solo si la BD es SQLite y SQLITE_TUNING no está en False).
+# - PRAGMAs en cada conexión: WAL (lecturas que no bloquean a la escritura),
+#   synchronous=NORMAL (seguro con WAL), mmap y cache de páginas en memoria.
+# - Transacciones con BEGIN IMMEDIATE: el lock de escritura se toma al empezar
+#   el atomic() y no al primer UPDATE. Con BEGIN a secas, dos transacciones que
+#   leyeron y después quieren escribir chocan con SQLITE_BUSY sin pasar por el
+#   busy_timeout ("database is locked" inmediato).
+# - Reintentos con backoff exponencial y jitter cuando, pasado el busy_timeout,
+#   la BD sigue ocupada. Solo fuera de una transacción (el BEGIN IMMEDIATE o una
+#   sentencia en autocommit), donde la sentencia fallida no dejó nada a medias.
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64000,  # KiB (64 MB)
+    "temp_store": "MEMORY",
+}
+REINTENTOS = 4
+BACKOFF = 0.05  # segundos, se duplica en cada intento (más jitter)
+
+
+def _ocupada(e):
+    msg = str(e).lower()
+    return "database is locked" in msg or "database is busy" in msg
+
+
+class CursorConReintento(base.SQLiteCursorWrapper):
+    reintentos = REINTENTOS
+
+    def execute(self, query, params=None):
+        if self.connection.in_transaction:
+            return super().execute(query, params)
+        for intento in range(self.reintentos + 1):
+            try:
+                return super().execute(query, params)
+            except base.Database.OperationalError as e:
+                if intento == self.reintentos or not _ocupada(e):
+                    raise
+                time.sleep(BACKOFF * 2 ** intento * random.uniform(0.5, 1.5))
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # OPTIONS propias (no van a sqlite3.connect): pragmas, transaction_mode, busy_retries
+    _PROPIAS = ("pragmas", "transaction_mode", "busy_retries")
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        for k in self._PROPIAS:
+            kwargs.pop(k, None)
+        return kwargs
+
+    @property
+    def _opciones(self):
+        return self.settings_dict["OPTIONS"]
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, valor in {**PRAGMAS, **self._opciones.get("pragmas", {})}.items():
+            conn.execute(f"PRAGMA {pragma} = {valor}")
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=CursorConReintento)
+        cursor.reintentos = self._opciones.get("busy_retries", REINTENTOS)
+        return cursor
+
+    def _start_transaction_under_autocommit(self):
+        modo = self._opciones.get("transaction_mode", "IMMEDIATE")
+        self.cursor().execute(f"BEGIN {modo}" if modo else "BEGIN")
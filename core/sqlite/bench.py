@@ -0,0 +1,132 @@
+# core/sqlite/bench.py
+# Benchmark de concurrencia contra la BD configurada (sin servidor HTTP): N hilos,
+# cada uno con su conexión, repiten préstamo (claim + INSERT en un atomic),
+# devolución (Prestamo.cerrar) y lecturas del mostrador, mientras otro hilo hace
+# de cron (crea reservas vencidas y corre expirar_reservas). Lo usa
+# `manage.py bench_sqlite`, que con --comparar corre el perfil de Django y el de
+# producción (core/sqlite) sobre la misma BD y muestra la diferencia.
+# Crea sus propios ítems (prefijo BSQ-) y los borra al terminar.
+import random
+import threading
+import time
+
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+from ..allocation import claim_item
+from ..bulk import expirar_reservas
+from ..inventory import bump_version
+from ..loadtest import resumir
+from ..models import EstadoItem, Item, Nivel, Prestamo, Reserva, TipoItem, Turno
+
+PREFIJO = "BSQ-"
+MIX = {"prestamo": 3, "devolucion": 2, "lectura": 4}
+
+
+def preparar(items):
+    limpiar()
+    Item.objects.bulk_create([Item(code=f"{PREFIJO}{i:04d}", tipo=TipoItem.NOTEBOOK) for i in range(items)])
+    bump_version()
+
+
+def limpiar():
+    Reserva.objects.filter(item__code__startswith=PREFIJO).delete()
+    Prestamo.objects.filter(item__code__startswith=PREFIJO).delete()
+    Item.objects.filter(code__startswith=PREFIJO).delete()
+    bump_version()
+
+
+def _medir(muestras, nombre, fn):
+    t0 = time.perf_counter()
+    try:
+        fn()
+        res = "ok"
+    except OperationalError as e:
+        res = "lock" if "locked" in str(e) or "busy" in str(e) else "error"
+    muestras.append((nombre, (time.perf_counter() - t0) * 1000, res))
+
+
+class _Usuario:
+    def __init__(self, n, item_ids):
+        self.nombre = f"bsq{n}"
+        self.item_ids = item_ids
+        self.prestados = []
+        self.muestras = []
+
+    def prestamo(self):
+        with transaction.atomic():
+            # como en el mostrador: un ítem puntual (si otro hilo lo tomó, no hay préstamo)
+            it = claim_item(item_id=random.choice(self.item_ids))
+            if it is None:
+                return
+            p = Prestamo.objects.create(item=it, nivel=Nivel.SECUNDARIO, turno=Turno.MANANA,
+                                        solicitante=self.nombre)
+        self.prestados.append(p)
+
+    def devolucion(self):
+        if self.prestados:
+            self.prestados.pop(0).cerrar()
+        else:
+            self.prestamo()
+
+    def lectura(self):
+        list(Item.objects.filter(code__startswith=PREFIJO, estado=EstadoItem.DISPONIBLE)
+             .values_list("code", flat=True)[:20])
+        Prestamo.objects.filter(solicitante=self.nombre, fin_real__isnull=True).count()
+
+    def correr(self, hasta, mix):
+        ops, pesos = zip(*mix.items())
+        try:
+            while time.monotonic() < hasta:
+                op = random.choices(ops, pesos)[0]
+                _medir(self.muestras, op, getattr(self, op))
+        finally:
+            connection.close()
+
+
+def _cron(hasta, cada, muestras):
+    def tick():
+        vencida = timezone.now() - timezone.timedelta(minutes=1)
+        Reserva.objects.bulk_create([Reserva(tipo=TipoItem.NOTEBOOK, nivel=Nivel.SECUNDARIO, turno=Turno.MANANA,
+                                             solicitante="bsq-cron", expira=vencida) for _ in range(5)])
+        expirar_reservas(hora_corte=24)  # sólo expira (nunca el auto-cancel nocturno)
+    try:
+        while time.monotonic() < hasta:
+            _medir(muestras, "cron", tick)
+            time.sleep(cada)
+    finally:
+        connection.close()
+
+
+def run(hilos=16, duracion=10.0, items=200, mix=None, cron_cada=0.5, semilla=0):
+    """Corre la carga y devuelve el resumen por operación (mismo formato que load_test)."""
+    random.seed(semilla)
+    mix = mix or MIX
+    preparar(items)
+    item_ids = list(Item.objects.filter(code__startswith=PREFIJO).values_list("id", flat=True))
+    usuarios = [_Usuario(i, item_ids) for i in range(hilos)]
+    muestras_cron = []
+    try:
+        hasta = time.monotonic() + duracion
+        ts = [threading.Thread(target=u.correr, args=(hasta, mix)) for u in usuarios]
+        ts.append(threading.Thread(target=_cron, args=(hasta, cron_cada, muestras_cron)))
+        t0 = time.monotonic()
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+        segundos = time.monotonic() - t0
+    finally:
+        Reserva.objects.filter(solicitante="bsq-cron").delete()
+        limpiar()
+    muestras = [m for u in usuarios for m in u.muestras] + muestras_cron
+    ok = sum(1 for m in muestras if m[2] == "ok")
+    with connection.cursor() as c:
+        pragmas = {p: c.execute(f"PRAGMA {p}").fetchone()[0] for p in ("journal_mode", "synchronous")}
+    return {
+        "hilos": hilos, "segundos": round(segundos, 1), "operaciones": len(muestras),
+        "ops_por_seg": round(ok / segundos, 1) if segundos else None,
+        "locks": sum(1 for m in muestras if m[2] == "lock"),
+        "pragmas": pragmas,
+        "operaciones_detalle": resumir(muestras, segundos),
+    }
@@ -0,0 +1,267 @@
+# core/synthetic.py
+# Históricos sintéticos con señales fuertes (para ML y benchmarks):
+# - Mayor demanda en semanas de exámenes (junio y noviembre).
+# - Tendencia creciente en el tiempo (para que "month/week" importen).
+# - Más tardanzas en Noche, Superior, cerca de las 22:00 y en exámenes.
+# Las señales se definen una vez por (día, turno, tipo) con las funciones
+# escalares de abajo; el muestreo de cada préstamo es vectorizado con NumPy
+# (RNG con semilla) y se escribe por bloques de días con executemany.
+from datetime import date as date_cls, timedelta
+from decimal import Decimal
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Item, Prestamo, Nivel, Turno, TipoItem, EstadoItem, UsoDiario
+
+USERS = ["pedro", "sofia", "lucia", "marcos", "ana", "juan", "carla", "maria", "tomas", "vale"]
+AULAS = ["B1", "B2", "A1", "A2", "Lab", "Maker", "7", "5", "3", ""]
+TURNOS = [Turno.MANANA, Turno.TARDE, Turno.NOCHE]
+TIPOS = [TipoItem.NOTEBOOK, TipoItem.TABLET, TipoItem.ALARGUE]
+# Inventario de referencia (46 ítems); --items lo escala con las mismas proporciones
+INVENTARIO = {TipoItem.NOTEBOOK: ("NB", 20), TipoItem.TABLET: ("TB", 10), TipoItem.ALARGUE: ("AL", 16)}
+
+
+def exam_windows_for_year(y:int):
+    # 2 tandas de exámenes (ajustá si querés): mitad de junio y mitad de noviembre
+    return [
+        (date_cls(y, 6, 10), date_cls(y, 6, 24)),
+        (date_cls(y, 11, 10), date_cls(y, 11, 24)),
+    ]
+
+def is_exam_day(d:date_cls):
+    for a,b in exam_windows_for_year(d.year):
+        if a <= d <= b:
+            return True
+    return False
+
+def turno_window(turno):
+    if turno == Turno.MANANA:
+        return (8, 0, 11, 30)
+    if turno == Turno.TARDE:
+        return (13, 15, 16, 45)
+    return (18, 15, 22, 0)
+
+def typical_duration(turno):
+    return 2.0 if turno == Turno.NOCHE else 1.5
+
+def base_demand(tipo, turno):
+    # Demanda base por tipo/turno
+    if tipo == TipoItem.NOTEBOOK:
+        return {Turno.MANANA: 2.0, Turno.TARDE: 1.3, Turno.NOCHE: 2.2}[turno]
+    if tipo == TipoItem.TABLET:
+        return {Turno.MANANA: 1.1, Turno.TARDE: 1.1, Turno.NOCHE: 1.0}[turno]
+    return {Turno.MANANA: 2.0, Turno.TARDE: 2.0, Turno.NOCHE: 3.0}[turno]  # ALARGUE
+
+def demand_multiplier(d:date_cls, tipo, turno, progress:float):
+    # progress ∈ [0,1] (0 = hace muchos días, 1 = más reciente)
+    mult = 0.85 + 0.4*progress  # tendencia creciente suave (±40%)
+    if is_exam_day(d):
+        if tipo == TipoItem.NOTEBOOK:
+            mult += 0.9 if turno == Turno.NOCHE else 0.5
+        elif tipo == TipoItem.TABLET:
+            mult += 0.3
+    # fines de semana menos demanda, salvo noche
+    if d.weekday() >= 5 and turno != Turno.NOCHE:
+        mult *= 0.7
+    return max(0.2, mult)
+
+def late_base(turno):
+    if turno == Turno.NOCHE: return 0.18
+    if turno == Turno.TARDE: return 0.12
+    return 0.10
+
+def late_prob_adjusted(d:date_cls, tipo, nivel, turno, hour:float):
+    p = late_base(turno)
+    # más tardanzas cerca del cierre (21–22hs) y en exámenes
+    if turno == Turno.NOCHE and hour >= 21.0:
+        p += 0.12
+    if nivel == Nivel.SUPERIOR and turno == Turno.NOCHE:
+        p += 0.12
+    if is_exam_day(d):
+        p += 0.12
+        if tipo == TipoItem.NOTEBOOK and turno == Turno.NOCHE:
+            p += 0.08
+    # acotar
+    return max(0.02, min(0.85, p))
+
+
+def late_prob_vec(exam, tipo, nivel, turno, hour):
+    """late_prob_adjusted sobre arrays (exam: bool; tipo/nivel/turno: códigos; hour: float)."""
+    noche = turno == Turno.NOCHE
+    p = np.where(noche, 0.18, np.where(turno == Turno.TARDE, 0.12, 0.10))
+    p = p + 0.12 * (noche & (hour >= 21.0))
+    p = p + 0.12 * ((nivel == Nivel.SUPERIOR) & noche)
+    p = p + exam * (0.12 + 0.08 * ((tipo == TipoItem.NOTEBOOK) & noche))
+    return np.clip(p, 0.02, 0.85)
+
+
+# ---------- inventario ----------
+def ensure_items(total=None):
+    """Crea los ítems que falten (NB/TB/AL en proporción 20:10:16). Devuelve {tipo: [ids]}."""
+    base = sum(n for _, n in INVENTARIO.values())
+    factor = (total or base) / base
+    nuevos = []
+    for tipo, (prefix, n) in INVENTARIO.items():
+        n = max(1, round(n * factor))
+        codes = [f"{prefix}-{i:02d}" for i in range(1, n + 1)]
+        existentes = set(Item.objects.filter(code__in=codes).values_list("code", flat=True))
+        nuevos += [Item(code=c, tipo=tipo, estado=EstadoItem.DISPONIBLE) for c in codes if c not in existentes]
+    Item.objects.bulk_create(nuevos, batch_size=1000)
+    ids = {t: [] for t in TIPOS}
+    for pk, tipo in Item.objects.order_by("id").values_list("id", "tipo"):
+        ids.setdefault(tipo, []).append(pk)
+    return ids, len(nuevos)
+
+
+# ---------- muestreo ----------
+def _grupos(dias, start_date, total_dias):
+    """Demanda esperada por (día, turno, tipo): arrays alineados de largo len(dias)*9."""
+    d_idx, turnos, tipos, mus, exam = [], [], [], [], []
+    for i, d in enumerate(dias):
+        progress = (d - start_date).days / max(1, total_dias)  # 0..1
+        ex = is_exam_day(d)
+        for turno in TURNOS:
+            for tipo in TIPOS:
+                d_idx.append(i); turnos.append(turno); tipos.append(tipo); exam.append(ex)
+                mus.append(max(0.0, base_demand(tipo, turno) * demand_multiplier(d, tipo, turno, progress)))
+    return (np.array(d_idx), np.array(turnos), np.array(tipos), np.array(mus), np.array(exam))
+
+
+def sample_block(rng, dias, start_date, total_dias, items_por_tipo, scale=1.0):
+    """
+    Préstamos (cerrados) de un bloque de días como dict de arrays. Mismo modelo
+    que el generador original: n ~ round(mu + N(0, 0.8)) por (día, turno, tipo),
+    escalado por `scale`.
+    """
+    d_idx, turno_g, tipo_g, mu, exam_g = _grupos(dias, start_date, total_dias)
+    n = np.rint(mu * scale + rng.normal(0, 0.8 * np.sqrt(scale), len(mu))).astype(int).clip(min=0)
+    rep = np.repeat(np.arange(len(mu)), n)
+    m = len(rep)
+    day = d_idx[rep]
+    tipo = tipo_g[rep]
+    exam = exam_g[rep]
+
+    # 70% Secundario, 20% Superior, 10% Personal (aprox); Superior => Noche
+    r = rng.random(m)
+    nivel = np.where(r < 0.7, Nivel.SECUNDARIO, np.where(r < 0.9, Nivel.SUPERIOR, Nivel.PERSONAL))
+    turno = np.where(nivel == Nivel.SUPERIOR, Turno.NOCHE, turno_g[rep])
+
+    # minuto de inicio: uniforme en la ventana del turno; sesgado al cierre en
+    # noches de examen para notebooks (más tarde)
+    win = {t: turno_window(t) for t in TURNOS}
+    ini = np.select([turno == t for t in TURNOS], [win[t][0] * 60 + win[t][1] for t in TURNOS])
+    fin = np.select([turno == t for t in TURNOS], [win[t][2] * 60 + win[t][3] for t in TURNOS])
+    sesgo = exam & (turno == Turno.NOCHE) & (tipo == TipoItem.NOTEBOOK)
+    uniforme = rng.integers(ini, fin + 1)
+    sesgado = (ini + (1 - rng.random(m) ** 3) * (fin - ini)).astype(int)
+    minuto = np.where(sesgo, sesgado, uniforme)
+
+    exp_hours = np.where(turno == Turno.NOCHE, 2.0, 1.5)
+    hour = minuto / 60.0
+    late = rng.random(m) < late_prob_vec(exam, tipo, nivel, turno, hour)
+    # si tarde -> +extra, si no -> -extra (puede ser antes)
+    extra = np.where(late, np.abs(rng.normal(0.45, 0.25, m)), -np.abs(rng.normal(0.25, 0.20, m)))
+    dur = np.maximum(0.25, exp_hours + extra)
+
+    # hora local -> UTC (vectorizado con pandas)
+    base = np.array([np.datetime64(d) for d in dias], dtype="datetime64[m]")
+    local = pd.DatetimeIndex(base[day] + minuto.astype("timedelta64[m]"))
+    inicio = local.tz_localize(settings.TIME_ZONE, ambiguous="NaT", nonexistent="shift_forward").tz_convert("UTC")
+
+    item = np.empty(m, dtype=np.int64)
+    for t in TIPOS:
+        sel = tipo == t
+        pool = np.asarray(items_por_tipo[t])
+        item[sel] = pool[rng.integers(0, len(pool), sel.sum())]
+
+    personal = nivel == Nivel.PERSONAL
+    aula = np.where(personal, "", np.asarray(AULAS)[rng.integers(0, len(AULAS), m)])
+    return {
+        "item": item, "nivel": nivel, "turno": turno, "inicio": inicio,
+        "exp_hours": exp_hours, "dur": np.round(dur, 2),
+        "aula": aula, "solicitante": np.asarray(USERS)[rng.integers(0, len(USERS), m)],
+    }
+
+
+_COLUMNAS = ["item", "nivel", "carrera", "anio", "turno", "aula", "solicitante", "inicio",
+             "fin_prevista", "fin_real", "duracion_horas", "estado", "observaciones"]
+
+
+def insert_block(bloque, batch_size=5000):
+    """
+    Inserta el bloque con executemany. bulk_create arma un SQL distinto por lote
+    y prepara cada valor campo por campo: con cientos de miles de filas eso era
+    ~75% del tiempo. Los valores se adaptan con las mismas operaciones del backend.
+    """
+    ok = ~np.asarray(bloque["inicio"].isna())
+    inicio = bloque["inicio"][ok]
+    fin_prevista = inicio + pd.to_timedelta(bloque["exp_hours"][ok], unit="h")
+    fin_real = inicio + pd.to_timedelta(bloque["dur"][ok], unit="h")
+    # duración desde los timestamps (minuto entero), igual que Prestamo.cerrar
+    dur = np.round((fin_real - inicio).total_seconds().to_numpy() / 3600, 2)
+
+    ops = connection.ops
+    fecha = lambda serie: [ops.adapt_datetimefield_value(d) for d in serie.to_pydatetime()]
+    filas = list(zip(
+        bloque["item"][ok].tolist(), bloque["nivel"][ok].tolist(), repeat(None), repeat(None),
+        bloque["turno"][ok].tolist(), bloque["aula"][ok].tolist(), bloque["solicitante"][ok].tolist(),
+        fecha(inicio), fecha(fin_prevista), fecha(fin_real),
+        [ops.adapt_decimalfield_value(Decimal(f"{h:.2f}"), 7, 2) for h in dur],
+        repeat("devuelto"), repeat(""),
+    ))
+    meta = Prestamo._meta
+    cols = ", ".join(ops.quote_name(meta.get_field(c).column) for c in _COLUMNAS)
+    sql = (f"INSERT INTO {ops.quote_name(meta.db_table)} ({cols}) "
+           f"VALUES ({', '.join(['%s'] * len(_COLUMNAS))})")
+    with connection.cursor() as cur:
+        for i in range(0, len(filas), batch_size):
+            cur.executemany(sql, filas[i:i + batch_size])
+    return len(filas)
+
+
+def recompute_item_usage():
+    """
+    uso_acumulado_horas / usos_acumulados de todos los ítems en un solo UPDATE:
+    préstamos cerrados de la tabla caliente más los rollups archivados (UsoDiario).
+    """
+    cerrados = Prestamo.objects.filter(item=OuterRef("pk"), fin_real__isnull=False).order_by().values("item")
+    archivados = UsoDiario.objects.filter(item=OuterRef("pk")).order_by().values("item")
+    dec = DecimalField(max_digits=8, decimal_places=2)
+
+    def suma(qs, expr, campo):
+        return Coalesce(Subquery(qs.annotate(s=expr).values("s")), Value(0), output_field=campo)
+    Item.objects.update(
+        uso_acumulado_horas=suma(cerrados, Sum("duracion_horas"), dec) + suma(archivados, Sum("horas"), dec),
+        usos_acumulados=suma(cerrados, Count("id"), IntegerField()) + suma(archivados, Sum("prestamos"), IntegerField()),
+    )
+
+
+def generate(days=365, items=None, scale=None, seed=0, chunk_days=30, batch_size=5000, now=None, log=None):
+    """
+    Genera `days` días de préstamos cerrados hasta ayer. `items` = tamaño total
+    del inventario (default 46); `scale` multiplica la demanda (default:
+    proporcional al inventario). Devuelve (préstamos creados, ítems creados).
+    """
+    items_por_tipo, creados = ensure_items(items)
+    if scale is None:
+        scale = sum(len(v) for v in items_por_tipo.values()) / sum(n for _, n in INVENTARIO.values())
+    rng = np.random.default_rng(seed)
+    now = timezone.localtime(now)
+    start_date = (now - timedelta(days=days)).date()
+    total_dias = (now.date() - start_date).days
+    dias = [start_date + timedelta(days=i) for i in range(days)]
+    total = 0
+    for b in range(0, len(dias), chunk_days):
+        bloque = sample_block(rng, dias[b:b + chunk_days], start_date, total_dias, items_por_tipo, scale)
+        total += insert_block(bloque, batch_size)
+        if log:
+            log(f"{dias[min(b + chunk_days, len(dias)) - 1]}: {total} préstamos")
+    recompute_item_usage()
+    return total, creados
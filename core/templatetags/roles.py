@@ -1,8 +1,14 @@
 from django import template
+
+from core.roles import Roles, roles_de
+
 register = template.Library()
 
-@register.simple_tag
-def has_role(user, *names):
+@register.simple_tag(takes_context=True)
+def has_role(context, user, *names):
     if not user.is_authenticated:
         return False
-    return user.is_superuser or user.groups.filter(name__in=names).exists()
\ No newline at end of file
+    request = context.get("request")
+    if request is not None and getattr(request, "user", None) == user:
+        return roles_de(request).tiene(*names)  # una sola consulta por request (cacheada en sesión)
+    return Roles(user.groups.values_list("name", flat=True), user.is_superuser).tiene(*names)
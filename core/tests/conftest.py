@@ -6,6 +6,32 @@ from django.utils import timezone
 
 from core.models import Item, TipoItem, EstadoItem, Prestamo, Nivel, Turno, Reserva
 
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix, tmp_path_factory):
+    # BD de test en archivo (no en memoria compartida) para que los tests de
+    # concurrencia usen el mismo locking que producción.
+    from django.conf import settings
+    db = settings.DATABASES["default"]
+    if db["ENGINE"].endswith("sqlite3") or db["ENGINE"] == "core.sqlite":
+        db.setdefault("TEST", {})["NAME"] = str(tmp_path_factory.mktemp("db") / "test.sqlite3")
+
+@pytest.fixture(autouse=True)
+def _reset_inventory_state():
+    # El índice en memoria y el cache (estado del chat, versiones) sobreviven
+    # entre tests; cada test arranca sin ellos
+    from django.core.cache import cache
+    from core.inventory import state
+    cache.clear()
+    state.reset()
+    yield
+    state.reset()
+
+@pytest.fixture
+def cache_compartido(settings, tmp_path):
+    # Cache que verían todos los procesos (en los tests, LocMem es el default)
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                                   "LOCATION": str(tmp_path / "cache")}}
+
 @pytest.fixture
 def user(db):
     u = User.objects.create_user(username="testuser", password="pass12345")
@@ -0,0 +1,66 @@
+import datetime as dt
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Item, Mantenimiento, Prestamo, EstadoItem, Nivel, Turno, TipoItem
+
+
+def _prestamos(item, n):
+    ahora = timezone.now()
+    Prestamo.objects.bulk_create([
+        Prestamo(item=item, nivel=Nivel.SECUNDARIO, turno=Turno.MANANA, inicio=ahora - dt.timedelta(hours=i))
+        for i in range(n)
+    ])
+
+
+def test_prestamos_changelist_keyset_sin_n_mas_1(db, admin_client, item_nb, item_al):
+    _prestamos(item_nb, 120)
+    _prestamos(item_al, 120)
+    url = reverse("admin:core_prestamo_changelist")
+    with CaptureQueriesContext(connection) as ctx:
+        r = admin_client.get(url)
+    assert r.status_code == 200
+    assert len(ctx.captured_queries) < 15  # no una consulta por fila (item via select_related)
+    cl = r.context["cl"]
+    assert cl.result_count == 240 and cl.siguientes_url
+    ids = [p.pk for p in cl.result_list]
+
+    r = admin_client.get(url + cl.siguientes_url)
+    cl2 = r.context["cl"]
+    ids2 = [p.pk for p in cl2.result_list]
+    assert len(ids2) == 100 and max(ids2) < min(ids) and cl2.primeros_url
+    assert "Siguientes" in r.content.decode()
+
+
+def test_paginador_cuenta_con_tope(db, item_nb, monkeypatch):
+    from core.admin import ConteoEstimadoPaginator
+    _prestamos(item_nb, 30)
+    monkeypatch.setattr(ConteoEstimadoPaginator, "TOPE", 10)
+    assert ConteoEstimadoPaginator(Prestamo.objects.all(), 5).count == 10
+
+
+def test_acciones_mantenimiento_por_conjunto(db, admin_client):
+    Item.objects.bulk_create([Item(code=f"TB-{i:02d}", tipo=TipoItem.TABLET) for i in range(1, 6)])
+    ids = list(Item.objects.values_list("id", flat=True))
+    url = reverse("admin:core_item_changelist")
+    admin_client.post(url, {"action": "poner_mantenimiento", "_selected_action": ids})
+    assert Item.objects.filter(estado=EstadoItem.MANTENIMIENTO).count() == 5
+    assert Mantenimiento.objects.filter(estado="abierto").count() == 5
+
+    admin_client.post(url, {"action": "sacar_mantenimiento", "_selected_action": ids[:2]})
+    assert Item.objects.filter(estado=EstadoItem.DISPONIBLE).count() == 2
+    assert Mantenimiento.objects.filter(estado="cerrado", fecha_cierre__isnull=False).count() == 2
+
+
+def test_jerarquia_de_fechas_por_rangos(db, item_nb):
+    from core.admin import _con_jerarquia_por_rangos
+    for y, m in [(2024, 11), (2026, 2), (2026, 5)]:
+        Prestamo.objects.create(item=item_nb, nivel=Nivel.SECUNDARIO, turno=Turno.MANANA,
+                                inicio=timezone.make_aware(dt.datetime(y, m, 10, 12)))
+    qs = _con_jerarquia_por_rangos(Prestamo.objects.all())
+    assert [d.year for d in qs.datetimes("inicio", "year")] == [2024, 2026]
+    meses = qs.filter(inicio__year=2026).datetimes("inicio", "month")
+    assert [d.month for d in meses] == [2, 5]
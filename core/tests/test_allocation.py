@@ -0,0 +1,65 @@
+import threading
+from collections import Counter
+
+import pytest
+from django.db import connection, transaction, OperationalError
+
+from core.allocation import claim_item, claim_items
+from core.forms import PrestamoRapidoForm
+from core.models import Item, TipoItem, EstadoItem, Prestamo
+
+
+def _items(n, prefix="NB", tipo=TipoItem.NOTEBOOK):
+    return [Item.objects.create(code=f"{prefix}-{i:02d}", tipo=tipo) for i in range(1, n + 1)]
+
+
+def test_claim_item_takes_first_available(db):
+    a, b = _items(2)
+    it = claim_item(tipo=TipoItem.NOTEBOOK, nuevo_estado=EstadoItem.RESERVADO)
+    assert it.pk == a.pk and it.estado == EstadoItem.RESERVADO
+    a.refresh_from_db()
+    assert a.estado == EstadoItem.RESERVADO
+    assert claim_item(item_id=a.pk) is None
+    assert claim_items(5, tipo=TipoItem.NOTEBOOK)[0].pk == b.pk
+
+
+def test_form_save_returns_none_if_item_was_taken(db, item_nb):
+    form = PrestamoRapidoForm(data={"tipo": "NB", "code": "NB-01", "nivel": "SEC", "turno": "M", "aula": "3"})
+    assert form.is_valid(), form.errors
+    Item.objects.filter(pk=item_nb.pk).update(estado=EstadoItem.EN_USO)  # otro pedido ganó
+    assert form.save() is None
+    assert "code" in form.errors
+    assert not Prestamo.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_claims_never_double_allocate():
+    _items(10)
+    ganados, errores = [], []
+    barrera = threading.Barrier(40)
+
+    def worker():
+        try:
+            barrera.wait()
+            with transaction.atomic():
+                it = claim_item(tipo=TipoItem.NOTEBOOK)
+                if it:
+                    Prestamo.objects.create(item=it, nivel="SEC", turno="M")
+                    ganados.append(it.pk)
+        except OperationalError as e:
+            errores.append(e)
+        finally:
+            connection.close()
+
+    hilos = [threading.Thread(target=worker) for _ in range(40)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    repetidos = [pk for pk, c in Counter(ganados).items() if c > 1]
+    assert repetidos == []
+    assert errores == []
+    assert len(ganados) == 10  # los 10 ítems se asignan, 30 pedidos quedan sin ítem
+    assert Prestamo.objects.count() == len(ganados)
+    assert Item.objects.filter(estado=EstadoItem.EN_USO).count() == len(ganados)
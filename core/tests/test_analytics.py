@@ -0,0 +1,87 @@
+import datetime as dt
+import pytest
+from django.utils import timezone
+
+from core.models import Item, TipoItem, EstadoItem, Prestamo, Nivel, Turno, CarreraSup
+from core import analytics
+
+
+def _cerrado(item, nivel=Nivel.SECUNDARIO, turno=Turno.MANANA, hours=2.0, days_ago=1, late=False, **kw):
+    inicio = timezone.now() - dt.timedelta(days=days_ago, hours=hours)
+    p = Prestamo.objects.create(
+        item=item, nivel=nivel, turno=turno, aula="B1", solicitante="x",
+        inicio=inicio, fin_prevista=inicio + dt.timedelta(hours=hours - 0.5 if late else hours + 0.5), **kw
+    )
+    p.cerrar(cuando=inicio + dt.timedelta(hours=hours))
+    return p
+
+
+@pytest.fixture
+def historial(db, item_nb, item_al):
+    tb = Item.objects.create(code="TB-01", tipo=TipoItem.TABLET, estado=EstadoItem.DISPONIBLE)
+    _cerrado(item_nb, hours=2.0, days_ago=1, late=True)
+    _cerrado(item_nb, hours=1.0, days_ago=40)
+    _cerrado(item_al, turno=Turno.TARDE, hours=3.5, days_ago=2)
+    _cerrado(tb, nivel=Nivel.SUPERIOR, hours=1.5, days_ago=3, carrera=CarreraSup.TCD, anio=1, late=True)
+    _cerrado(tb, nivel=Nivel.SUPERIOR, hours=0.5, days_ago=5, carrera=CarreraSup.PTEC, anio=2)
+    analytics.reset_engine()
+    yield
+    analytics.reset_engine()
+
+
+def _norm(data):
+    data = dict(data)
+    data["top_items"] = [{**x, "horas": float(x["horas"])} for x in data["top_items"]]
+    return data
+
+
+@pytest.mark.parametrize("query", [
+    "days=30", "days=90", "days=30&tipo=TB", "days=30&nivel=SUP",
+    "days=30&nivel=SUP&carrera=TCD&anio=1", "days=30&nivel=SEC&tipo=NB",
+])
+def test_columnar_kpis_match_sql(client, settings, historial, query):
+    settings.ANALYTICS_ENGINE = "sql"
+    esperado = _norm(client.get(f"/api/stats/kpis/?{query}").json())
+    settings.ANALYTICS_ENGINE = "columnar"
+    obtenido = _norm(client.get(f"/api/stats/kpis/?{query}").json())
+    assert obtenido == esperado
+
+
+def test_columnar_refresh_appends_new_loans(historial, item_nb):
+    eng = analytics.LoanColumns(min_interval=0)
+    eng.reload()
+    assert len(eng) == 5
+    _cerrado(item_nb, hours=4.0, days_ago=0)
+    eng.refresh()
+    assert len(eng) == 6
+    assert eng.kpis(days=30, tipo="NB")["horas_por_tipo"]["NB"] == pytest.approx(6.0)
+
+
+def test_columnar_refresh_sin_cambios_no_consulta(historial, django_assert_num_queries):
+    eng = analytics.LoanColumns(min_interval=0)
+    eng.reload()
+    with django_assert_num_queries(0):  # la versión del inventario no cambió
+        eng.refresh()
+
+
+def test_columnar_refresh_detecta_ediciones(historial):
+    eng = analytics.LoanColumns(min_interval=0)
+    eng.reload()
+    p = Prestamo.objects.filter(item__code="AL-01").get()
+    p.duracion_horas = 10
+    p.save(update_fields=["duracion_horas"])  # edición de una fila ya cargada
+    eng.refresh()
+    assert eng.kpis(days=30, tipo="AL")["horas_por_tipo"]["AL"] == pytest.approx(10.0)
+    p.delete()
+    eng.refresh()
+    assert len(eng) == 4
+
+
+def test_columnar_refresh_publica_columnas_nuevas(historial, item_nb):
+    eng = analytics.LoanColumns(min_interval=0)
+    eng.reload()
+    leyendo = eng.cols  # lo que tiene un lector a mitad de kpis()
+    _cerrado(item_nb, hours=4.0, days_ago=0)
+    eng.refresh()
+    assert {a.size for a in leyendo} == {5}  # el refresh no toca lo ya publicado
+    assert {a.size for a in eng.cols} == {6}
@@ -0,0 +1,119 @@
+import csv
+import datetime as dt
+import io
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from core import analytics, archive, reports
+from core.models import Nivel, Prestamo, PrestamoArchivado, Turno, UsoDiario
+
+
+@pytest.fixture(autouse=True)
+def _horizonte(settings):
+    settings.ARCHIVE_AFTER_DAYS = 30
+
+
+def _cerrado(item, fin, horas=2.0, tarde=False, nivel=Nivel.SECUNDARIO, turno=Turno.MANANA):
+    inicio = fin - dt.timedelta(hours=horas)
+    prevista = fin - dt.timedelta(minutes=30) if tarde else fin + dt.timedelta(hours=1)
+    return Prestamo.objects.create(item=item, nivel=nivel, turno=turno, inicio=inicio, fin_prevista=prevista,
+                                   fin_real=fin, duracion_horas=horas, estado="devuelto")
+
+
+@pytest.fixture
+def historia(db, item_nb, item_al):
+    ahora = timezone.now()
+    viejos = [_cerrado(item_nb, ahora - dt.timedelta(days=100), 3, tarde=True),
+              _cerrado(item_nb, ahora - dt.timedelta(days=100, hours=1), 1),
+              _cerrado(item_al, ahora - dt.timedelta(days=60), 5, turno=Turno.TARDE)]
+    recientes = [_cerrado(item_al, ahora - dt.timedelta(days=2), 4, tarde=True)]
+    abierto = Prestamo.objects.create(item=item_nb, nivel=Nivel.SECUNDARIO, turno=Turno.MANANA,
+                                      inicio=ahora - dt.timedelta(days=90))
+    return viejos, recientes, abierto
+
+
+def test_archivar_mueve_viejos_y_suma_rollup(historia):
+    viejos, recientes, abierto = historia
+    assert archive.archivar(lote=1) == 3  # un lote por préstamo: el rollup se acumula
+    assert set(Prestamo.objects.values_list("id", flat=True)) == {recientes[0].id, abierto.id}
+    assert set(PrestamoArchivado.objects.values_list("id", flat=True)) == {p.id for p in viejos}
+
+    nb = UsoDiario.objects.get(item__code="NB-01")
+    assert (nb.prestamos, nb.con_duracion, float(nb.horas), nb.tardias) == (2, 2, 4.0, 1)
+    assert UsoDiario.objects.get(item__code="AL-01").turno == Turno.TARDE
+    assert archive.archivar() == 0
+
+
+def test_kpis_iguales_antes_y_despues_de_archivar(historia, client_logged):
+    url = reverse("kpis")
+    antes = {d: client_logged.get(url, {"days": d}).json() for d in (7, 365)}
+    call_command("archivar", stdout=io.StringIO())
+    despues = {d: client_logged.get(url, {"days": d}).json() for d in (7, 365)}
+    assert despues == antes
+    assert despues[365]["devoluciones_tardias"] == 2
+    assert [r["item__code"] for r in despues[365]["top_items"]] == ["AL-01", "NB-01"]
+    filtrado = client_logged.get(url, {"days": 365, "tipo": "NB"}).json()
+    assert filtrado["horas_por_tipo"] == {"NB": 4.0}
+
+
+def test_motor_columnar_carga_el_archivo(historia, client_logged, settings):
+    settings.ANALYTICS_ENGINE = "columnar"
+    analytics.reset_engine()
+    archive.archivar()
+    try:
+        data = client_logged.get(reverse("kpis"), {"days": 365}).json()
+    finally:
+        analytics.reset_engine()
+    assert data["devoluciones_tardias"] == 2
+    assert data["horas_por_tipo"] == {"NB": 4.0, "AL": 9.0}
+
+
+def test_reporte_y_export_incluyen_archivo(historia, admin_client):
+    viejos, recientes, abierto = historia
+    ref = timezone.now() - dt.timedelta(days=60)
+    antes = reports.calcular("month", ref)
+    archive.archivar()
+    assert reports.calcular("month", ref) == antes
+
+    resp = admin_client.get(reverse("export", args=["prestamos"]))
+    ids = [int(f["id"]) for f in csv.DictReader(io.StringIO(b"".join(resp.streaming_content).decode()))]
+    assert ids == sorted(p.id for p in viejos + recientes + [abierto])
+    reciente = (timezone.localdate() - dt.timedelta(days=7)).isoformat()
+    resp = admin_client.get(reverse("export", args=["prestamos"]), {"desde": reciente})
+    assert len(b"".join(resp.streaming_content).decode().splitlines()) == 2  # encabezado + el reciente
+
+
+def test_tardias_no_queda_cacheado_para_siempre(historia):
+    from freezegun import freeze_time
+    archive.archivar()
+    assert archive.tardias() == 1
+    # Otro proceso archiva más tardías (su cache.delete no llega a éste): el total vence con el TTL
+    UsoDiario.objects.update(tardias=0)
+    assert archive.tardias() == 1
+    with freeze_time(timezone.now() + dt.timedelta(seconds=archive.TARDIAS_TTL + 1)):
+        assert archive.tardias() == 0
+
+
+def test_recompute_item_usage_suma_el_archivo(historia):
+    from core.models import Item
+    from core.synthetic import recompute_item_usage
+    archive.archivar()
+    Item.objects.update(uso_acumulado_horas=0, usos_acumulados=0)
+    recompute_item_usage()
+    nb, al = Item.objects.get(code="NB-01"), Item.objects.get(code="AL-01")
+    assert (float(nb.uso_acumulado_horas), nb.usos_acumulados) == (4.0, 2)  # los dos archivados
+    assert (float(al.uso_acumulado_horas), al.usos_acumulados) == (9.0, 2)  # uno archivado + uno reciente
+
+
+def test_kpis_cortan_por_dia_con_archivo(db, item_nb, client_logged):
+    # Cerrado el mismo día local que el inicio de la ventana, pero antes de esa hora
+    since = timezone.now() - dt.timedelta(days=100)
+    fin = archive.inicio_del_dia(since) + dt.timedelta(seconds=1)
+    _cerrado(item_nb, min(fin, since), 3)
+    antes = client_logged.get(reverse("kpis"), {"days": 100}).json()
+    archive.archivar()
+    assert client_logged.get(reverse("kpis"), {"days": 100}).json() == antes
+    assert antes["horas_por_tipo"] == {"NB": 3.0}
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import time
+
+from django.contrib.auth.models import User
+
+from core.bot_data import db_task, ProfileCache, get_perfil_dict_by_discord_sync, has_active_reserva_or_prestamo_sync
+from core.models import Profile
+
+
+def test_db_tasks_run_in_parallel():
+    hilos = set()
+
+    @db_task
+    def lento():
+        hilos.add(threading.get_ident())
+        time.sleep(0.2)
+
+    async def clase():
+        t0 = time.perf_counter()
+        await asyncio.gather(*[lento() for _ in range(6)])
+        return time.perf_counter() - t0
+
+    # thread_sensitive=True las serializaría (~1.2 s)
+    assert asyncio.run(clase()) < 0.6
+    assert len(hilos) > 1
+
+
+def test_profile_cache_ttl_and_single_flight():
+    llamadas = []
+
+    async def loader(key):
+        llamadas.append(key)
+        await asyncio.sleep(0.05)
+        return {"user_username": "u" + key} if key == "1" else None
+
+    cache = ProfileCache(ttl=60, ttl_negativo=0, loader=loader)
+
+    async def run():
+        a = await asyncio.gather(*[cache.get(1) for _ in range(10)])
+        b = await cache.get(1)
+        await cache.get(2)
+        await cache.get(2)  # los no vinculados no quedan cacheados (ttl_negativo=0)
+        cache.invalidate(1)
+        await cache.get(1)
+        return a, b
+
+    a, b = asyncio.run(run())
+    assert all(p == {"user_username": "u1"} for p in a) and b == a[0]
+    assert llamadas == ["1", "2", "2", "1"]
+
+
+def test_profile_loaded_from_pool_thread(transactional_db):
+    u = User.objects.create_user(username="alumno", password="x")
+    Profile.objects.update_or_create(user=u, defaults={"discord_user_id": "999"})
+
+    async def run():
+        return await asyncio.gather(get_perfil_dict_by_discord_sync(999),
+                                    get_perfil_dict_by_discord_sync(123),
+                                    has_active_reserva_or_prestamo_sync(999))
+
+    perfil, nadie, activa = asyncio.run(run())
+    assert perfil["user_username"] == "alumno" and nadie is None and activa is False
+
+
+def test_complete_codes_uses_fresh_index(transactional_db):
+    from core.bot_data import complete_codes
+    from core.models import Item, TipoItem, EstadoItem
+    Item.objects.create(code="NB-01", tipo=TipoItem.NOTEBOOK, estado=EstadoItem.DISPONIBLE)
+    Item.objects.create(code="NB-02", tipo=TipoItem.NOTEBOOK, estado=EstadoItem.EN_USO)
+    assert asyncio.run(complete_codes("nb", (EstadoItem.EN_USO,))) == ["NB-02"]
+    assert asyncio.run(complete_codes("NB-0")) == ["NB-01", "NB-02"]
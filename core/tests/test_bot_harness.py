@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("discord")
+
+from core.bot_harness import BotBench, FakeInteraction, invoke, autocomplete, choice
+from core.models import Item, EstadoItem, Prestamo
+
+
+@pytest.fixture
+def bench(transactional_db, settings):
+    settings.DISCORD_WEBHOOK_URL = ""
+    b = BotBench(usuarios=12, items=4)
+    b.setup()
+    yield b
+    b.cleanup()
+
+
+def test_harness_runs_command_flow(bench):
+    d = bench.discord_ids[0]
+
+    async def flujo():
+        r = await invoke("reservar", FakeInteraction(d), tipo=choice("NB", "Notebooks"))
+        code = r.reply.split()[2]
+        p = await invoke("prestar", FakeInteraction(d), code=code.lower())
+        s = await invoke("status", FakeInteraction(d), code=code)
+        e = await invoke("entregar", FakeInteraction(d), code=code)
+        return code, p.reply, s.reply, e.reply
+
+    code, prestar, status, entregar = asyncio.run(flujo())
+    assert prestar == f"✅ Préstamo registrado: {code.lower()}."
+    assert status.startswith(f"{code} · Notebook · En uso")
+    assert entregar.startswith(f"📦 Entregado {code}")
+    assert not Prestamo.objects.filter(fin_real__isnull=True).exists()
+
+
+def test_harness_unlinked_user_gets_link_hint(bench):
+    r = asyncio.run(invoke("activos", FakeInteraction(42)))
+    assert r.reply.startswith("Vinculá tu cuenta")
+
+
+def test_harness_autocomplete_filters_by_estado(bench):
+    Item.objects.filter(code="BENCH-001").update(estado=EstadoItem.EN_USO)
+    Item.objects.get(code="BENCH-001").save()
+    choices = asyncio.run(autocomplete("entregar", "code", FakeInteraction(1), "bench"))
+    assert [c.value for c in choices] == ["BENCH-001"]
+
+
+def test_bench_has_no_double_allocations(bench):
+    res = bench.run()
+    assert res["n_errores"] == 0, res["errores"]
+    assert res["reservados"] == 4 and res["prestados"] == 4
+    assert res["dobles_asignaciones"] == {"prestamos": 0, "reservas": 0}
+    assert res["prestamos_abiertos"] == 0
+
+
+def test_cleanup_solo_borra_lo_de_la_corrida(bench, user):
+    from core.models import DiscordOutbox
+    real = Item.objects.create(code="BENCH-X", tipo="NB")  # mismo prefijo, no es del bench
+    aviso = DiscordOutbox.objects.create(contenido="aviso real")
+    bench.cleanup()
+    assert Item.objects.filter(pk=real.pk).exists() and DiscordOutbox.objects.filter(pk=aviso.pk).exists()
+    assert user.__class__.objects.filter(pk=user.pk).exists()
+    assert not Item.objects.filter(code="BENCH-001").exists()
+
+
+def test_bench_bot_se_niega_con_bd_real(transactional_db, monkeypatch):
+    from django.core.management import CommandError, call_command
+    from core.management.commands import bench_bot
+    monkeypatch.setattr(bench_bot, "_bd_de_prueba", lambda: False)
+    with pytest.raises(CommandError, match="yes-i-mean-it"):
+        call_command("bench_bot", usuarios=2, items=1)
+    assert not Item.objects.exists()
+
+
+def test_bench_bot_avisos_sin_outbox(transactional_db, capsys):
+    from django.core.management import call_command
+    from core.models import DiscordOutbox
+    call_command("bench_bot", usuarios=4, items=2, json=True)
+    assert json.loads(capsys.readouterr().out)["avisos"] > 0  # llegaron al webhook local
+    assert not DiscordOutbox.objects.exists()
+    assert not Item.objects.exists()
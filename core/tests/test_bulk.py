@@ -0,0 +1,178 @@
+import json
+import datetime as dt
+from django.contrib.auth.models import Group
+from django.utils import timezone
+
+from core.bulk import devolver_lote, parse_codes
+from core.models import Item, TipoItem, EstadoItem, Prestamo
+from core.tests.conftest import make_prestamo
+
+
+def _nbs(n):
+    return [Item.objects.create(code=f"NB-{i:02d}", tipo=TipoItem.NOTEBOOK, estado=EstadoItem.EN_USO)
+            for i in range(1, n + 1)]
+
+
+def test_parse_codes():
+    assert parse_codes(" nb-01, NB-02\nnb-01;TB-03 ") == ["NB-01", "NB-02", "TB-03"]
+
+
+def test_devolver_lote_closes_all_in_constant_queries(db, django_assert_max_num_queries):
+    items = _nbs(30)
+    for it in items:
+        make_prestamo(it, hours=1.5)
+    codes = [it.code for it in items] + ["NB-99"]
+    with django_assert_max_num_queries(6):
+        res = devolver_lote(codes)
+    assert len(res["devueltos"]) == 30
+    assert res["no_encontrados"] == ["NB-99"]
+    assert not Prestamo.objects.filter(fin_real__isnull=True).exists()
+    assert set(Prestamo.objects.values_list("estado", flat=True)) == {"devuelto"}
+    it = Item.objects.get(code="NB-07")
+    assert it.estado == EstadoItem.DISPONIBLE
+    assert it.usos_acumulados == 1
+    assert float(it.uso_acumulado_horas) == 1.5
+
+
+def test_devolucion_lote_api(db, client, user, item_nb, monkeypatch):
+    user.groups.add(Group.objects.create(name="OPERADOR"))
+    client.force_login(user)
+    enviados = []
+    monkeypatch.setattr("core.views.send_discord", enviados.append)
+    make_prestamo(item_nb, hours=2.0)
+    r = client.post("/api/prestamos/devolucion_lote/", data=json.dumps({"codes": ["nb-01", "AL-01"]}),
+                    content_type="application/json")
+    assert r.status_code == 200
+    data = r.json()
+    assert [d["code"] for d in data["devueltos"]] == ["NB-01"]
+    assert data["no_encontrados"] == ["AL-01"]
+    assert len(enviados) == 1  # una sola notificación para todo el lote
+    r = client.post("/api/prestamos/devolucion_lote/", data="{codes", content_type="application/json")
+    assert r.status_code == 400
+
+
+def test_devolver_lote_no_suma_lo_que_cerro_otro(db, monkeypatch):
+    from core import bulk
+    a, b = _nbs(2)
+    pa = make_prestamo(a, hours=1.0)
+    make_prestamo(b, hours=1.0)
+    horas = bulk._horas
+
+    def _carrera(desde, hasta):  # otra devolución cierra NB-01 entre la lectura y el UPDATE
+        if not Prestamo.objects.get(pk=pa.pk).fin_real:
+            Prestamo.objects.get(pk=pa.pk).cerrar()
+        return horas(desde, hasta)
+    monkeypatch.setattr(bulk, "_horas", _carrera)
+    res = devolver_lote(["NB-01", "NB-02"])
+    assert [c for c, _ in res["devueltos"]] == ["NB-02"]
+    assert res["no_encontrados"] == ["NB-01"]
+    assert Item.objects.get(code="NB-01").usos_acumulados == 1  # sólo el cierre de la otra devolución
+    assert Item.objects.get(code="NB-02").usos_acumulados == 1
+
+
+def test_prestar_lote_all_or_nothing(db, django_assert_max_num_queries):
+    from core.bulk import prestar_lote, SinDisponibilidad
+    for i in range(1, 6):
+        Item.objects.create(code=f"TB-{i:02d}", tipo=TipoItem.TABLET)
+    with django_assert_max_num_queries(6):
+        ps = prestar_lote(TipoItem.TABLET, 4, "SUP", "M", aula="7", solicitante="profe")
+    assert [p.item.code for p in ps] == ["TB-01", "TB-02", "TB-03", "TB-04"]
+    assert {p.turno for p in Prestamo.objects.all()} == {"N"}  # regla Superior => Noche
+    try:
+        prestar_lote(TipoItem.TABLET, 2, "SEC", "M")
+        assert False, "debía fallar"
+    except SinDisponibilidad:
+        pass
+    assert Item.objects.get(code="TB-05").estado == EstadoItem.DISPONIBLE  # rollback
+    assert Prestamo.objects.count() == 4
+
+
+def test_aprobar_reservas_lote(db, user, django_assert_max_num_queries):
+    from core.bulk import aprobar_reservas_lote
+    from core.models import Reserva
+    rids = []
+    for i in range(1, 11):
+        it = Item.objects.create(code=f"NB-{i:02d}", tipo=TipoItem.NOTEBOOK, estado=EstadoItem.RESERVADO)
+        rids.append(Reserva.objects.create(item=it, tipo=it.tipo, nivel="SEC", turno="M", solicitante=f"u{i}",
+                                           expira=timezone.now() + dt.timedelta(hours=1)).id)
+    Item.objects.filter(code="NB-10").update(estado=EstadoItem.EN_USO)  # ya no convertible
+    with django_assert_max_num_queries(7):
+        ps = aprobar_reservas_lote(rids, user)
+    assert len(ps) == 9
+    assert Reserva.objects.filter(estado="convertida", aprobada_por=user).count() == 9
+    assert Reserva.objects.get(item__code="NB-10").estado == "activa"
+    assert Item.objects.filter(estado=EstadoItem.EN_USO).count() == 10
+
+
+def test_expirar_reservas_set_based(db, django_assert_max_num_queries):
+    from core.bulk import expirar_reservas, resumen_expiracion
+    from core.models import Reserva
+    now = timezone.make_aware(dt.datetime(2025, 9, 2, 15, 0))
+    for i in range(1, 101):
+        it = Item.objects.create(code=f"NB-{i:03d}", tipo=TipoItem.NOTEBOOK, estado=EstadoItem.RESERVADO)
+        vence = now - dt.timedelta(minutes=5) if i <= 80 else now + dt.timedelta(days=1)
+        Reserva.objects.create(item=it, tipo=it.tipo, nivel="SEC", turno="T", expira=vence)
+    with django_assert_max_num_queries(6):
+        res = expirar_reservas(now=now)
+    assert len(res["expiradas"]) == 80 and res["canceladas"] == []
+    assert Reserva.objects.filter(estado="expirada").count() == 80
+    assert Item.objects.filter(estado=EstadoItem.DISPONIBLE).count() == 80
+    assert "y 50 más" in resumen_expiracion(res)
+
+    noche = timezone.localtime(now).replace(hour=23, minute=10)
+    res = expirar_reservas(now=noche)
+    assert len(res["canceladas"]) == 20
+    assert not Reserva.objects.filter(estado="activa").exists()
+    assert not Item.objects.filter(estado=EstadoItem.RESERVADO).exists()
+
+
+def test_autocancel_no_libera_lo_que_cancelo_un_operador(db, user, monkeypatch):
+    from core import bulk
+    from core.models import Reserva
+    noche = timezone.make_aware(dt.datetime(2025, 9, 2, 23, 10))
+    rs = {}
+    for code in ("NB-01", "NB-02"):
+        it = Item.objects.create(code=code, tipo=TipoItem.NOTEBOOK, estado=EstadoItem.RESERVADO)
+        rs[code] = Reserva.objects.create(item=it, tipo=it.tipo, nivel="SEC", turno="N",
+                                          expira=noche + dt.timedelta(hours=2))
+    actualizar = bulk._actualizar_activas
+
+    def _carrera(ids, **campos):  # entre el SELECT y el UPDATE: un operador cancela NB-01
+        rs["NB-01"].cancelar(user, motivo="pedido del docente")
+        nb01 = Item.objects.get(code="NB-01")  # y alguien la vuelve a reservar
+        nb01.estado = EstadoItem.RESERVADO
+        nb01.save()
+        rs["nueva"] = Reserva.objects.create(item=nb01, tipo=nb01.tipo, nivel="SEC", turno="N",
+                                             expira=noche + dt.timedelta(hours=2))
+        return actualizar(ids, **campos)
+    monkeypatch.setattr(bulk, "_actualizar_activas", _carrera)
+    res = bulk.expirar_reservas(now=noche)
+    assert res["canceladas"] == ["NB-02"]
+    assert Item.objects.get(code="NB-01").estado == EstadoItem.RESERVADO
+    assert Reserva.objects.get(pk=rs["NB-01"].pk).cancel_motivo == "pedido del docente"
+    assert Reserva.objects.get(pk=rs["nueva"].pk).estado == "activa"  # creada después del SELECT
+    assert Item.objects.get(code="NB-02").estado == EstadoItem.DISPONIBLE
+
+
+def test_actualizar_activas_sin_returning(db, monkeypatch):
+    from django.db import connection
+    from core.bulk import _actualizar_activas
+    from core.models import Reserva
+    rs = [Reserva.objects.create(tipo=TipoItem.NOTEBOOK, nivel="SEC", turno="M",
+                                 expira=timezone.now()) for _ in range(3)]
+    Reserva.objects.filter(pk=rs[0].pk).update(estado="cancelada")
+    monkeypatch.setattr(connection, "vendor", "mysql")
+    assert _actualizar_activas([r.pk for r in rs], estado="expirada") == {rs[1].pk, rs[2].pk}
+    assert Reserva.objects.get(pk=rs[0].pk).estado == "cancelada"
+
+
+def test_prestamo_lote_api_solo_operador_o_docente(db, client, user, monkeypatch):
+    from core.models import Profile
+    monkeypatch.setattr("core.views.send_discord", lambda *a, **k: None)
+    Item.objects.create(code="TB-01", tipo=TipoItem.TABLET)
+    client.force_login(user)
+    url, body = "/api/prestamos/lote/", json.dumps({"tipo": "TB", "cantidad": 1})
+    assert client.post(url, data=body, content_type="application/json").status_code == 403
+    Profile.objects.update_or_create(user=user, defaults={"nivel": "PER"})
+    client.force_login(user)  # sesión nueva: el perfil se vuelve a leer
+    assert client.post(url, data=body, content_type="application/json").status_code == 200
@@ -1,4 +1,5 @@
 import json
+import pytest
 from core.models import Reserva, Prestamo, EstadoItem, Nivel, Turno
 from django.utils import timezone
 import datetime as dt
@@ -52,4 +53,88 @@ def test_chat_devolucion_flujo(db, client_logged, item_nb, user):
     p.refresh_from_db(); item_nb.refresh_from_db()
     assert p.fin_real is not None
     assert p.estado == "devuelto"
-    assert item_nb.estado == EstadoItem.DISPONIBLE
\ No newline at end of file
+    assert item_nb.estado == EstadoItem.DISPONIBLE
+
+
+def test_chat_state_does_not_write_session(db, client_logged, item_nb):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    with CaptureQueriesContext(connection) as ctx:
+        for m in ("reservar NB-01", "Secundario", "-"):
+            r = post_json(client_logged, "/api/chat/", {"message": m})
+    assert "Confirmar reserva" in r.json()["reply"]
+    escrituras = [q["sql"] for q in ctx.captured_queries
+                  if "django_session" in q["sql"] and not q["sql"].lstrip().upper().startswith("SELECT")]
+    assert escrituras == []
+
+
+def test_chat_state_cookie_fallback(db, client_logged, item_nb, settings):
+    # LocMem (el default de los tests) no es compartido entre workers: cookie firmada
+    r = post_json(client_logged, "/api/chat/", {"message": "reservar NB-01"})
+    assert "chat_state" in r.cookies
+    r = post_json(client_logged, "/api/chat/", {"message": "Secundario"})
+    assert "¿Aula?" in r.json()["reply"]
+
+
+def test_chat_state_en_cache_compartido(db, cache_compartido, client_logged, item_nb):
+    r = post_json(client_logged, "/api/chat/", {"message": "reservar NB-01"})
+    assert "chat_state" not in r.cookies
+    r = post_json(client_logged, "/api/chat/", {"message": "Secundario"})
+    assert "¿Aula?" in r.json()["reply"]
+
+
+def test_chat_state_pack_roundtrip():
+    from core.chat_state import pack, unpack
+    p = {'flow': 'return', 'code': 'NB-01', 'prestamo_id': 7}
+    assert pack(p) == ['d', 'NB-01', 7]
+    assert unpack(pack(p)) == p
+
+
+def _ctx(rf, user, msg, pending=None):
+    from core.chat import ChatContext, _norm
+    from core.chat_state import ChatStateStore
+    from core.inventory import state
+    state.snapshot()  # el budget es con el índice de inventario ya cargado
+    req = rf.post("/api/chat/")
+    req.user = user
+    store = ChatStateStore(req)
+    if pending:
+        store.pending = pending
+    return ChatContext(req, _norm(msg), msg, store)
+
+
+@pytest.mark.parametrize("msg,intent", [
+    ("Menú", "menu"),
+    ("mis reservas", "mis_reservas"),
+    ("Mis préstamos", "mis_prestamos"),
+    ("cancelar reserva", "cancelar_reserva"),
+    ("reservar nb-01", "reservar"),
+    ("devolver NB-01", "devolver"),
+    ("hola", "fallback"),
+])
+def test_chat_router_intent_and_query_budget(db, rf, user, item_nb, msg, intent, django_assert_max_num_queries):
+    from core.chat import route, INTENT_BUDGET
+    ctx = _ctx(rf, user, msg)
+    with django_assert_max_num_queries(INTENT_BUDGET[intent]):
+        nombre, payload = route(ctx)
+    assert nombre == intent and payload["reply"]
+
+
+def test_chat_router_flujo_reserva_una_consulta_de_reservas(db, rf, user, item_nb, django_assert_max_num_queries):
+    from core.chat import route
+    pending = {"flow": "reserve", "code": "NB-01", "item_id": item_nb.id, "tipo": item_nb.tipo,
+               "nivel": Nivel.SECUNDARIO, "carrera": None, "anio": None, "turno": Turno.MANANA, "aula": ""}
+    ctx = _ctx(rf, user, "sí", pending)
+    # item + reservas activas (una sola vez) + claim (UPDATE y SELECT) + INSERT, más el savepoint
+    with django_assert_max_num_queries(7):
+        nombre, payload = route(ctx)
+    assert nombre == "flujo" and "Reserva creada" in payload["reply"]
+    assert ctx.store.pending is None
+
+
+def test_chat_cancelar_corta_el_flujo(db, client_logged, item_nb):
+    post_json(client_logged, "/api/chat/", {"message": "reservar NB-01"})
+    r = post_json(client_logged, "/api/chat/", {"message": "cancelar"})
+    assert r.json()["reply"] == "Operación cancelada. ¿Algo más?"
+    r = post_json(client_logged, "/api/chat/", {"message": "Secundario"})
+    assert "Puedo reservar" in r.json()["reply"]
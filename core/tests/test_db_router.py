@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import time
+
+import pytest
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.urls import reverse
+
+from core import db_router
+from core.db_router import ALIAS, AnalyticsRouter, analiticas, snapshot
+from core.models import Item, TipoItem
+
+
+def test_router_sin_alias_usa_la_principal():
+    r = AnalyticsRouter()
+    with analiticas():
+        assert r.db_for_read(Item) == DEFAULT_DB_ALIAS
+    assert r.db_for_read(Item) is None
+    assert r.db_for_write(Item) == DEFAULT_DB_ALIAS
+    assert not r.allow_migrate(ALIAS, "core") and r.allow_migrate(DEFAULT_DB_ALIAS, "core")
+
+
+@pytest.fixture
+def alias_snapshot(tmp_path, monkeypatch):
+    destino = str(tmp_path / "analytics.sqlite3")
+    conf = {**connections.databases[DEFAULT_DB_ALIAS], "ENGINE": "django.db.backends.sqlite3",
+            "NAME": destino, "OPTIONS": {}, "TEST": {}}
+    monkeypatch.setitem(connections.databases, ALIAS, conf)
+    yield destino
+    connections[ALIAS].close()
+    del connections[ALIAS]
+    db_router._medido[:] = [0.0, None]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_snapshot_y_lecturas_analiticas(alias_snapshot, client_logged, settings):
+    if connection.vendor != "sqlite":
+        pytest.skip("snapshot sólo con SQLite")
+    Item.objects.create(code="NB-40", tipo=TipoItem.NOTEBOOK)
+    snapshot(alias_snapshot)
+    assert sqlite3.connect(alias_snapshot).execute("SELECT COUNT(*) FROM core_item").fetchone()[0] == 1
+
+    Item.objects.create(code="NB-41", tipo=TipoItem.NOTEBOOK)  # después del snapshot
+    with analiticas():
+        assert Item.objects.count() == 1  # lee el snapshot
+        Item.objects.create(code="NB-42", tipo=TipoItem.NOTEBOOK)  # las escrituras van a la principal
+    assert Item.objects.count() == 3
+    assert client_logged.get(reverse("kpis")).status_code == 200  # KPIs corre contra el snapshot
+
+    # Más viejo que ANALYTICS_MAX_LAG: se vuelve a la principal
+    settings.ANALYTICS_MAX_LAG = 60
+    viejo = time.time() - 120
+    os.utime(alias_snapshot, (viejo, viejo))
+    db_router.atraso(refrescar=True)
+    with analiticas():
+        assert Item.objects.count() == 3
+
+
+class _ReplicaFalsa:
+    vendor = "postgresql"
+
+    def __init__(self, fila):
+        self.fila, self.sql = fila, []
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.sql.append(sql)
+
+    def fetchone(self):
+        return self.fila
+
+
+class _Conexiones(dict):
+    databases = {ALIAS: {"ENGINE": "django.db.backends.postgresql"}}
+
+
+@pytest.mark.parametrize("fila,esperado", [((0,), 0.0), ((42.5,), 42.5), ((None,), None)])
+def test_atraso_de_replica_postgres(monkeypatch, fila, esperado):
+    replica = _ReplicaFalsa(fila)
+    monkeypatch.setattr(db_router, "connections", _Conexiones({ALIAS: replica}))
+    assert db_router._medir_atraso() == esperado
+    assert "pg_stat_wal_receiver" in replica.sql[0]  # desconectada no cuenta como "al día"
@@ -0,0 +1,72 @@
+import pytest
+
+from core.bot_harness import StubWebhook
+from core.discord import send_discord, coalesce, OutboxWorker, MAX_CONTENT
+from core.models import DiscordOutbox
+
+
+@pytest.fixture
+def webhook(settings):
+    stub = StubWebhook()
+    settings.DISCORD_WEBHOOK_URL = stub.url
+    settings.DISCORD_OUTBOX = True
+    yield stub
+    stub.close()
+
+
+def test_coalesce_respects_discord_limit():
+    msgs = [(i, "x" * 700) for i in range(5)]
+    lotes = coalesce(msgs)
+    assert [ids for ids, _ in lotes] == [[0, 1], [2, 3], [4]]
+    assert all(len(c) <= MAX_CONTENT for _, c in lotes)
+
+
+def test_send_discord_enqueues_and_worker_batches(db, webhook):
+    for i in range(30):
+        send_discord(f"aviso {i}")
+    assert DiscordOutbox.objects.filter(estado="pendiente").count() == 30
+    assert webhook.posts == []  # nada salió durante el "request"
+
+    w = OutboxWorker(min_intervalo=0)
+    assert w.drain() == 30
+    assert len(webhook.posts) == 1  # 30 avisos en un solo post
+    assert webhook.posts[0].splitlines()[0] == "aviso 0"
+    assert DiscordOutbox.objects.filter(estado="enviado").count() == 30
+    assert w.metrics["posts"] == 1 and w.metrics["enviados"] == 30
+
+
+def test_worker_retries_with_backoff_and_rate_limit(db, webhook):
+    send_discord("uno")
+    webhook.respuestas = [500]
+    w = OutboxWorker(min_intervalo=0)
+    assert w.drain() == 0
+    m = DiscordOutbox.objects.get()
+    assert m.estado == "pendiente" and m.intentos == 1 and m.ultimo_error == "HTTP 500"
+    assert w.drain() == 0  # todavía no venció el backoff
+
+    DiscordOutbox.objects.update(proximo_intento=m.creado)
+    webhook.respuestas = [429]
+    assert w.drain() == 0
+    assert w.metrics["rate_limited"] == 1
+    assert DiscordOutbox.objects.get().intentos == 1  # el 429 no cuenta como intento
+
+    DiscordOutbox.objects.update(proximo_intento=m.creado)
+    assert w.drain() == 1
+    assert webhook.posts == ["uno"]
+
+
+def test_drains_superpuestos_no_duplican(db, webhook):
+    from datetime import timedelta
+    from django.utils import timezone
+    for i in range(3):
+        send_discord(f"aviso {i}")
+    a, b = OutboxWorker(min_intervalo=0), OutboxWorker(min_intervalo=0)
+    tomadas = a._tomar()  # la pasada de `a` está en curso
+    assert len(tomadas) == 3
+    assert b.drain() == 0 and webhook.posts == []
+    assert set(DiscordOutbox.objects.values_list("estado", flat=True)) == {"enviando"}
+
+    # `a` murió sin enviar: al vencer el reclamo, otra pasada las retoma
+    DiscordOutbox.objects.update(proximo_intento=timezone.now() - timedelta(seconds=1))
+    assert b.drain() == 3
+    assert len(webhook.posts) == 1
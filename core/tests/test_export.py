@@ -0,0 +1,34 @@
+import csv
+import io
+import json
+
+from django.urls import reverse
+
+from core.models import Nivel
+from core.tests.conftest import make_prestamo
+
+
+def _contenido(resp):
+    return b"".join(resp.streaming_content).decode()
+
+
+def test_export_prestamos_csv_con_filtros(db, admin_client, item_nb, item_al):
+    p = make_prestamo(item_nb)
+    p.cerrar()
+    make_prestamo(item_al, nivel=Nivel.SUPERIOR)
+    resp = admin_client.get(reverse("export", args=["prestamos"]), {"tipo": "NB"})
+    assert resp.streaming and resp["Content-Type"].startswith("text/csv")
+    filas = list(csv.DictReader(io.StringIO(_contenido(resp))))
+    assert [(f["item"], f["estado"]) for f in filas] == [("NB-01", "devuelto")]
+    assert float(filas[0]["duracion_horas"]) > 0
+
+
+def test_export_reservas_ndjson_y_errores(db, admin_client, client_logged, item_nb):
+    make_prestamo(item_nb)
+    url = reverse("export", args=["prestamos"])
+    lineas = _contenido(admin_client.get(url, {"formato": "ndjson", "desde": "2000-01-01"})).splitlines()
+    assert json.loads(lineas[0])["item"] == "NB-01"
+    assert _contenido(admin_client.get(reverse("export", args=["reservas"]), {"formato": "ndjson"})) == ""
+    assert admin_client.get(url, {"desde": "ayer"}).status_code == 400
+    assert admin_client.get(reverse("export", args=["items"])).status_code == 404
+    assert client_logged.get(url).status_code == 403
@@ -0,0 +1,60 @@
+from core.allocation import claim_item
+from core.inventory import state
+from core.models import Item, TipoItem, EstadoItem
+from core.tests.conftest import make_prestamo
+
+
+def test_state_tracks_item_changes(db, item_nb):
+    assert state.available_codes(TipoItem.NOTEBOOK) == ["NB-01"]
+    Item.objects.create(code="NB-02", tipo=TipoItem.NOTEBOOK)
+    assert state.available_codes(TipoItem.NOTEBOOK) == ["NB-01", "NB-02"]
+    claim_item(item_id=item_nb.id)  # UPDATE sin señales: la asignación incrementa la versión
+    assert state.available_codes(TipoItem.NOTEBOOK) == ["NB-02"]
+
+
+def test_state_tracks_open_loans(db, item_nb, user):
+    p = make_prestamo(item_nb, solicitante=user.username)
+    assert state.active_loan_for(item_nb.id).pk == p.pk
+    p.cerrar()
+    assert state.active_loan_for(item_nb.id) is None
+    assert state.active_loans() == []
+
+
+def test_items_disponibles_served_from_memory(db, client, item_nb, django_assert_num_queries):
+    client.get("/api/items/disponibles/?tipo=NB")  # construye el índice
+    with django_assert_num_queries(0):
+        r = client.get("/api/items/disponibles/?tipo=NB")
+    assert [x["code"] for x in r.json()] == ["NB-01"]
+
+
+def test_code_index_lookup_and_prefix_complete(db, django_assert_num_queries):
+    for code, estado in [("NB-01", EstadoItem.DISPONIBLE), ("NB-02", EstadoItem.EN_USO),
+                         ("NB-10", EstadoItem.DISPONIBLE), ("TB-01", EstadoItem.DISPONIBLE)]:
+        Item.objects.create(code=code, tipo=TipoItem.NOTEBOOK, estado=estado)
+    state.snapshot()
+    with django_assert_num_queries(0):
+        assert state.lookup("nb01").code == "NB-01"
+        assert state.lookup("Nb-10").code == "NB-10"
+        assert state.lookup("NB-99") is None
+        assert [it.code for it in state.complete("nb")] == ["NB-01", "NB-02", "NB-10"]
+        assert [it.code for it in state.complete("nb-0", estados=(EstadoItem.DISPONIBLE,))] == ["NB-01"]
+        assert [it.code for it in state.complete("", limit=2)] == ["NB-01", "NB-02"]
+    Item.objects.filter(code="NB-02").update(estado=EstadoItem.DISPONIBLE)
+    Item.objects.get(code="NB-02").save()  # la señal invalida el índice
+    assert [it.code for it in state.complete("nb", estados=(EstadoItem.DISPONIBLE,))] == ["NB-01", "NB-02", "NB-10"]
+
+
+def test_version_compartida_entre_procesos(db, item_nb, settings, tmp_path):
+    from django.core.cache.backends.filebased import FileBasedCache
+    from core.caching import check_cache_compartido
+    from core.inventory import VERSION_KEY
+    assert {w.id for w in check_cache_compartido(None)} == {"core.W001"}  # LocMem de los tests
+
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                                   "LOCATION": str(tmp_path)}}
+    assert check_cache_compartido(None) == []
+    state.snapshot()
+    # Otro proceso (el bot) presta el ítem y sube la versión en su propia instancia del cache
+    Item.objects.filter(pk=item_nb.pk).update(estado=EstadoItem.EN_USO)
+    FileBasedCache(str(tmp_path), {}).incr(VERSION_KEY)
+    assert state.available_codes(TipoItem.NOTEBOOK) == []
@@ -0,0 +1,34 @@
+from core.loadtest import HEADER, percentiles, resumir
+
+
+def test_resumir_percentiles_y_locks():
+    muestras = [("prestamo", float(ms), "ok") for ms in range(1, 101)]
+    muestras += [("prestamo", 500.0, "lock"), ("prestamo", 5.0, "conflicto"), ("chat", 10.0, "error")]
+    r = resumir(muestras, 10)
+    assert r["prestamo"]["n"] == 102 and r["prestamo"]["rps"] == 10.2
+    assert r["prestamo"]["p50"] == 51.0 and r["prestamo"]["p99"] == 100.0
+    assert (r["prestamo"]["locks"], r["prestamo"]["conflictos"], r["prestamo"]["ok"]) == (1, 1, 100)
+    assert r["chat"]["errores"] == 1
+
+
+def test_percentiles_vacio_y_max():
+    assert percentiles([]) == {}
+    assert percentiles([3.0, 1.0, 2.0]) == {"n": 3, "p50": 2.0, "p95": 3.0, "p99": 3.0, "max": 3.0}
+
+
+def test_lock_marcado_por_el_servidor(db, client, settings, monkeypatch):
+    from django.db import OperationalError
+    from core.views import KPIs
+    settings.MIDDLEWARE = ["core.loadtest.LockHeaderMiddleware"] + settings.MIDDLEWARE
+    settings.DEBUG = False
+    client.raise_request_exception = False
+
+    def bloqueada(self, request):
+        raise OperationalError("database is locked")
+    monkeypatch.setattr(KPIs, "get", bloqueada)
+    r = client.get("/api/stats/kpis/")
+    assert r.status_code == 500 and r.headers[HEADER] == "1"
+    assert b"locked" not in r.content  # el cuerpo no lo dice: lo dice el header
+
+    monkeypatch.setattr(KPIs, "get", lambda self, request: 1 / 0)
+    assert HEADER not in client.get("/api/stats/kpis/").headers
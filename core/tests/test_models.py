@@ -1,6 +1,7 @@
 import datetime as dt
+import pytest
 from django.utils import timezone
-from core.models import EstadoItem, Reserva, Nivel, Turno
+from core.models import EstadoItem, Reserva, Nivel, Turno, Item, Prestamo, TipoItem
 
 def test_prestamo_cerrar_updates_item(db, item_nb, user):
     from core.tests.conftest import make_prestamo
@@ -41,4 +42,99 @@ def test_reserva_aprobar_convertir_crea_prestamo(db, item_nb, user):
     assert r.estado == "convertida"
     assert p is not None
     assert p.item_id == item_nb.id
-    assert item_nb.estado == EstadoItem.EN_USO
\ No newline at end of file
+    assert item_nb.estado == EstadoItem.EN_USO
+
+def test_prestamo_cerrar_dos_consultas(db, item_nb, django_assert_num_queries):
+    from core.tests.conftest import make_prestamo
+    p = make_prestamo(item_nb, hours=1.5)
+    p = Prestamo.objects.get(pk=p.pk)  # sin el ítem en memoria
+    with django_assert_num_queries(2):  # UPDATE préstamo + UPDATE ítem (F()), sin SELECT del ítem
+        p.cerrar()
+    item_nb.refresh_from_db()
+    assert float(item_nb.uso_acumulado_horas) == 1.5 and item_nb.usos_acumulados == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_devoluciones_concurrentes_no_pierden_usos():
+    import threading
+    from django.db import connection
+    it = Item.objects.create(code="NB-77", tipo=TipoItem.NOTEBOOK, estado=EstadoItem.EN_USO)
+    inicio = timezone.now() - dt.timedelta(hours=1)
+    Prestamo.objects.bulk_create([Prestamo(item=it, nivel=Nivel.SECUNDARIO, turno=Turno.MANANA, inicio=inicio)
+                                  for _ in range(16)])
+    ids = list(Prestamo.objects.values_list("id", flat=True)) * 2  # cada préstamo se intenta cerrar dos veces
+    barrera = threading.Barrier(len(ids))
+    errores = []
+
+    def worker(pk):
+        try:
+            p = Prestamo.objects.get(pk=pk)
+            barrera.wait()
+            p.cerrar()
+        except Exception as e:  # noqa: BLE001
+            errores.append(e)
+        finally:
+            connection.close()
+
+    hilos = [threading.Thread(target=worker, args=(pk,)) for pk in ids]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    it.refresh_from_db()
+    assert errores == []
+    assert it.usos_acumulados == 16
+    assert float(it.uso_acumulado_horas) == float(sum(Prestamo.objects.values_list("duracion_horas", flat=True)))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_aprobar_y_cancelar_concurrentes_gana_uno():
+    import threading
+    from django.contrib.auth.models import User
+    from django.db import connection
+    op = User.objects.create_user(username="op", password="x")
+    reservas = []
+    for i in range(8):
+        it = Item.objects.create(code=f"NB-6{i}", tipo=TipoItem.NOTEBOOK, estado=EstadoItem.RESERVADO)
+        reservas.append(Reserva.objects.create(item=it, tipo=it.tipo, nivel=Nivel.SECUNDARIO, turno=Turno.MANANA,
+                                               expira=timezone.now() + dt.timedelta(hours=1)))
+    tareas = [(r.pk, accion) for r in reservas for accion in ("aprobar", "cancelar")]
+    barrera = threading.Barrier(len(tareas))
+    ganadas, errores = [], []
+
+    def worker(pk, accion):
+        try:
+            r = Reserva.objects.select_related("item").get(pk=pk)  # ambos la leen "activa"
+            barrera.wait()
+            ok = r.aprobar_y_convertir(op) if accion == "aprobar" else r.cancelar(user=op)
+            if ok:
+                ganadas.append(pk)
+        except Exception as e:  # noqa: BLE001
+            errores.append(e)
+        finally:
+            connection.close()
+
+    hilos = [threading.Thread(target=worker, args=t) for t in tareas]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert errores == []
+    assert sorted(ganadas) == sorted(r.pk for r in reservas)  # exactamente una acción por reserva
+    for r in Reserva.objects.select_related("item"):
+        prestamos = Prestamo.objects.filter(item=r.item).count()
+        if r.estado == "convertida":
+            assert (r.item.estado, prestamos) == (EstadoItem.EN_USO, 1)
+        else:
+            assert (r.estado, r.item.estado, prestamos) == ("cancelada", EstadoItem.DISPONIBLE, 0)
+
+
+def test_transicion_condicional(db, item_nb):
+    r = Reserva.objects.create(item=item_nb, tipo=item_nb.tipo, nivel=Nivel.SECUNDARIO, turno=Turno.MANANA,
+                               expira=timezone.now())
+    viejo = Reserva.objects.get(pk=r.pk)
+    assert r.expirar() is True
+    assert viejo.cancelar() is False and viejo.estado == "expirada"
+    assert viejo.aprobar_y_convertir(None) is None
+    item_nb.refresh_from_db()
+    assert item_nb.estado == EstadoItem.DISPONIBLE and not Prestamo.objects.exists()
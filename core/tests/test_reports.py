@@ -0,0 +1,115 @@
+import datetime as dt
+import io
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import DiscordOutbox, Prestamo, Nivel, Turno
+from core.reports import rango, anterior, calcular, reporte
+
+
+def _ref(y, m, d):
+    return timezone.make_aware(dt.datetime(y, m, d, 15, 0))
+
+
+def _cerrado(item, fin, horas=2.0, tarde=False):
+    inicio = fin - dt.timedelta(hours=horas)
+    return Prestamo.objects.create(
+        item=item, nivel=Nivel.SECUNDARIO, turno=Turno.MANANA, solicitante="testuser",
+        inicio=inicio, fin_prevista=inicio + dt.timedelta(hours=horas - (1 if tarde else -1)),
+        fin_real=fin, duracion_horas=horas, estado="devuelto")
+
+
+@pytest.mark.parametrize("periodo,ref,esperado", [
+    ("day", (2026, 10, 14), ((2026, 10, 14), (2026, 10, 15))),
+    ("week", (2026, 10, 14), ((2026, 10, 12), (2026, 10, 19))),
+    ("month", (2026, 12, 31), ((2026, 12, 1), (2027, 1, 1))),
+    ("term", (2026, 5, 20), ((2026, 3, 1), (2026, 8, 1))),
+    ("term", (2027, 1, 10), ((2026, 8, 1), (2027, 3, 1))),
+])
+def test_rango_por_periodo(periodo, ref, esperado):
+    desde, hasta = rango(periodo, _ref(*ref))
+    assert (desde.date(), hasta.date()) == (dt.date(*esperado[0]), dt.date(*esperado[1]))
+
+
+def test_anterior_de_cuatrimestre():
+    desde, _ = rango("term", _ref(2026, 5, 20))
+    p_desde, p_hasta = anterior("term", desde)
+    assert (p_desde.date(), p_hasta.date()) == (dt.date(2025, 8, 1), dt.date(2026, 3, 1))
+
+
+def test_calcular_compara_con_periodo_anterior_en_dos_consultas(db, item_nb, item_al, django_assert_num_queries,
+                                                                 settings):
+    settings.ARCHIVE_AFTER_DAYS = 3650  # dentro del horizonte: sin consultas al archivo
+    _cerrado(item_nb, _ref(2025, 10, 14), 3, tarde=True)
+    _cerrado(item_al, _ref(2025, 10, 15), 1)
+    _cerrado(item_nb, _ref(2025, 10, 7), 2)
+    _cerrado(item_nb, _ref(2025, 10, 1), 9)  # fuera de ambas semanas
+    with django_assert_num_queries(2):
+        r = calcular("week", _ref(2025, 10, 16))
+    assert r["prestamos"] == {"actual": 2, "anterior": 1, "delta_pct": 100.0}
+    assert r["horas"]["actual"] == 4.0 and r["horas"]["anterior"] == 2.0
+    assert r["tardias"]["actual"] == 1
+    assert r["horas_por_tipo"]["NB"]["actual"] == 3.0 and r["horas_por_turno"]["M"]["actual"] == 4.0
+    assert r["top_items"][0] == {"code": "NB-01", "horas": 3.0}
+    assert r["cerrado"] is True
+
+
+def test_reporte_cachea_periodos_cerrados(db, item_nb, django_assert_num_queries):
+    _cerrado(item_nb, _ref(2025, 10, 14), 3)
+    ref = _ref(2025, 10, 16)
+    texto = reporte("week", "discord", ref)
+    assert "Resumen Semanal (13/10/2025–19/10/2025)" in texto and "NB-01 (3.0 h)" in texto
+    with django_assert_num_queries(0):
+        assert reporte("week", "discord", ref) == texto
+    assert "<table" in reporte("week", "html", ref)
+
+
+def test_periodo_cerrado_pero_no_en_la_replica(db, item_nb, monkeypatch, django_assert_max_num_queries):
+    from core.models import Item, TipoItem
+    ayer = timezone.now() - dt.timedelta(days=1)
+    _, hasta = rango("day", ayer)
+    # La réplica/snapshot todavía no llega al final del período: no se cachea como cerrado
+    monkeypatch.setattr("core.reports.atraso_lectura", lambda: (timezone.now() - hasta).total_seconds() + 60)
+    reporte("day", "json", ayer)
+    Item.objects.create(code="NB-02", tipo=TipoItem.NOTEBOOK)  # cambia la versión del inventario
+    with django_assert_max_num_queries(3) as ctx:
+        reporte("day", "json", ayer)
+    assert len(ctx.captured_queries) > 0
+
+    monkeypatch.setattr("core.reports.atraso_lectura", lambda: 0.0)
+    reporte("day", "json", ayer)
+    Item.objects.create(code="NB-03", tipo=TipoItem.NOTEBOOK)
+    with django_assert_max_num_queries(0):
+        reporte("day", "json", ayer)
+
+
+def test_weekly_report_encola_el_resumen(db, item_nb, settings):
+    settings.DISCORD_WEBHOOK_URL = "http://127.0.0.1:9/webhook"
+    settings.DISCORD_OUTBOX = True
+    _cerrado(item_nb, timezone.now() - dt.timedelta(minutes=5), 1)
+    call_command("weekly_report", stdout=io.StringIO())
+    assert "Resumen Semanal" in DiscordOutbox.objects.latest("id").contenido
+
+
+def test_weekly_report_cubre_la_ultima_semana_cerrada(db, item_nb, settings):
+    from freezegun import freeze_time
+    settings.DISCORD_WEBHOOK_URL = "http://127.0.0.1:9/webhook"
+    settings.DISCORD_OUTBOX = True
+    _cerrado(item_nb, _ref(2025, 10, 18), 2)  # sábado de la semana cerrada
+    _cerrado(item_nb, _ref(2025, 10, 24) - dt.timedelta(hours=5), 7)  # viernes de la semana en curso
+    with freeze_time(timezone.make_aware(dt.datetime(2025, 10, 24, 18, 0))):  # viernes 18:00
+        call_command("weekly_report", stdout=io.StringIO())
+    texto = DiscordOutbox.objects.latest("id").contenido
+    assert "(13/10/2025–19/10/2025)" in texto and "NB-01 (2.0 h)" in texto
+
+
+def test_vista_reportes_html_y_json(db, admin_client, item_nb, settings):
+    settings.STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
+    _cerrado(item_nb, _ref(2026, 10, 13), 3)
+    r = admin_client.get(reverse("reportes"), {"periodo": "month", "fecha": "2026-10-13"})
+    assert r.status_code == 200 and "Resumen Mensual" in r.content.decode()
+    data = admin_client.get(reverse("reportes"), {"periodo": "month", "fecha": "2026-10-13", "formato": "json"}).json()
+    assert data["prestamos"]["actual"] == 1 and data["periodo"] == "month"
@@ -0,0 +1,52 @@
+import datetime as dt
+
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Item, ItemRiskScore, Mantenimiento, TipoItem
+from core.risk import calcular, registrar, ultimos, score_arrays
+
+
+def test_score_arrays_topes_y_pesos():
+    s = score_arrays([0, 40, 200], [0, 50, 500], [0, 1, 9])
+    assert list(s) == [0.0, round(100 * (0.5 * 0.5 + 0.3 * 0.5 + 0.2 / 3), 1), 100.0]
+
+
+def test_calcular_una_consulta_y_ventana(db, django_assert_num_queries):
+    it = Item.objects.create(code="NB-90", tipo=TipoItem.NOTEBOOK, uso_acumulado_horas=80, usos_acumulados=100)
+    Item.objects.create(code="NB-91", tipo=TipoItem.NOTEBOOK)
+    for _ in range(3):
+        Mantenimiento.objects.create(item=it, tipo="correctivo")
+    viejo = Mantenimiento.objects.create(item=it, tipo="correctivo")
+    Mantenimiento.objects.filter(pk=viejo.pk).update(fecha_apertura=timezone.now() - dt.timedelta(days=90))
+    with django_assert_num_queries(1):
+        scores = {r["code"]: r for r in calcular()}
+    assert scores["NB-90"]["tickets"] == 3 and scores["NB-90"]["score"] == 100.0
+    assert scores["NB-91"]["score"] == 0.0
+
+
+def test_registrar_guarda_historial_y_api_lee_la_ultima(db, client_logged):
+    it = Item.objects.create(code="NB-92", tipo=TipoItem.NOTEBOOK, uso_acumulado_horas=80)
+    antes = timezone.now() - dt.timedelta(hours=1)
+    registrar(now=antes)
+    Item.objects.filter(pk=it.pk).update(usos_acumulados=100)
+    registrar()
+    assert ItemRiskScore.objects.filter(item=it).count() == 2
+    assert [r.score for r in ultimos(umbral=70)] == [80.0]
+
+    data = client_logged.get(reverse("items_riesgo"), {"umbral": 70, "tipo": "NB"}).json()
+    assert [(r["code"], r["score"]) for r in data["items"]] == [("NB-92", 80.0)]
+    assert client_logged.get(reverse("items_riesgo"), {"umbral": "x"}).status_code == 400
+
+
+def test_registrar_poda_historial_viejo(db, item_nb):
+    registrar(now=timezone.now() - dt.timedelta(days=100))
+    registrar(conservar_dias=90)
+    assert ItemRiskScore.objects.filter(item=item_nb).count() == 1
+
+
+def test_admin_items_con_riesgo(db, admin_client, item_nb, django_assert_max_num_queries):
+    registrar()
+    with django_assert_max_num_queries(8):
+        r = admin_client.get(reverse("admin:core_item_changelist"))
+    assert r.status_code == 200
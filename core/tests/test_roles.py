@@ -0,0 +1,60 @@
+import pytest
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Nivel
+
+
+def _tablas(ctx):
+    sql = " ".join(q["sql"] for q in ctx.captured_queries)
+    return {t for t in ("auth_user_groups", "core_profile") if t in sql}
+
+
+def test_roles_y_perfil_se_cachean_en_la_sesion(db, cache_compartido, client_logged, settings):
+    settings.STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
+    url = reverse("discord_link")
+    client_logged.get(url)
+    with CaptureQueriesContext(connection) as ctx:
+        r = client_logged.get(url)
+    assert r.status_code == 200
+    assert _tablas(ctx) == set()  # ni grupos (has_role en base.html) ni Profile
+
+
+@pytest.mark.parametrize("compartido", [True, False])
+def test_cambio_de_grupo_o_perfil_invalida(db, client_logged, user, settings, compartido, request):
+    if compartido:
+        request.getfixturevalue("cache_compartido")
+    settings.STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
+    url = reverse("prestamos_activos")
+    assert client_logged.get(url).status_code == 302  # no es operador
+    user.groups.add(Group.objects.create(name="OPERADOR"))
+    assert client_logged.get(url).status_code == 200
+
+    user.profile.nivel = Nivel.PERSONAL
+    user.profile.save()
+    r = client_logged.get(reverse("prestamo"))
+    assert r.context["form"].initial["nivel"] == Nivel.PERSONAL
+
+    Group.objects.filter(name="OPERADOR").delete()
+    assert client_logged.get(url).status_code == 302
+
+
+def test_roles_sin_sesion(db, rf, user):
+    from core.roles import roles_de, perfil_de
+    req = rf.get("/")
+    req.user = user
+    assert not roles_de(req).es_operador
+    assert perfil_de(req).pk == user.profile.pk
+
+
+def test_sin_cache_compartido_no_se_usa_la_sesion(db, client_logged, settings):
+    # LocMem: otro proceso no vería los bumps, así que se lee de la BD cada vez
+    settings.STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
+    url = reverse("discord_link")
+    client_logged.get(url)
+    with CaptureQueriesContext(connection) as ctx:
+        client_logged.get(url)
+    assert _tablas(ctx) == {"auth_user_groups", "core_profile"}
+    assert "_roles_perfil" not in client_logged.session
@@ -0,0 +1,49 @@
+import sqlite3
+import threading
+
+import pytest
+from django.db import connection, transaction
+
+from core.models import Item, TipoItem
+
+pytestmark = pytest.mark.skipif(connection.settings_dict["ENGINE"] != "core.sqlite",
+                                reason="perfil SQLite de producción desactivado")
+
+
+def _otra_conexion():
+    return sqlite3.connect(connection.settings_dict["NAME"], timeout=0, isolation_level=None, check_same_thread=False)
+
+
+def test_pragmas_por_conexion(db):
+    with connection.cursor() as c:
+        assert c.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert c.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+
+@pytest.mark.django_db(transaction=True)
+def test_atomic_toma_el_lock_de_escritura_al_empezar():
+    otra = _otra_conexion()
+    try:
+        with transaction.atomic():
+            # Sin haber escrito nada, otro escritor ya no puede empezar (BEGIN IMMEDIATE)
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                otra.execute("BEGIN IMMEDIATE")
+        otra.execute("BEGIN IMMEDIATE")
+        otra.execute("ROLLBACK")
+    finally:
+        otra.close()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_escritura_ocupada_se_reintenta():
+    connection.ensure_connection()
+    connection.connection.execute("PRAGMA busy_timeout = 10")  # que el busy handler se rinda enseguida
+    otra = _otra_conexion()
+    otra.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.15, otra.execute, args=("ROLLBACK",)).start()
+    try:
+        Item.objects.create(code="NB-55", tipo=TipoItem.NOTEBOOK)  # falla al principio, gana en un reintento
+    finally:
+        connection.close()
+    assert Item.objects.filter(code="NB-55").exists()
+    otra.close()
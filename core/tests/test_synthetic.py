@@ -0,0 +1,52 @@
+import datetime as dt
+import itertools
+
+import numpy as np
+from django.db.models import Sum, Count
+from django.utils import timezone
+
+from core.models import Item, Prestamo, Nivel, Turno, TipoItem
+from core.synthetic import generate, late_prob_adjusted, late_prob_vec
+
+
+def test_late_prob_vec_matches_scalar():
+    examen, normal = dt.date(2025, 6, 15), dt.date(2025, 8, 5)
+    combos = list(itertools.product([examen, normal], TipoItem.values, Nivel.values, Turno.values, [9.5, 20.0, 21.5]))
+    d, tipo, nivel, turno, hour = zip(*combos)
+    vec = late_prob_vec(np.array([x == examen for x in d]), np.array(tipo), np.array(nivel),
+                        np.array(turno), np.array(hour))
+    esperado = [late_prob_adjusted(*c) for c in combos]
+    assert np.allclose(vec, esperado)
+
+
+def test_generate_is_seeded_and_consistent(db):
+    now = timezone.make_aware(dt.datetime(2025, 7, 1, 12, 0))
+    total, creados = generate(days=60, seed=7, now=now)
+    assert creados == 46 and total == Prestamo.objects.count() > 0
+    firma = list(Prestamo.objects.order_by("id").values_list("item_id", "inicio", "duracion_horas")[:50])
+
+    # Superior => Noche y todo cerrado antes de hoy
+    assert not Prestamo.objects.filter(nivel=Nivel.SUPERIOR).exclude(turno=Turno.NOCHE).exists()
+    assert not Prestamo.objects.filter(fin_real__isnull=True).exists()
+    assert Prestamo.objects.filter(inicio__date__gte=now.date()).count() == 0
+
+    # acumulados recalculados en un UPDATE == suma real por ítem
+    agg = {r["item"]: r for r in Prestamo.objects.values("item").annotate(h=Sum("duracion_horas"), n=Count("id"))}
+    for it in Item.objects.all():
+        r = agg.get(it.id, {"h": 0, "n": 0})
+        assert it.usos_acumulados == r["n"] and float(it.uso_acumulado_horas) == float(r["h"] or 0)
+
+    # misma semilla -> mismos datos
+    Prestamo.objects.all().delete()
+    generate(days=60, seed=7, now=now)
+    assert list(Prestamo.objects.order_by("id").values_list("item_id", "inicio", "duracion_horas")[:50]) == firma
+
+
+def test_generate_scales_with_items(db):
+    now = timezone.make_aware(dt.datetime(2025, 3, 1, 12, 0))
+    base, _ = generate(days=30, seed=1, now=now)
+    Prestamo.objects.all().delete()
+    grande, creados = generate(days=30, items=460, seed=1, now=now)
+    assert creados == 460 - 46
+    assert Item.objects.filter(code="NB-200").exists()
+    assert 7 * base < grande < 13 * base
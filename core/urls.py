@@ -3,11 +3,11 @@ from django.views.generic import TemplateView
 
 from .views import (
     Home,
-    PrestamoRapidoView, DevolucionView,
-    PrestamosActivosView, ReservasPendientesView,
-    aprobar_reserva, cancelar_reserva,
+    PrestamoRapidoView, DevolucionView, DevolucionLoteView, devolucion_lote_api,
+    PrestamosActivosView, ReservasPendientesView, ReporteView,
+    aprobar_reserva, cancelar_reserva, aprobar_reservas_lote_view, prestamo_lote_api,
     SignupView, AuthLoginView, AuthLogoutView, DiscordLinkView,
-    ItemsDisponibles, KPIs, chat_api,
+    ItemsDisponibles, KPIs, RiesgoItems, chat_api, export_api,
     PrediccionesML, PrediccionesMLExplain,
 )
 
@@ -21,12 +21,15 @@ urlpatterns = [
     path('prestamo/ok/', TemplateView.as_view(template_name='ok.html'), name='prestamo_ok'),
     path('devolucion/', DevolucionView.as_view(), name='devolucion'),
     path('devolucion/ok/', TemplateView.as_view(template_name='ok.html'), name='devolucion_ok'),
+    path('devolucion/lote/', DevolucionLoteView.as_view(), name='devolucion_lote'),
 
     # Staff / Mostrador
     path('prestamos/activos/', PrestamosActivosView.as_view(), name='prestamos_activos'),
     path('reservas/pendientes/', ReservasPendientesView.as_view(), name='reservas_pendientes'),
     path('reservas/<int:rid>/aprobar/', aprobar_reserva, name='aprobar_reserva'),
+    path('reservas/aprobar_lote/', aprobar_reservas_lote_view, name='aprobar_reservas_lote'),
     path('reservas/<int:rid>/cancelar/', cancelar_reserva, name='cancelar_reserva'),
+    path('reportes/', ReporteView.as_view(), name='reportes'),
 
     # Auth
     path('accounts/login/',  AuthLoginView.as_view(), name='login'),
@@ -37,7 +40,11 @@ urlpatterns = [
     # APIs
     path('api/items/disponibles/', ItemsDisponibles.as_view(), name='items_disponibles'),
     path('api/stats/kpis/', KPIs.as_view(), name='kpis'),
+    path('api/items/riesgo/', RiesgoItems.as_view(), name='items_riesgo'),
     path('api/chat/', chat_api, name='chat_api'),
+    path('api/prestamos/lote/', prestamo_lote_api, name='prestamo_lote_api'),
+    path('api/prestamos/devolucion_lote/', devolucion_lote_api, name='devolucion_lote_api'),
+    path('api/export/<slug:modelo>/', export_api, name='export'),
 
     # Predicciones ML
     path('api/predicciones_ml/', PrediccionesML.as_view(), name='predicciones_ml'),
@@ -8,20 +8,33 @@ from django.views.decorators.http import require_POST
 from django.contrib import messages
 from django.contrib.auth import login
 from django.utils import timezone
-from django.db.models import Sum, Avg, F
+from django.db.models import Sum, Avg, Count, F
 from django.utils.crypto import get_random_string
-from django.http import HttpResponseRedirect, JsonResponse
+from django.http import HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.urls import reverse
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
-from .forms import PrestamoRapidoForm, DevolucionForm, SignupForm
+from .forms import PrestamoRapidoForm, DevolucionForm, DevolucionLoteForm, SignupForm
 from .models import (
     Prestamo, Item, Turno, TipoItem, EstadoItem, Nivel,
-    DiscordLinkToken, Profile, Reserva, CarreraSup, AnioSup
+    DiscordLinkToken, Reserva
 )
 from .discord import send_discord
+from .bulk import (
+    devolver_lote, resumen_devolucion, parse_codes,
+    prestar_lote, aprobar_reservas_lote, resumen_prestamos, SinDisponibilidad,
+)
+from .inventory import state as inventory_state
+from .chat import chat_api, _infer_turno  # noqa: F401 (urls importa chat_api desde views)
+from .analytics import columnar_enabled, get_engine as get_analytics_engine
+from .risk import ultimos as riesgos_ultimos
+from .roles import roles_de, perfil_de
+from . import reports
+from . import export
+from . import archive
+from .db_router import analiticas
 
 # ML runtime helpers
 from core.ml_runtime import (
@@ -30,7 +43,7 @@ from core.ml_runtime import (
 )
 
 # Extras
-import json, re, unicodedata
+import json
 import datetime as dt
 import pandas as pd
 
@@ -43,11 +56,23 @@ class Home(View):
         return render(request, "home.html")
 
 
+def _es_operador(request):
+    return roles_de(request).es_operador
+
+
+def _json_body(request):
+    """Cuerpo JSON como dict (None si no es un objeto JSON válido)."""
+    try:
+        data = json.loads(request.body or "{}")
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
 class OperadorRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
     raise_exception = False
     def test_func(self):
-        u = self.request.user
-        return u.is_superuser or u.groups.filter(name__in=["OPERADOR", "STAFF"]).exists()
+        return _es_operador(self.request)
     def handle_no_permission(self):
         if self.request.user.is_authenticated:
             messages.error(self.request, "No tenés permisos para esta sección.")
@@ -57,7 +82,7 @@ class OperadorRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
 
 class PrestamoRapidoView(LoginRequiredMixin, View):
     def get(self, request):
-        p, _ = Profile.objects.get_or_create(user=request.user)
+        p = perfil_de(request)
         initial = {
             "solicitante": request.user.username,
             "nivel": p.nivel,
@@ -68,8 +93,8 @@ class PrestamoRapidoView(LoginRequiredMixin, View):
 
     def post(self, request):
         form = PrestamoRapidoForm(request.POST)
-        if form.is_valid():
-            p_obj = form.save()
+        p_obj = form.save() if form.is_valid() else None
+        if p_obj:
             if p_obj.solicitante != request.user.username:
                 p_obj.solicitante = request.user.username
                 p_obj.save(update_fields=["solicitante"])
@@ -96,15 +121,105 @@ class DevolucionView(LoginRequiredMixin, View):
         return render(request, "devolucion.html", {"form": form})
 
 
+class DevolucionLoteView(OperadorRequiredMixin, View):
+    # Fin de clase: varios códigos (p.ej. con lector de barras) en una sola operación
+    def get(self, request):
+        return render(request, "devolucion_lote.html", {"form": DevolucionLoteForm()})
+    def post(self, request):
+        form = DevolucionLoteForm(request.POST)
+        if not form.is_valid():
+            return render(request, "devolucion_lote.html", {"form": form})
+        res = devolver_lote(form.cleaned_data["codes"])
+        if res["devueltos"]:
+            send_discord(resumen_devolucion(request.user.username, res["devueltos"]))
+            messages.success(request, f"{len(res['devueltos'])} devoluciones registradas.")
+        if res["no_encontrados"]:
+            messages.error(request, "Sin préstamo activo: " + ", ".join(res["no_encontrados"]))
+        return render(request, "devolucion_lote.html", {"form": DevolucionLoteForm(), "resultado": res})
+
+
+@login_required
+@require_POST
+def devolucion_lote_api(request):
+    if not _es_operador(request):
+        return JsonResponse({"error": "Sin permisos"}, status=403)
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({"error": "JSON inválido"}, status=400)
+    codes = data.get("codes") or []
+    codes = parse_codes(" ".join(codes) if isinstance(codes, list) else str(codes))
+    if not codes:
+        return JsonResponse({"error": "Faltan códigos"}, status=400)
+    res = devolver_lote(codes)
+    if res["devueltos"]:
+        send_discord(resumen_devolucion(request.user.username, res["devueltos"]))
+    return JsonResponse({
+        "devueltos": [{"code": c, "horas": h} for c, h in res["devueltos"]],
+        "no_encontrados": res["no_encontrados"],
+    })
+
+
+@login_required
+@require_POST
+def prestamo_lote_api(request):
+    # Carrito completo (p.ej. 20 tablets) para un mismo solicitante/aula: operadores y docentes
+    prof = perfil_de(request)
+    if not (_es_operador(request) or prof.nivel == Nivel.PERSONAL):
+        return JsonResponse({"error": "Sin permisos"}, status=403)
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({"error": "JSON inválido"}, status=400)
+    tipo = data.get("tipo")
+    if tipo not in {k for k, _ in TipoItem.choices}:
+        return JsonResponse({"error": "Tipo inválido"}, status=400)
+    try:
+        cantidad = int(data.get("cantidad", 0))
+    except (TypeError, ValueError):
+        cantidad = 0
+    if not 1 <= cantidad <= 100:
+        return JsonResponse({"error": "Cantidad inválida (1 a 100)"}, status=400)
+    nivel = data.get("nivel") if data.get("nivel") in {k for k, _ in Nivel.choices} else prof.nivel
+    turno = data.get("turno") if data.get("turno") in {k for k, _ in Turno.choices} else _infer_turno()
+    solicitante = request.user.username
+    if data.get("solicitante") and _es_operador(request):
+        solicitante = str(data["solicitante"])[:80]
+    try:
+        prestamos = prestar_lote(tipo, cantidad, nivel, turno, aula=str(data.get("aula") or "")[:20],
+                                 solicitante=solicitante, carrera=prof.carrera, anio=prof.anio)
+    except SinDisponibilidad as e:
+        return JsonResponse({"error": str(e)}, status=409)
+    send_discord(resumen_prestamos(f"{solicitante} (aula {data.get('aula') or '—'})", prestamos))
+    return JsonResponse({"prestamos": [{"id": p.id, "code": p.item.code} for p in prestamos]})
+
+
 class PrestamosActivosView(OperadorRequiredMixin, View):
     def get(self, request):
-        activos = (Prestamo.objects
-                   .filter(fin_real__isnull=True)
-                   .select_related("item")
-                   .order_by("-inicio"))
+        activos = inventory_state.active_loans()
         return render(request, "prestamos_activos.html", {"activos": activos})
 
 
+# Reportes por período (día/semana/mes/cuatrimestre), ?formato=json para la API
+class ReporteView(OperadorRequiredMixin, View):
+    def get(self, request):
+        periodo = request.GET.get("periodo", "week")
+        if periodo not in reports.PERIODOS:
+            periodo = "week"
+        fecha = request.GET.get("fecha") or ""
+        try:
+            ref = timezone.make_aware(dt.datetime.strptime(fecha, "%Y-%m-%d")) if fecha else None
+        except ValueError:
+            ref, fecha = None, ""
+        if request.GET.get("formato") == "json":
+            return JsonResponse(reports.reporte(periodo, "json", ref), json_dumps_params={"ensure_ascii": False})
+        desde, hasta = reports.rango(periodo, ref)
+        return render(request, "reporte.html", {
+            "titulo": reports.TITULOS[periodo], "periodo": periodo, "fecha": fecha,
+            "etiqueta": f"{desde:%d/%m/%Y}–{hasta - dt.timedelta(days=1):%d/%m/%Y}",
+            "periodos": [(p, reports.TITULOS[p]) for p in reports.PERIODOS],
+            "fragmento": reports.reporte(periodo, "html", ref),
+        })
+
+
 # Reservas pendientes (mostrador)
 class ReservasPendientesView(OperadorRequiredMixin, View):
     def get(self, request):
@@ -115,7 +230,7 @@ class ReservasPendientesView(OperadorRequiredMixin, View):
 @login_required
 @require_POST
 def aprobar_reserva(request, rid):
-    if not (request.user.is_superuser or request.user.groups.filter(name__in=["OPERADOR","STAFF"]).exists()):
+    if not _es_operador(request):
         return redirect("home")
     try:
         r = Reserva.objects.select_related("item").get(pk=rid, estado="activa")
@@ -131,17 +246,34 @@ def aprobar_reserva(request, rid):
     return HttpResponseRedirect(reverse("reservas_pendientes"))
 
 
+@login_required
+@require_POST
+def aprobar_reservas_lote_view(request):
+    if not _es_operador(request):
+        return redirect("home")
+    ids = [int(x) for x in request.POST.getlist("ids") if str(x).isdigit()]
+    prestamos = aprobar_reservas_lote(ids, request.user)
+    if prestamos:
+        send_discord(resumen_prestamos("Reservas aprobadas en mostrador", prestamos))
+        messages.success(request, f"{len(prestamos)} reservas aprobadas y convertidas a préstamo.")
+    if len(prestamos) < len(ids):
+        messages.error(request, f"{len(ids) - len(prestamos)} reservas no se pudieron convertir.")
+    return HttpResponseRedirect(reverse("reservas_pendientes"))
+
+
 @login_required
 @require_POST
 def cancelar_reserva(request, rid):
-    if not (request.user.is_superuser or request.user.groups.filter(name__in=["OPERADOR","STAFF"]).exists()):
+    if not _es_operador(request):
         return redirect("home")
     try:
         r = Reserva.objects.select_related("item").get(pk=rid, estado="activa")
     except Reserva.DoesNotExist:
         messages.error(request, "Reserva no encontrada o ya no está activa.")
         return HttpResponseRedirect(reverse("reservas_pendientes"))
-    r.cancelar(user=request.user, motivo="Cancelada en mostrador")
+    if not r.cancelar(user=request.user, motivo="Cancelada en mostrador"):
+        messages.error(request, "La reserva ya no está activa.")
+        return HttpResponseRedirect(reverse("reservas_pendientes"))
     send_discord(f"🚫 Reserva cancelada: {r.item.code if r.item else r.tipo} (por {request.user.username}).")
     messages.success(request, "Reserva cancelada.")
     return HttpResponseRedirect(reverse("reservas_pendientes"))
@@ -156,13 +288,12 @@ class ItemsDisponibles(APIView):
         valid = {k for k, _ in TipoItem.choices}
         if tipo not in valid:
             return Response([])
-        items = (Item.objects
-                 .filter(tipo=tipo, estado=EstadoItem.DISPONIBLE)
-                 .order_by("code"))
+        items = inventory_state.available_items(tipo)
         return Response([{"code": i.code, "id": i.id} for i in items])
 
 
 class KPIs(APIView):
+    @analiticas()
     def get(self, request):
         days = int(request.GET.get("days", 30))
         tipo = request.GET.get("tipo")
@@ -170,28 +301,61 @@ class KPIs(APIView):
         carrera = request.GET.get("carrera")
         anio = request.GET.get("anio")
 
+        if columnar_enabled():
+            data = get_analytics_engine().kpis(days=days, tipo=tipo, nivel=nivel, carrera=carrera, anio=anio)
+            data["en_mantenimiento"] = Item.objects.filter(estado=EstadoItem.MANTENIMIENTO).count()
+            return Response(data)
+
         since = timezone.now() - dt.timedelta(days=days)
+        if archive.alcanza(since):
+            # Con rollups archivados (por día) la tabla caliente corta también a medianoche:
+            # el resultado no cambia al archivar
+            since = archive.inicio_del_dia(since)
         qs = Prestamo.objects.filter(fin_real__isnull=False, fin_real__gte=since)
+        filtros = {}
 
         if tipo in {k for k, _ in TipoItem.choices}:
             qs = qs.filter(item__tipo=tipo)
+            filtros["tipo"] = tipo
         if nivel in {k for k, _ in Nivel.choices}:
             qs = qs.filter(nivel=nivel)
+            filtros["nivel"] = nivel
             if nivel == "SUP":
-                if carrera in {"TCD","PTEC"}: qs = qs.filter(carrera=carrera)
-                if anio in {"1","2"}: qs = qs.filter(anio=int(anio))
+                if carrera in {"TCD","PTEC"}: qs = qs.filter(carrera=carrera); filtros["carrera"] = carrera
+                if anio in {"1","2"}: qs = qs.filter(anio=int(anio)); filtros["anio"] = anio
+
+        # Ventana más larga que el horizonte de archivo: se suman los rollups archivados
+        arch = archive.kpis(since, **filtros) if archive.alcanza(since) else None
 
         top = (qs.values("item__code", "item__tipo")
                  .annotate(horas=Sum("duracion_horas"))
-                 .order_by("-horas")[:5])
+                 .order_by("-horas"))
+        if arch is None:
+            top = top[:5]
+        else:
+            por_item = dict(arch["por_item"])
+            for r in top:
+                clave = (r["item__code"], r["item__tipo"])
+                por_item[clave] = por_item.get(clave, 0.0) + float(r["horas"] or 0)
+            top = [{"item__code": c, "item__tipo": t, "horas": round(h, 2)}
+                   for (c, t), h in sorted(por_item.items(), key=lambda x: -x[1])[:5]]
 
         by_tipo = qs.values("item__tipo").annotate(h=Sum("duracion_horas"))
         horas_por_tipo = {r["item__tipo"]: float(r["h"] or 0) for r in by_tipo}
 
         uso_por_turno = {t[0]: float(qs.filter(turno=t[0]).aggregate(h=Sum("duracion_horas"))["h"] or 0) for t in Turno.choices}
-        promedio_duracion = float(qs.aggregate(avg=Avg("duracion_horas"))["avg"] or 0)
+        prom = qs.aggregate(avg=Avg("duracion_horas"), n=Count("duracion_horas"))
+        promedio_duracion = float(prom["avg"] or 0)
+        if arch is not None:
+            for t, h in arch["por_tipo"].items():
+                horas_por_tipo[t] = horas_por_tipo.get(t, 0.0) + h
+            for t, h in arch["por_turno"].items():
+                uso_por_turno[t] = uso_por_turno.get(t, 0.0) + h
+            n = prom["n"] + arch["n"]
+            promedio_duracion = (promedio_duracion * prom["n"] + arch["horas"]) / n if n else 0.0
         en_mantenimiento = Item.objects.filter(estado=EstadoItem.MANTENIMIENTO).count()
-        devoluciones_tardias = Prestamo.objects.filter(fin_prevista__isnull=False, fin_real__gt=F("fin_prevista")).count()
+        devoluciones_tardias = (Prestamo.objects.filter(fin_prevista__isnull=False, fin_real__gt=F("fin_prevista")).count()
+                                + archive.tardias())
 
         return Response({
             "top_items": list(top),
@@ -203,6 +367,43 @@ class KPIs(APIView):
         })
 
 
+class RiesgoItems(APIView):
+    """Última corrida de predict_risk: ?umbral=70&tipo=NB&limit=50 (mayor riesgo primero)."""
+    def get(self, request):
+        try:
+            umbral = float(request.GET["umbral"]) if request.GET.get("umbral") else None
+            limit = min(int(request.GET.get("limit", 50)), 1000)
+        except ValueError:
+            return Response({"error": "umbral/limit inválidos"}, status=400)
+        qs = riesgos_ultimos(umbral)
+        tipo = request.GET.get("tipo")
+        if tipo in {k for k, _ in TipoItem.choices}:
+            qs = qs.filter(item__tipo=tipo)
+        filas = list(qs[:limit])
+        return Response({
+            "calculado": filas[0].calculado if filas else None,
+            "items": [{"code": r.item.code, "tipo": r.item.tipo, "estado": r.item.estado, "score": r.score,
+                       "horas": r.horas, "usos": r.usos, "tickets": r.tickets} for r in filas],
+        })
+
+
+# Historial completo en CSV/NDJSON (staff): ?formato=csv|ndjson&desde=&hasta=&tipo=&nivel=&estado=
+@login_required
+def export_api(request, modelo):
+    if not _es_operador(request):
+        return JsonResponse({"error": "Sin permisos"}, status=403)
+    formato = request.GET.get("formato", "csv")
+    if modelo not in export.EXPORTS or formato not in export.FORMATOS:
+        return JsonResponse({"error": "Export inexistente"}, status=404)
+    try:
+        filas = export.queryset(modelo, **{k: request.GET.get(k) for k in ("desde", "hasta", "tipo", "nivel", "estado")})
+    except export.FiltroInvalido as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    resp = StreamingHttpResponse(export.stream(modelo, formato, filas), content_type=export.FORMATOS[formato])
+    resp["Content-Disposition"] = f'attachment; filename="{modelo}-{timezone.localdate():%Y%m%d}.{formato}"'
+    return resp
+
+
 # =========================
 # AUTH
 # =========================
@@ -230,298 +431,22 @@ class AuthLogoutView(LogoutView):
 
 class DiscordLinkView(LoginRequiredMixin, View):
     def get(self, request):
-        prof, _ = Profile.objects.get_or_create(user=request.user)
+        prof = perfil_de(request)
         return render(request, "registration/discord_link.html", {
             "token": None,
-            "linked": bool(prof.discord_user_id)
+            "linked": bool(prof.discord_user_id),
+            "discord_user_id": prof.discord_user_id,
         })
     def post(self, request):
-        Profile.objects.get_or_create(user=request.user)
+        prof = perfil_de(request)
         code = get_random_string(6, allowed_chars="ABCDEFGHJKLMNPQRSTUVWXYZ23456789")
         DiscordLinkToken.objects.create(user=request.user, token=code)
-        prof = request.user.profile
         return render(request, "registration/discord_link.html", {
             "token": code,
-            "linked": bool(prof.discord_user_id)
-        })
-
-
-# =========================
-# CHATBOT (solo logueados)
-# =========================
-def _now():
-    return timezone.localtime()
-
-def _expira_2300(dtref=None):
-    dtref = dtref or _now()
-    exp = dtref.replace(hour=23, minute=0, second=0, microsecond=0)
-    if dtref > exp:
-        exp = exp + dt.timedelta(days=1)
-    return exp
-
-def _infer_turno(dtref=None):
-    dtref = dtref or _now()
-    t = dtref.time()
-    if dt.time(6,0) <= t <= dt.time(12,0):
-        return Turno.MANANA
-    if dt.time(13,0) <= t <= dt.time(17,0):
-        return Turno.TARDE
-    if dt.time(17,15) <= t <= dt.time(23,0):
-        return Turno.NOCHE
-    return Turno.NOCHE
-
-def _norm(s):
-    s = (s or '').lower().strip()
-    s = ''.join(c for c in unicodedata.normalize('NFD', s) if unicodedata.category(c) != 'Mn')
-    return s
-
-def _parse_nivel(s):
-    s = _norm(s)
-    if s.startswith('sup'): return Nivel.SUPERIOR
-    if s.startswith('per') or 'docente' in s: return Nivel.PERSONAL
-    return Nivel.SECUNDARIO
-
-def _parse_turno(s):
-    s = _norm(s)
-    if s.startswith('man'): return Turno.MANANA
-    if s.startswith('tar'): return Turno.TARDE
-    if s.startswith('noc'): return Turno.NOCHE
-    return None
-
-def _parse_carrera(s):
-    s = _norm(s)
-    if s.startswith('tcd'): return CarreraSup.TCD
-    if s.startswith('pte') or 'prof' in s: return CarreraSup.PTEC
-    return None
-
-def _parse_anio(s):
-    s = _norm(s)
-    if s.startswith('1'): return AnioSup.PRIMERO
-    if s.startswith('2'): return AnioSup.SEGUNDO
-    return None
-
-def _suggestions(base=None):
-    return base or ["Menú","Mis reservas","Mis préstamos","Reservar NB-01","Devolver NB-01","Cancelar reserva"]
-
-def _menu_text():
-    return (
-        "Opciones rápidas:\n"
-        "• Reservar NB-01 (o cualquier código)\n"
-        "• Devolver NB-01\n"
-        "• Mis reservas | Mis préstamos\n"
-        "• Cancelar reserva\n"
-        "También podés cambiar turno: “cambiar a noche”."
-    )
-
-def _get_state(request):
-    st = request.session.get('chat_state') or {}
-    request.session['chat_state'] = st
-    return st
-
-def _clear_pending(request):
-    st = _get_state(request)
-    st['pending'] = None
-    request.session.modified = True
-
-
-@login_required
-@require_POST
-def chat_api(request):
-    data = json.loads(request.body or '{}')
-    msg_raw = data.get('message') or ''
-    msg = _norm(msg_raw)
-    user = request.user
-    username = user.username
-    state = _get_state(request)
-
-    # Menú
-    if msg in ('menu', 'menú'):
-        return JsonResponse({'reply': _menu_text(), 'suggestions': _suggestions()})
-
-    # Mis reservas
-    if 'mis reservas' in msg:
-        rs = Reserva.objects.filter(solicitante=username, estado='activa').select_related('item').order_by('-inicio')
-        if not rs:
-            return JsonResponse({'reply': 'No tenés reservas activas.', 'suggestions': _suggestions()})
-        lines = []
-        for r in rs:
-            it = r.item
-            code = it.code if it else '(sin asignar)'
-            lines.append(f'- {code} · {r.get_turno_display()} · expira {timezone.localtime(r.expira).strftime("%d/%m %H:%M")}')
-        return JsonResponse({'reply': "Tus reservas activas:\n" + "\n".join(lines), 'suggestions': _suggestions(['Cancelar reserva'])})
-
-    # Mis préstamos
-    if 'mis prestamos' in msg or 'mis préstamos' in msg:
-        ps = Prestamo.objects.filter(solicitante=username, fin_real__isnull=True).select_related('item').order_by('-inicio')
-        if not ps:
-            return JsonResponse({'reply': 'No tenés préstamos activos.', 'suggestions': _suggestions()})
-        lines = [f'- {p.item.code} · {p.get_turno_display()} · desde {timezone.localtime(p.inicio).strftime("%d/%m %H:%M")}' for p in ps]
-        return JsonResponse({'reply': "Tus préstamos activos:\n" + "\n".join(lines), 'suggestions': _suggestions(['Devolver ' + ps[0].item.code])})
-
-    # Cancelar reserva (una por usuario)
-    if 'cancelar reserva' in msg or msg == 'cancelar':
-        r = Reserva.objects.filter(solicitante=username, estado='activa').first()
-        if not r:
-            return JsonResponse({'reply': 'No encontré reservas activas para cancelar.', 'suggestions': _suggestions()})
-        r.cancelar(user=user, motivo='cancelada desde chatbot')
-        return JsonResponse({'reply': f'Reserva cancelada ({r.item.code if r.item else r.tipo}).', 'suggestions': _suggestions()})
-
-    # Cambiar turno explícito durante reserva
-    if msg.startswith('cambiar a '):
-        t = _parse_turno(msg.replace('cambiar a ', ''))
-        pending = state.get('pending') or {}
-        if pending and pending.get('flow') == 'reserve' and t:
-            pending['turno'] = t
-            state['pending'] = pending
-            request.session.modified = True
-            return JsonResponse({'reply': f'Turno actualizado a {dict(Turno.choices)[t]}. Decí "confirmo" para crear la reserva o "cancelar".', 'suggestions': ['confirmo','cancelar']})
-        return JsonResponse({'reply': 'Podés decir: "cambiar a mañana/tarde/noche" cuando estés reservando.', 'suggestions': _suggestions()})
-
-    # Devolver por código
-    m_ret = re.search(r'(devolver|entregar)\s+([a-z0-9\-]+)', msg)
-    if m_ret:
-        code = m_ret.group(2).upper()
-        try:
-            it = Item.objects.get(code__iexact=code)
-        except Item.DoesNotExist:
-            return JsonResponse({'reply': f'No encontré el ítem {code}.', 'suggestions': _suggestions()})
-        p = Prestamo.objects.filter(item=it, solicitante=username, fin_real__isnull=True).first()
-        if not p:
-            return JsonResponse({'reply': f'No tenés un préstamo activo de {code}.', 'suggestions': _suggestions(['Mis préstamos'])})
-        state['pending'] = {'flow':'return','code':code,'prestamo_id':p.id}
-        request.session.modified = True
-        return JsonResponse({'reply': f'Voy a registrar la devolución de {code}. ¿Confirmás? (sí/no)', 'suggestions': ['sí','no']})
-
-    # Reservar por código
-    m_res = re.search(r'reserv(ar|a)\s+([a-z0-9\-]+)', msg)
-    if m_res:
-        code = m_res.group(2).upper()
-        if Reserva.objects.filter(solicitante=username, estado='activa').exists():
-            return JsonResponse({'reply': 'Ya tenés una reserva activa. Primero cancelala o esperá a que se convierta.', 'suggestions': ['Mis reservas','Cancelar reserva']})
-        try:
-            it = Item.objects.get(code__iexact=code)
-        except Item.DoesNotExist:
-            return JsonResponse({'reply': f'No encontré el ítem {code}.', 'suggestions': _suggestions()})
-        if it.estado in (EstadoItem.EN_USO, EstadoItem.MANTENIMIENTO, EstadoItem.RESERVADO):
-            return JsonResponse({'reply': f'El ítem {code} no está disponible para reservar (estado: {dict(EstadoItem.choices)[it.estado]}).', 'suggestions': _suggestions()})
-
-        turno = _infer_turno()
-        pending = {
-            'flow':'reserve', 'code':code, 'item_id':it.id, 'tipo':it.tipo,
-            'nivel': None, 'carrera': None, 'anio': None, 'turno': turno, 'aula': None
-        }
-        state['pending'] = pending
-        request.session.modified = True
-        return JsonResponse({
-            'reply': f'Voy a reservar {code}. ¿Cuál es tu nivel? (Secundario / Superior / Personal)\nTurno sugerido: {dict(Turno.choices)[turno]} (podés decir "cambiar a mañana/tarde/noche").',
-            'suggestions': ['Secundario','Superior','Personal','cambiar a noche','cancelar']
+            "linked": bool(prof.discord_user_id),
+            "discord_user_id": prof.discord_user_id,
         })
 
-    # Completar flujo de reserva
-    pending = state.get('pending')
-    if pending and pending.get('flow') == 'reserve':
-        # Nivel
-        if not pending.get('nivel'):
-            if any(x in msg for x in ('sec', 'sup', 'per', 'docente', 'superior', 'secundario', 'personal')):
-                nv = _parse_nivel(msg)
-                pending['nivel'] = nv
-                state['pending'] = pending
-                request.session.modified = True
-                if nv == Nivel.SUPERIOR:
-                    return JsonResponse({'reply': 'Carrera (TCD / PTEC)?', 'suggestions': ['TCD','PTEC']})
-                else:
-                    return JsonResponse({'reply': '¿Aula? (o escribí "-" para dejar vacío)', 'suggestions': ['-']})
-            else:
-                return JsonResponse({'reply': 'Indicá tu nivel: Secundario / Superior / Personal', 'suggestions': ['Secundario','Superior','Personal']})
-
-        # Carrera/Año si Superior
-        if pending['nivel'] == Nivel.SUPERIOR and not pending.get('carrera'):
-            car = _parse_carrera(msg)
-            if not car:
-                return JsonResponse({'reply': 'Carrera no válida. Opciones: TCD o PTEC.', 'suggestions': ['TCD','PTEC']})
-            pending['carrera'] = car
-            state['pending'] = pending
-            request.session.modified = True
-            return JsonResponse({'reply': '¿Año? (1 o 2)', 'suggestions': ['1','2']})
-
-        if pending['nivel'] == Nivel.SUPERIOR and not pending.get('anio'):
-            an = _parse_anio(msg)
-            if not an:
-                return JsonResponse({'reply': 'Año no válido. Indicá 1 o 2.', 'suggestions': ['1','2']})
-            pending['anio'] = an
-            state['pending'] = pending
-            request.session.modified = True
-            return JsonResponse({'reply': '¿Aula? (o escribí "-" para dejar vacío)', 'suggestions': ['-']})
-
-        # Aula
-        if pending.get('aula') is None:
-            aula = msg_raw.strip()
-            if aula == '-' or aula == '':
-                aula = ''
-            pending['aula'] = aula
-            state['pending'] = pending
-            request.session.modified = True
-            resumen = [
-                f'Ítem: {pending["code"]}',
-                f'Nivel: {dict(Nivel.choices)[pending["nivel"]]}',
-                f'Turno: {dict(Turno.choices)[pending["turno"]]}',
-                f'Aula: {pending["aula"] or "—"}'
-            ]
-            if pending['nivel'] == Nivel.SUPERIOR:
-                resumen.insert(2, f'Carrera/Año: {dict(CarreraSup.choices)[pending["carrera"]]} · {dict(AnioSup.choices)[pending["anio"]]}')
-            return JsonResponse({
-                'reply': "Confirmar reserva:\n" + "\n".join(resumen) + "\n¿Confirmás? (sí/no)",
-                'suggestions': ['sí','no','cambiar a noche','cancelar']
-            })
-
-    # Confirmaciones
-    if msg in ('si','sí','confirmo','ok'):
-        pending = state.get('pending')
-        if pending and pending.get('flow') == 'reserve':
-            try:
-                it = Item.objects.get(id=pending['item_id'])
-            except Item.DoesNotExist:
-                _clear_pending(request)
-                return JsonResponse({'reply': 'El ítem ya no está disponible.', 'suggestions': _suggestions()})
-            if it.estado != EstadoItem.DISPONIBLE:
-                _clear_pending(request)
-                return JsonResponse({'reply': f'El ítem cambió de estado a {dict(EstadoItem.choices)[it.estado]}.', 'suggestions': _suggestions()})
-            if Reserva.objects.filter(solicitante=username, estado='activa').exists():
-                _clear_pending(request)
-                return JsonResponse({'reply': 'Ya tenés una reserva activa.', 'suggestions': ['Mis reservas']})
-
-            expira = _expira_2300()
-            Reserva.objects.create(
-                item=it, tipo=it.tipo, nivel=pending['nivel'],
-                turno=pending['turno'], aula=pending['aula'] or '',
-                solicitante=username, expira=expira
-            )
-            it.estado = EstadoItem.RESERVADO
-            it.save(update_fields=['estado'])
-
-            _clear_pending(request)
-            return JsonResponse({
-                'reply': f'Listo. Reserva creada para {it.code}. Expira el {expira.strftime("%d/%m %H:%M")}.',
-                'suggestions': _suggestions(['Mis reservas'])
-            })
-
-        if pending and pending.get('flow') == 'return':
-            p = Prestamo.objects.filter(id=pending.get('prestamo_id'), solicitante=username, fin_real__isnull=True).first()
-            if not p:
-                _clear_pending(request)
-                return JsonResponse({'reply': 'No encontré el préstamo a devolver.', 'suggestions': _suggestions()})
-            p.cerrar()
-            _clear_pending(request)
-            return JsonResponse({'reply': f'Devolución registrada para {p.item.code}. ¡Gracias!', 'suggestions': _suggestions()})
-
-    # Cancelar
-    if msg in ('no','cancelar','cancel'):
-        _clear_pending(request)
-        return JsonResponse({'reply': 'Operación cancelada. ¿Algo más?', 'suggestions': _suggestions()})
-
-    # Fallback
-    return JsonResponse({'reply': 'Puedo reservar por código, devolver, y listar tus reservas/préstamos. Decí "Menú" para ver opciones.', 'suggestions': _suggestions()})
-
 
 # =========================
 # PREDICCIONES ML (serving)